@@ -1,19 +1,29 @@
-from flask import Flask, render_template
+from flask import Flask, render_template, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from werkzeug.local import LocalProxy
+from app.tarefas import FilaTarefas
+from app.cache_relatorios import CacheRelatorios
+from app.banco import opcoes_engine, configurar_engines
+from config import Config
 
 db = SQLAlchemy()
 migrate = Migrate()
+# Fila e cache de relatórios são da aplicação (app.extensions); estes nomes
+# apontam para os da aplicação atual.
+fila_tarefas = LocalProxy(lambda: current_app.extensions['fila_tarefas'])
+cache_relatorios = LocalProxy(lambda: current_app.extensions['cache_relatorios'])
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    
-    app.config['SECRET_KEY'] = 'chave-secreta'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sgsv.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.from_object(config_class)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine(app.config))
 
     db.init_app(app)
+    configurar_engines(app, db)
     migrate.init_app(app, db)
+    FilaTarefas(app)
+    CacheRelatorios(app)
 
     # -----------------------------------
     # TRATAMENTO DE ERROS (1 HTML só)
@@ -50,5 +60,18 @@ def create_app():
     app.register_blueprint(bp)
 
     from app import models  
+    from app import versoes  # registra os eventos que versionam os dados
+    from app import copia_uvis  # eventos que copiam nome/região da UVIS para as solicitações
+    from app import efeitos  # eventos: estatísticas, versões e CEPs de cada Solicitacao gravada
+    from app.estatisticas import estatisticas_cli  # eventos + `flask estatisticas reconstruir`
+    app.cli.add_command(estatisticas_cli)
+    from app.cep import cep_cli  # eventos + `flask cep importar/aprender`
+    app.cli.add_command(cep_cli)
+    from app.geocodificador import geocodificar_cli  # `flask geocodificar preencher`
+    app.cli.add_command(geocodificar_cli)
+    from app.importacao import importar_cli  # `flask importar solicitacoes`
+    app.cli.add_command(importar_cli)
+    from app.busca import busca_cli  # `flask busca reconstruir`
+    app.cli.add_command(busca_cli)
 
     return app
\ No newline at end of file
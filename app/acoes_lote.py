@@ -0,0 +1,124 @@
+from collections import namedtuple
+
+from sqlalchemy import update
+
+from app import db
+from app.models import Solicitacao
+from app.efeitos import COLUNAS, Mudanca, aplicar_efeitos
+
+# =======================================================================
+# Ações em Lote do Painel (status / protocolo / justificativa)
+# =======================================================================
+# Aplica a mesma alteração a um conjunto de solicitações (selecionadas
+# no painel ou todo o resultado do filtro) numa única transação:
+#
+# 1. SELECT do estado atual das solicitações alvo;
+# 2. resultado por linha (atualizada, sem alteração, não encontrada);
+# 3. um único UPDATE ... WHERE id IN (...) com as linhas elegíveis;
+# 4. efeitos da alteração (estatísticas mensais, versões dos dados), que
+#    o UPDATE em massa não dispara pelos eventos de sessão
+#    (app/efeitos.py).
+#
+# Campos em branco no formulário mantêm o valor atual de cada linha.
+
+STATUS_VALIDOS = ("PENDENTE", "EM ANÁLISE", "APROVADO", "NEGADO")
+
+# Limite de linhas por ação (também mantém o IN (...) dentro do limite de
+# parâmetros do SQLite)
+MAX_LOTE = 5000
+
+ATUALIZADA = "atualizada"
+SEM_ALTERACAO = "sem_alteracao"
+NAO_ENCONTRADA = "nao_encontrada"
+
+ResultadoLinha = namedtuple('ResultadoLinha', 'id resultado mensagem status_anterior')
+
+
+class ErroAcaoLote(ValueError):
+    """Ação inválida como um todo (nada é alterado)."""
+
+
+def _alteracoes(status, protocolo, justificativa):
+    alteracoes = {}
+    if status:
+        if status not in STATUS_VALIDOS:
+            raise ErroAcaoLote(f"Status inválido: {status}.")
+        alteracoes['status'] = status
+    if protocolo:
+        alteracoes['protocolo'] = protocolo.strip()[:50]
+    if justificativa:
+        alteracoes['justificativa'] = justificativa.strip()[:255]
+    if not alteracoes:
+        raise ErroAcaoLote("Informe o status, o protocolo ou a justificativa a aplicar.")
+    if alteracoes.get('status') == "NEGADO" and not alteracoes.get('justificativa'):
+        raise ErroAcaoLote("Para negar em lote, informe a justificativa.")
+    return alteracoes
+
+
+def _avaliar(linha, alteracoes):
+    """(resultado, mensagem) de uma linha atual diante das alterações."""
+    if all(getattr(linha, campo) == valor for campo, valor in alteracoes.items()):
+        return SEM_ALTERACAO, "Já estava com esses valores."
+    return ATUALIZADA, None
+
+
+def atualizar_em_lote(ids, status=None, protocolo=None, justificativa=None):
+    """
+    Aplica status/protocolo/justificativa às solicitações `ids` numa
+    transação. Retorna a lista de ResultadoLinha, na ordem de `ids`.
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ErroAcaoLote("Nenhuma solicitação selecionada.")
+    if len(ids) > MAX_LOTE:
+        raise ErroAcaoLote(f"Selecione no máximo {MAX_LOTE} solicitações por vez ({len(ids)} informadas).")
+    alteracoes = _alteracoes(status, protocolo, justificativa)
+
+    tabela = Solicitacao.__table__
+    colunas = [tabela.c.id, tabela.c.protocolo, tabela.c.justificativa]
+    colunas += [tabela.c[coluna] for coluna in COLUNAS]
+
+    try:
+        # FOR UPDATE: em bancos com lock de linha, o estado lido não muda até o commit
+        atuais = {
+            linha.id: linha
+            for linha in db.session.execute(
+                db.select(*colunas).where(tabela.c.id.in_(ids)).with_for_update()
+            )
+        }
+
+        resultados = []
+        elegiveis = []
+        for id_ in ids:
+            linha = atuais.get(id_)
+            if linha is None:
+                resultados.append(ResultadoLinha(id_, NAO_ENCONTRADA, "Solicitação não encontrada.", None))
+                continue
+            resultado, mensagem = _avaliar(linha, alteracoes)
+            resultados.append(ResultadoLinha(id_, resultado, mensagem, linha.status))
+            if resultado == ATUALIZADA:
+                elegiveis.append(linha)
+
+        if elegiveis:
+            db.session.execute(
+                update(Solicitacao)
+                .where(Solicitacao.id.in_([linha.id for linha in elegiveis]))
+                .values(**alteracoes)
+                .execution_options(synchronize_session=False)
+            )
+
+            mudancas = []
+            for linha in elegiveis:
+                antes = {coluna: getattr(linha, coluna) for coluna in COLUNAS}
+                depois = dict(antes, **{campo: valor for campo, valor in alteracoes.items() if campo in antes})
+                mudancas.append(Mudanca(antes, depois))
+            aplicar_efeitos(db.session.connection(), mudancas)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # objetos já carregados na sessão não viram o UPDATE em massa
+    db.session.expire_all()
+    return resultados
@@ -0,0 +1,118 @@
+from collections import Counter
+from datetime import datetime
+
+from app import db
+from app.models import Usuario, Solicitacao, EstatisticaMensal
+
+# =======================================================================
+# Motor de Agregação dos Relatórios
+# =======================================================================
+# Totalizações e agrupamentos de /relatorios (e do PDF) saem da tabela
+# `estatisticas_mensais` (mantida incrementalmente por app/estatisticas.py):
+# algumas centenas de contadores por mês, sem tocar em `solicitacoes`.
+# Região e unidade contam a cópia em cada solicitação (nome_uvis/regiao),
+# a mesma fonte do detalhe do PDF; de `usuarios` só vem o perfil, para o
+# ranking de unidades.
+
+DIMENSOES = ('regiao', 'status', 'foco', 'tipo_visita', 'altura_voo', 'unidade')
+
+
+def intervalo_mes(ano, mes):
+    """
+    Retorna o intervalo semiaberto [inicio, fim) do mês informado.
+    Comparar data_criacao com esse intervalo permite usar o índice da
+    coluna e funciona igual no SQLite e no PostgreSQL (sem strftime).
+    """
+    inicio = datetime(ano, mes, 1)
+    if mes == 12:
+        fim = datetime(ano + 1, 1, 1)
+    else:
+        fim = datetime(ano, mes + 1, 1)
+    return inicio, fim
+
+
+def aplicar_filtros_base(query, ano, mes, uvis_id):
+    """Aplica o filtro de mês/ano e opcionalmente o filtro de UVIS (usuario_id)."""
+
+    # Filtro de Mês/Ano (obrigatório)
+    inicio, fim = intervalo_mes(ano, mes)
+    query = query.filter(
+        Solicitacao.data_criacao >= inicio,
+        Solicitacao.data_criacao < fim
+    )
+
+    # Filtro de UVIS (opcional)
+    if uvis_id:
+        query = query.filter(Solicitacao.usuario_id == uvis_id)
+
+    return query
+
+
+def calcular_agregados(ano, mes, uvis_id=None):
+    """
+    Calcula totais e agrupamentos do mês a partir dos contadores mensais.
+    Retorna um dict com as mesmas chaves usadas pelo template relatorios.html
+    (total_* e dados_*), cada agrupamento como lista de tuplas (valor, total)
+    ordenada pelo total decrescente.
+    """
+    de_uvis = EstatisticaMensal.usuario_id.in_(
+        db.select(Usuario.id).where(Usuario.tipo_usuario == 'uvis')
+    )
+    query = db.session.query(
+        EstatisticaMensal.dimensao,
+        EstatisticaMensal.valor,
+        de_uvis,
+        EstatisticaMensal.total
+    ).filter(
+        EstatisticaMensal.ano == ano,
+        EstatisticaMensal.mes == mes
+    )
+
+    if uvis_id:
+        query = query.filter(EstatisticaMensal.usuario_id == uvis_id)
+
+    contadores = {dimensao: Counter() for dimensao in DIMENSOES}
+    total = 0
+
+    for dimensao, valor, autor_uvis, qtd in query:
+        if dimensao == 'total':
+            total += qtd
+        elif dimensao == 'nome_uvis':
+            # Ranking de unidades considera apenas usuários do tipo UVIS
+            if autor_uvis:
+                contadores['unidade'][valor or None] += qtd
+        else:
+            # '' = não informado (NULL na solicitação)
+            contadores[dimensao][valor or None] += qtd
+
+    por_status = contadores['status']
+
+    agregados = {
+        'total_solicitacoes': total,
+        'total_aprovadas': por_status.get("APROVADO", 0),
+        'total_recusadas': por_status.get("NEGADO", 0),
+        'total_analise': por_status.get("EM ANÁLISE", 0),
+        'total_pendentes': por_status.get("PENDENTE", 0),
+    }
+
+    for dimensao, contador in contadores.items():
+        agregados[f'dados_{dimensao}'] = contador.most_common()
+
+    return agregados
+
+
+def historico_mensal(uvis_id=None):
+    """Total de solicitações por mês ('AAAA-MM'), de todo o histórico (opcionalmente de uma UVIS)."""
+    query = db.session.query(EstatisticaMensal.ano, EstatisticaMensal.mes, db.func.sum(EstatisticaMensal.total)) \
+        .filter(EstatisticaMensal.dimensao == 'total')
+
+    if uvis_id:
+        query = query.filter(EstatisticaMensal.usuario_id == uvis_id)
+
+    dados_mensais_raw = (
+        query
+        .group_by(EstatisticaMensal.ano, EstatisticaMensal.mes)
+        .order_by(EstatisticaMensal.ano, EstatisticaMensal.mes)
+        .all()
+    )
+    return [(f"{a}-{m:02d}", total) for a, m, total in dados_mensais_raw]
@@ -0,0 +1,97 @@
+import os
+from functools import partial
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+
+# =======================================================================
+# Conexões com o Banco (pool, SQLite em WAL, fork dos workers)
+# =======================================================================
+# create_app() monta SQLALCHEMY_ENGINE_OPTIONS a partir de DB_POOL_* (ver
+# config.py), salvo se a configuração já trouxer as opções prontas:
+#
+# - DB_POOL_SIZE / DB_MAX_OVERFLOW -> conexões por processo do servidor
+#   (workers * (pool + overflow) precisa caber no max_connections do
+#   PostgreSQL);
+# - DB_POOL_RECYCLE                -> reabre conexões mais velhas que isso;
+# - DB_POOL_PRE_PING               -> testa a conexão antes de usar
+#   (sobrevive a restart do banco / timeout de firewall).
+#
+# No SQLite cada conexão nova entra em WAL com busy_timeout, para que
+# escritas simultâneas esperem o lock em vez de falhar com
+# "database is locked".
+#
+# Contadores e tabelas preenchidas por eventos usam insert_com_conflito()
+# (INSERT ... ON CONFLICT): duas transações criando a mesma linha ao mesmo
+# tempo não geram IntegrityError.
+
+PADROES = {
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 10,
+    'DB_POOL_TIMEOUT': 30,
+    'DB_POOL_RECYCLE': 1800,
+    'DB_POOL_PRE_PING': True,
+    'SQLITE_WAL': True,
+    'SQLITE_BUSY_TIMEOUT': 5000,
+}
+
+
+def _config(config, chave):
+    return config.get(chave, PADROES[chave])
+
+
+def _sqlite_em_memoria(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def opcoes_engine(config):
+    """SQLALCHEMY_ENGINE_OPTIONS a partir de DB_POOL_*."""
+    opcoes = {
+        'pool_pre_ping': _config(config, 'DB_POOL_PRE_PING'),
+        'pool_recycle': _config(config, 'DB_POOL_RECYCLE'),
+    }
+    # SQLite em memória usa um pool de conexão única (sem tamanho)
+    if not _sqlite_em_memoria(make_url(config['SQLALCHEMY_DATABASE_URI'])):
+        opcoes.update(
+            pool_size=_config(config, 'DB_POOL_SIZE'),
+            max_overflow=_config(config, 'DB_MAX_OVERFLOW'),
+            pool_timeout=_config(config, 'DB_POOL_TIMEOUT'),
+        )
+    return opcoes
+
+
+def insert_com_conflito(conexao, tabela):
+    """insert() do dialeto da conexão, com on_conflict_do_update/do_nothing."""
+    if conexao.dialect.name == 'postgresql':
+        return postgresql.insert(tabela)
+    return sqlite.insert(tabela)
+
+
+def _ajustar_sqlite(wal, busy_timeout, conexao_dbapi, registro):
+    cursor = conexao_dbapi.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+    if wal:
+        cursor.execute("PRAGMA journal_mode = WAL")
+        # com WAL, NORMAL só perde a última transação numa queda de energia
+        cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
+
+
+def configurar_engines(app, db):
+    """Registra os ajustes de conexão do SQLite nos engines da aplicação."""
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', partial(
+                _ajustar_sqlite,
+                _config(app.config, 'SQLITE_WAL'),
+                _config(app.config, 'SQLITE_BUSY_TIMEOUT'),
+            ))
+
+    # Servidor com pré-carga (ex.: gunicorn --preload): cada worker abre as
+    # suas conexões em vez de herdar as do processo principal.
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: [engine.dispose(close=False) for engine in engines])
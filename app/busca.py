@@ -0,0 +1,242 @@
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, text, select, table, column, func, literal_column
+
+from app import db
+from app.models import Solicitacao
+from app.cep import texto_comparavel
+
+# =======================================================================
+# Busca Textual (endereço, observação, protocolo)
+# =======================================================================
+# Índice de texto completo mantido pelo próprio banco, por triggers — vale
+# também para os INSERT/UPDATE em massa (importação, ações em lote):
+#
+# - SQLite: tabela virtual FTS5 `solicitacoes_busca` (rowid = id da
+#   solicitação), tokenizer unicode61 sem acentos; ranking por bm25.
+# - PostgreSQL: coluna tsvector `solicitacoes.busca` com índice GIN, na
+#   configuração `pt_sem_acento` (portuguese + unaccent); ranking por
+#   ts_rank.
+#
+# Os termos digitados viram prefixos ("pinhei" acha "Pinheiros") e todos
+# precisam aparecer. CEP com ou sem hífen. Pesos: protocolo e CEP acima
+# do logradouro, que fica acima de bairro/cidade/observação.
+#
+# Encontrar as linhas é barato; o custo está em calcular a relevância de
+# cada uma. Com `limite`, só as `limite` correspondências mais recentes
+# (maior id) que passam pelos filtros do painel (status, unidade, região)
+# são ranqueadas — um termo comum ("centro") não obriga a pontuar
+# centenas de milhares de linhas para mostrar 30.
+#
+# A migração cria o índice, e os eventos de DDL no fim do arquivo fazem o
+# mesmo em bancos criados com db.create_all() (ex.: run.py).
+# `flask busca reconstruir` recria e repopula (ex.: banco criado com
+# create_all antes desses eventos).
+
+MAX_TERMOS = 8
+
+# Colunas do FTS5 e pesos do bm25, na mesma ordem
+COLUNAS_SQLITE = ('logradouro', 'bairro', 'cidade', 'cep', 'observacao', 'protocolo')
+PESOS_SQLITE = (3.0, 1.0, 1.0, 5.0, 1.0, 10.0)
+
+# CEP sem hífen, para "01001-000" e "01001000" acharem o mesmo registro
+_VALORES_SQLITE = (
+    "{p}.logradouro, {p}.bairro, {p}.cidade, replace({p}.cep, '-', ''), {p}.observacao, {p}.protocolo"
+)
+
+DDL_SQLITE = [
+    # prefix: índices de prefixo de 2 a 4 letras, para as buscas "termo*"
+    "CREATE VIRTUAL TABLE IF NOT EXISTS solicitacoes_busca USING fts5("
+    + ", ".join(COLUNAS_SQLITE) + ", prefix = '2 3 4', tokenize = 'unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER IF NOT EXISTS solicitacoes_busca_ai AFTER INSERT ON solicitacoes BEGIN "
+    "INSERT INTO solicitacoes_busca(rowid, " + ", ".join(COLUNAS_SQLITE) + ") "
+    "VALUES (new.id, " + _VALORES_SQLITE.format(p='new') + "); END",
+
+    "CREATE TRIGGER IF NOT EXISTS solicitacoes_busca_ad AFTER DELETE ON solicitacoes BEGIN "
+    "DELETE FROM solicitacoes_busca WHERE rowid = old.id; END",
+
+    "CREATE TRIGGER IF NOT EXISTS solicitacoes_busca_au AFTER UPDATE OF "
+    + ", ".join(COLUNAS_SQLITE) + " ON solicitacoes BEGIN "
+    "DELETE FROM solicitacoes_busca WHERE rowid = old.id; "
+    "INSERT INTO solicitacoes_busca(rowid, " + ", ".join(COLUNAS_SQLITE) + ") "
+    "VALUES (new.id, " + _VALORES_SQLITE.format(p='new') + "); END",
+]
+
+REMOVER_SQLITE = [
+    "DROP TRIGGER IF EXISTS solicitacoes_busca_au",
+    "DROP TRIGGER IF EXISTS solicitacoes_busca_ad",
+    "DROP TRIGGER IF EXISTS solicitacoes_busca_ai",
+    "DROP TABLE IF EXISTS solicitacoes_busca",
+]
+
+REPOPULAR_SQLITE = [
+    "DELETE FROM solicitacoes_busca",
+    "INSERT INTO solicitacoes_busca(rowid, " + ", ".join(COLUNAS_SQLITE) + ") "
+    "SELECT id, " + _VALORES_SQLITE.format(p='solicitacoes') + " FROM solicitacoes",
+]
+
+DDL_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pt_sem_acento') THEN
+            CREATE TEXT SEARCH CONFIGURATION pt_sem_acento (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION pt_sem_acento
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END $$
+    """,
+    "ALTER TABLE solicitacoes ADD COLUMN IF NOT EXISTS busca tsvector",
+    """
+    CREATE OR REPLACE FUNCTION solicitacoes_busca_atualizar() RETURNS trigger AS $$
+    BEGIN
+        NEW.busca :=
+            setweight(to_tsvector('pt_sem_acento', coalesce(NEW.protocolo, '')), 'A') ||
+            setweight(to_tsvector('simple', replace(coalesce(NEW.cep, ''), '-', '')), 'A') ||
+            setweight(to_tsvector('pt_sem_acento', coalesce(NEW.logradouro, '')), 'B') ||
+            setweight(to_tsvector('pt_sem_acento', coalesce(NEW.bairro, '') || ' ' || coalesce(NEW.cidade, '')), 'C') ||
+            setweight(to_tsvector('pt_sem_acento', coalesce(NEW.observacao, '')), 'D');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS solicitacoes_busca_tg ON solicitacoes",
+    """
+    CREATE TRIGGER solicitacoes_busca_tg BEFORE INSERT OR UPDATE OF
+        logradouro, bairro, cidade, cep, observacao, protocolo
+    ON solicitacoes FOR EACH ROW EXECUTE FUNCTION solicitacoes_busca_atualizar()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_solicitacoes_busca ON solicitacoes USING gin (busca)",
+]
+
+# O trigger recalcula a coluna em qualquer UPDATE das colunas indexadas
+REPOPULAR_POSTGRESQL = [
+    "UPDATE solicitacoes SET protocolo = protocolo",
+]
+
+
+def _dialeto():
+    return db.session.get_bind().dialect.name
+
+
+def termos_busca(texto):
+    """Termos normalizados (sem acento, minúsculos; CEP sem hífen)."""
+    texto = re.sub(r'(\d{5})-(\d{3})', r'\1\2', texto_comparavel(texto))
+    return re.findall(r'\w+', texto)[:MAX_TERMOS]
+
+
+def _consulta_sqlite(termos):
+    # cada termo entre aspas (sem operadores do FTS5), como prefixo
+    return " ".join(f'"{termo}"*' for termo in termos)
+
+
+def _consulta_postgresql(termos):
+    return " & ".join(f"{termo}:*" for termo in termos)
+
+
+def _expressoes(termos):
+    """
+    (tabela do índice a juntar ou None, filtro, id no índice, relevância)
+    no dialeto atual. No PostgreSQL o índice é a própria `solicitacoes`.
+    """
+    if _dialeto() == 'postgresql':
+        consulta = func.to_tsquery('pt_sem_acento', _consulta_postgresql(termos))
+        vetor = literal_column('solicitacoes.busca')
+        id_busca = literal_column('solicitacoes.id')
+        return None, vetor.op('@@')(consulta), id_busca, -func.ts_rank(vetor, consulta)
+
+    indice = table('solicitacoes_busca', column('rowid'))
+    pesos = ", ".join(str(peso) for peso in PESOS_SQLITE)
+    filtro = text("solicitacoes_busca MATCH :consulta").bindparams(consulta=_consulta_sqlite(termos))
+    return indice, filtro, indice.c.rowid, literal_column(f"bm25(solicitacoes_busca, {pesos})")
+
+
+def correspondencias(texto):
+    """
+    Subconsulta (id, relevancia) de todas as solicitações que contêm os
+    termos; menor relevância = melhor. None se o texto não tiver termos.
+    """
+    termos = termos_busca(texto)
+    if not termos:
+        return None
+
+    indice, filtro, id_busca, relevancia = _expressoes(termos)
+    busca = select(id_busca.label('id'), relevancia.label('relevancia')).where(filtro)
+    if indice is not None:
+        busca = busca.select_from(indice)
+    return busca.subquery('busca')
+
+
+def aplicar_busca(query, texto, coluna_id, limite=None):
+    """
+    Restringe a query às solicitações encontradas, da mais relevante para a
+    menos. Com `limite`, só as `limite` mais recentes que também passam
+    pelos filtros da query são ranqueadas.
+    """
+    termos = termos_busca(texto)
+    if not termos:
+        return query
+
+    indice, filtro, id_busca, relevancia = _expressoes(termos)
+
+    # Candidatas: os filtros da query + o índice, lidas em ordem decrescente
+    # de id (a ordem do próprio índice), com a relevância calculada só para
+    # as que chegam ao LIMIT
+    candidatas = query
+    if indice is not None:
+        candidatas = candidatas.join(indice, id_busca == coluna_id)
+    candidatas = candidatas.filter(filtro) \
+        .with_entities(coluna_id.label('id'), relevancia.label('relevancia')) \
+        .order_by(None)
+    if limite:
+        candidatas = candidatas.order_by(id_busca.desc()).limit(int(limite))
+
+    busca = candidatas.subquery('busca')
+    return query.join(busca, busca.c.id == coluna_id).order_by(busca.c.relevancia, coluna_id.desc())
+
+
+# -----------------------------
+# Criação / reconstrução do índice
+# -----------------------------
+def reconstruir_indice():
+    """Cria o índice (se faltar) e o repopula a partir de `solicitacoes`."""
+    if _dialeto() == 'postgresql':
+        comandos = DDL_POSTGRESQL + REPOPULAR_POSTGRESQL
+    else:
+        comandos = DDL_SQLITE + REPOPULAR_SQLITE
+
+    for comando in comandos:
+        db.session.execute(text(comando))
+    db.session.commit()
+    return db.session.query(db.func.count(Solicitacao.id)).scalar()
+
+
+busca_cli = AppGroup('busca', help='Índice de busca textual das solicitações.')
+
+
+@busca_cli.command('reconstruir')
+def reconstruir_comando():
+    """Cria (se necessário) e repopula o índice de busca."""
+    total = reconstruir_indice()
+    click.echo(f"Índice de busca reconstruído: {total} solicitações.")
+
+
+# -----------------------------
+# Bancos criados com db.create_all()
+# -----------------------------
+@event.listens_for(Solicitacao.__table__, 'after_create')
+def _criar_indice(tabela, conexao, **kwargs):
+    comandos = DDL_POSTGRESQL if conexao.dialect.name == 'postgresql' else DDL_SQLITE
+    for comando in comandos:
+        conexao.execute(text(comando))
+
+
+@event.listens_for(Solicitacao.__table__, 'before_drop')
+def _remover_indice(tabela, conexao, **kwargs):
+    # os triggers somem com a tabela, mas a FTS5 ficaria com as linhas antigas
+    if conexao.dialect.name == 'sqlite':
+        for comando in REMOVER_SQLITE:
+            conexao.execute(text(comando))
@@ -0,0 +1,67 @@
+from app import db
+from app.models import Solicitacao
+from app.geo import faixas_bbox, bbox_ao_redor, distancia_km
+
+# =======================================================================
+# Buscas Espaciais de Solicitações
+# =======================================================================
+# "Solicitações dentro desta caixa" e "solicitações mais próximas deste
+# ponto", usando o índice da célula da grade (app/geo.py). O filtro
+# exato por latitude/longitude é aplicado em cima das células candidatas.
+
+# Acima disso a caixa é grande demais para valer a pena enumerar faixas
+MAX_FAIXAS = 300
+
+RAIO_INICIAL_KM = 1.0
+
+
+def filtrar_bbox(query, sul, oeste, norte, leste):
+    """Restringe a query às solicitações dentro da caixa (graus decimais)."""
+    faixas = faixas_bbox(sul, oeste, norte, leste)
+    if len(faixas) <= MAX_FAIXAS:
+        query = query.filter(db.or_(*[
+            Solicitacao.celula_geo.between(inicio, fim) for inicio, fim in faixas
+        ]))
+
+    return query.filter(
+        Solicitacao.latitude.between(sul, norte),
+        Solicitacao.longitude.between(oeste, leste)
+    )
+
+
+def solicitacoes_na_area(sul, oeste, norte, leste, query=None):
+    """Lista as solicitações da caixa. `query` permite filtros extras (status, data...)."""
+    if query is None:
+        query = Solicitacao.query
+    return filtrar_bbox(query, sul, oeste, norte, leste).all()
+
+
+def solicitacoes_proximas(latitude, longitude, limite=10, raio_max_km=50.0, query=None):
+    """
+    As `limite` solicitações mais próximas do ponto, até raio_max_km.
+    Retorna lista de (solicitacao, distancia_km) em ordem crescente.
+
+    Busca em quadrados crescentes (raio dobrando a cada rodada): só os
+    pontos dentro do círculo inscrito no quadrado têm a ordem garantida,
+    então a busca para quando já há `limite` deles.
+    """
+    if query is None:
+        query = Solicitacao.query
+
+    raio = min(RAIO_INICIAL_KM, raio_max_km)
+    while True:
+        candidatas = filtrar_bbox(query, *bbox_ao_redor(latitude, longitude, raio)).all()
+
+        proximas = sorted(
+            (
+                (s, distancia_km(latitude, longitude, s.latitude, s.longitude))
+                for s in candidatas
+            ),
+            key=lambda par: par[1]
+        )
+        proximas = [par for par in proximas if par[1] <= raio]
+
+        if len(proximas) >= limite or raio >= raio_max_km:
+            return proximas[:limite]
+
+        raio = min(raio * 2, raio_max_km)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+
+# =======================================================================
+# Cache de Relatórios Gerados (PDF / Excel)
+# =======================================================================
+# Arquivos endereçados pelo conteúdo: a chave é o hash dos parâmetros do
+# relatório (formato, ano, mês, UVIS, orientação) mais a versão dos dados
+# do mês (app/versoes.py). Qualquer alteração em uma Solicitacao do mês
+# muda a versão e, portanto, a chave — não há invalidação manual.
+#
+# Expulsão por idade (RELATORIOS_CACHE_TTL) e por tamanho total
+# (RELATORIOS_CACHE_MAX_MB, removendo os menos usados primeiro).
+#
+# Um cache por aplicação, em app.extensions['cache_relatorios'].
+
+
+class CacheRelatorios:
+    """Cache de uma aplicação: CacheRelatorios(app) o registra em app.extensions."""
+
+    def __init__(self, app):
+        app.config.setdefault('RELATORIOS_CACHE_DIR', os.path.join(app.instance_path, 'cache_relatorios'))
+        app.config.setdefault('RELATORIOS_CACHE_TTL', 7 * 24 * 60 * 60)
+        app.config.setdefault('RELATORIOS_CACHE_MAX_MB', 500)
+
+        self.app = app
+        os.makedirs(self.diretorio, exist_ok=True)
+        app.extensions['cache_relatorios'] = self
+
+    @property
+    def diretorio(self):
+        return self.app.config['RELATORIOS_CACHE_DIR']
+
+    # -----------------------------
+    # Chave / Consulta
+    # -----------------------------
+    @staticmethod
+    def chave(**parametros):
+        """Hash estável dos parâmetros (inclua a versão dos dados)."""
+        bruto = json.dumps(parametros, sort_keys=True, default=str)
+        return hashlib.sha256(bruto.encode('utf-8')).hexdigest()
+
+    def caminho(self, chave, extensao):
+        return os.path.join(self.diretorio, f"{chave}{extensao}")
+
+    def obter(self, chave, extensao):
+        """Caminho do arquivo em cache, ou None. Um acerto renova a data de uso."""
+        caminho = self.caminho(chave, extensao)
+        try:
+            os.utime(caminho)
+        except OSError:
+            return None
+        return caminho
+
+    # -----------------------------
+    # Gravação
+    # -----------------------------
+    def gravar(self, caminho, funcao, *args, **kwargs):
+        """
+        Gera o arquivo com funcao(caminho_temporario, *args, **kwargs) e o move
+        para `caminho` de forma atômica (requisições simultâneas não se atrapalham).
+        """
+        temporario = f"{caminho}.{uuid.uuid4().hex}.tmp"
+        try:
+            funcao(temporario, *args, **kwargs)
+            os.replace(temporario, caminho)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+        self.expulsar()
+        return caminho
+
+    # -----------------------------
+    # Expulsão por idade e tamanho
+    # -----------------------------
+    def expulsar(self):
+        limite_idade = time.time() - self.app.config['RELATORIOS_CACHE_TTL']
+        limite_bytes = self.app.config['RELATORIOS_CACHE_MAX_MB'] * 1024 * 1024
+
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith('.tmp'):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+
+            if info.st_mtime < limite_idade:
+                self._remover(caminho)
+            else:
+                arquivos.append((info.st_mtime, info.st_size, caminho))
+
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= limite_bytes:
+                break
+            self._remover(caminho)
+            total -= tamanho
+
+    @staticmethod
+    def _remover(caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
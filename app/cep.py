@@ -0,0 +1,425 @@
+import csv
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict, namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+import click
+from flask.cli import AppGroup
+
+from app import db
+from app.banco import insert_com_conflito
+from app.models import Solicitacao, Cep
+from app.geo import converter_coordenada
+from app.versoes import ESCOPO_CEPS, incrementar_versoes, versao_dados
+
+# =======================================================================
+# Consulta Local de CEP
+# =======================================================================
+# A tabela `ceps` responde "qual o endereço deste CEP" sem depender do
+# ViaCEP. Ela é preenchida de duas formas:
+#
+# - importação de arquivo (CSV com cep, logradouro, bairro, cidade, uf e,
+#   opcionalmente, latitude/longitude do centroide), via
+#   `flask cep importar <arquivo>`;
+# - aprendizado: cada solicitação salva ensina o endereço do seu CEP
+#   (app/efeitos.py) e `flask cep aprender` faz o mesmo para as
+#   solicitações já existentes. Nunca sobrescreve um CEP importado.
+#
+# Na frente do banco há um LRU em memória (por processo): CEPs já
+# consultados são respondidos sem reler a linha. Só a importação altera um
+# CEP já cadastrado (o aprendizado só insere CEPs novos, e CEP
+# desconhecido não é memorizado); ela incrementa a versão 'ceps' e cada
+# processo esvazia o seu LRU ao ver a versão nova.
+
+MAX_MEMORIA = 20000
+TAMANHO_LOTE = 5000
+
+ORIGEM_IMPORTACAO = 'importacao'
+ORIGEM_SOLICITACOES = 'solicitacoes'
+
+UFS = frozenset((
+    'AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+    'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO',
+))
+
+# Campo do formulário -> (rótulo, tamanho máximo da coluna)
+CAMPOS_ENDERECO = {
+    'logradouro': ('Logradouro', 150),
+    'bairro': ('Bairro', 100),
+    'cidade': ('Cidade', 100),
+}
+
+# Nomes de coluna aceitos na importação (ex.: exportações do ViaCEP)
+SINONIMOS_COLUNAS = {
+    'cep': 'cep',
+    'logradouro': 'logradouro',
+    'endereco': 'logradouro',
+    'bairro': 'bairro',
+    'cidade': 'cidade',
+    'localidade': 'cidade',
+    'municipio': 'cidade',
+    'uf': 'uf',
+    'estado': 'uf',
+    'latitude': 'latitude',
+    'lat': 'latitude',
+    'longitude': 'longitude',
+    'lon': 'longitude',
+    'lng': 'longitude',
+}
+
+Endereco = namedtuple('Endereco', 'cep logradouro bairro cidade uf origem')
+
+_memoria = OrderedDict()
+_versao_memoria = None
+_lock_memoria = threading.Lock()
+
+
+# -----------------------------
+# Normalização e validação
+# -----------------------------
+def normalizar_cep(valor):
+    """'01001-000' / '01001000' -> '01001000'. ValueError se não tiver 8 dígitos."""
+    digitos = re.sub(r'\D', '', str(valor or ''))
+    if len(digitos) != 8:
+        raise ValueError(f"CEP inválido: '{valor}'. Use 8 dígitos (ex.: 01001-000).")
+    return digitos
+
+
+def formatar_cep(digitos):
+    return f"{digitos[:5]}-{digitos[5:]}"
+
+
+def limpar_texto(valor):
+    """Sem espaços nas pontas e sem espaços repetidos."""
+    return ' '.join(str(valor or '').split())
+
+
+@lru_cache(maxsize=4096)
+def texto_comparavel(valor):
+    """Sem acentos, minúsculo: 'São Paulo' == 'SAO PAULO'."""
+    sem_acento = unicodedata.normalize('NFKD', limpar_texto(valor)).encode('ascii', 'ignore').decode('ascii')
+    return sem_acento.lower()
+
+
+def validar_endereco(cep, logradouro, bairro, cidade, uf, conhecidos=None):
+    """
+    Valida e normaliza o endereço do formulário. Retorna um dict com os
+    campos prontos para a Solicitacao (CEP no formato 00000-000) ou gera
+    ValueError com mensagem para o usuário.
+
+    `conhecidos` ({dígitos: Endereco}, ver buscar_ceps) evita uma consulta
+    por linha na validação em lote.
+    """
+    digitos = normalizar_cep(cep)
+    valores = {'cep': formatar_cep(digitos)}
+
+    for campo, valor in (('logradouro', logradouro), ('bairro', bairro), ('cidade', cidade)):
+        rotulo, tamanho = CAMPOS_ENDERECO[campo]
+        valor = limpar_texto(valor)
+        if not valor:
+            raise ValueError(f"{rotulo} é obrigatório.")
+        if len(valor) > tamanho:
+            raise ValueError(f"{rotulo} deve ter no máximo {tamanho} caracteres.")
+        valores[campo] = valor
+
+    uf = limpar_texto(uf).upper()
+    if uf not in UFS:
+        raise ValueError(f"UF inválida: '{uf}'.")
+    valores['uf'] = uf
+
+    # CEP da base importada: cidade/UF precisam bater (logradouro e bairro
+    # podem variar — CEP geral de cidade, grafias diferentes). CEPs
+    # aprendidos das solicitações são digitação de usuário, não conferida:
+    # servem para autocompletar, não para recusar o formulário.
+    conhecido = buscar_cep(digitos) if conhecidos is None else conhecidos.get(digitos)
+    if conhecido is not None and conhecido.origem == ORIGEM_IMPORTACAO:
+        if conhecido.uf != uf or texto_comparavel(conhecido.cidade) != texto_comparavel(valores['cidade']):
+            raise ValueError(
+                f"O CEP {valores['cep']} pertence a {conhecido.cidade}/{conhecido.uf}, "
+                f"não a {valores['cidade']}/{uf}."
+            )
+
+    return valores
+
+
+# -----------------------------
+# Consulta (LRU + banco)
+# -----------------------------
+def buscar_cep(cep):
+    """Endereco do CEP ou None. ValueError se o CEP for inválido."""
+    global _versao_memoria
+    digitos = normalizar_cep(cep)
+
+    # sem autoflush: chamada no meio da edição de uma solicitação
+    with db.session.no_autoflush:
+        versao = versao_dados(ESCOPO_CEPS)
+        with _lock_memoria:
+            if _versao_memoria != versao:
+                # importação (talvez em outro processo) desde o último acesso
+                _memoria.clear()
+                _versao_memoria = versao
+            elif digitos in _memoria:
+                _memoria.move_to_end(digitos)
+                return _memoria[digitos]
+
+        linha = db.session.query(Cep.cep, Cep.logradouro, Cep.bairro, Cep.cidade, Cep.uf, Cep.origem) \
+            .filter(Cep.cep == digitos).first()
+    if linha is None:
+        # CEP desconhecido não é memorizado: pode ser aprendido a seguir
+        return None
+
+    endereco = _endereco(linha)
+    with _lock_memoria:
+        if _versao_memoria != versao:
+            return endereco
+        _memoria[digitos] = endereco
+        while len(_memoria) > MAX_MEMORIA:
+            _memoria.popitem(last=False)
+    return endereco
+
+
+def buscar_ceps(digitos):
+    """{dígitos: Endereco} dos CEPs (já normalizados) conhecidos, numa consulta só."""
+    digitos = list(set(digitos))
+    if not digitos:
+        return {}
+    linhas = db.session.query(Cep.cep, Cep.logradouro, Cep.bairro, Cep.cidade, Cep.uf, Cep.origem) \
+        .filter(Cep.cep.in_(digitos))
+    return {linha.cep: _endereco(linha) for linha in linhas}
+
+
+def _endereco(linha):
+    return Endereco(
+        formatar_cep(linha.cep), linha.logradouro or '', linha.bairro or '', linha.cidade, linha.uf, linha.origem
+    )
+
+
+def limpar_memoria():
+    global _versao_memoria
+    with _lock_memoria:
+        _memoria.clear()
+        _versao_memoria = None
+
+
+# -----------------------------
+# Gravação em lote
+# -----------------------------
+def _gravar_lote(lote, sobrescrever):
+    """
+    Grava {cep: valores} na tabela. Com sobrescrever=False só insere CEPs
+    novos; com True também atualiza os existentes. Retorna (novos, atualizados).
+    """
+    if not lote:
+        return 0, 0
+
+    existentes = {
+        cep for (cep,) in db.session.query(Cep.cep).filter(Cep.cep.in_(list(lote)))
+    }
+    agora = datetime.utcnow()
+
+    novos = [dict(valores, cep=cep, atualizado_em=agora) for cep, valores in lote.items() if cep not in existentes]
+    if novos:
+        db.session.execute(Cep.__table__.insert(), novos)
+
+    atualizados = []
+    if sobrescrever:
+        atualizados = [dict(valores, cep=cep, atualizado_em=agora) for cep, valores in lote.items() if cep in existentes]
+        if atualizados:
+            db.session.execute(db.update(Cep), atualizados)
+
+    return len(novos), len(atualizados)
+
+
+def _cabecalho(colunas):
+    mapa = {}
+    for i, nome in enumerate(colunas):
+        chave = SINONIMOS_COLUNAS.get(texto_comparavel(nome).replace(' ', '_'))
+        if chave and chave not in mapa:
+            mapa[chave] = i
+    faltando = {'cep', 'cidade', 'uf'} - set(mapa)
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no arquivo: {', '.join(sorted(faltando))}.")
+    return mapa
+
+
+def importar_arquivo(caminho, encoding='utf-8-sig'):
+    """
+    Importa um CSV de CEPs (separador ';' ou ',', com cabeçalho), em lotes.
+    Linhas importadas substituem as aprendidas; cada lote incrementa a
+    versão 'ceps' (invalida o LRU de todos os processos). Retorna
+    {'novos', 'atualizados', 'ignorados'}.
+    """
+    resumo = Counter(novos=0, atualizados=0, ignorados=0)
+
+    with open(caminho, newline='', encoding=encoding) as arquivo:
+        amostra = arquivo.read(4096)
+        arquivo.seek(0)
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+        leitor = csv.reader(arquivo, dialeto)
+
+        mapa = _cabecalho(next(leitor, []))
+        com_centroide = 'latitude' in mapa and 'longitude' in mapa
+
+        def campo(linha, nome):
+            i = mapa.get(nome)
+            return limpar_texto(linha[i]) if i is not None and i < len(linha) else ''
+
+        lote = {}
+        for linha in leitor:
+            try:
+                cep = normalizar_cep(campo(linha, 'cep'))
+            except ValueError:
+                resumo['ignorados'] += 1
+                continue
+            uf = campo(linha, 'uf').upper()
+            cidade = campo(linha, 'cidade')
+            if uf not in UFS or not cidade:
+                resumo['ignorados'] += 1
+                continue
+
+            valores = {
+                'logradouro': campo(linha, 'logradouro')[:150] or None,
+                'bairro': campo(linha, 'bairro')[:100] or None,
+                'cidade': cidade[:100],
+                'uf': uf,
+                'origem': ORIGEM_IMPORTACAO,
+            }
+            if com_centroide:
+                try:
+                    valores['latitude'] = converter_coordenada(campo(linha, 'latitude'), 'latitude')
+                    valores['longitude'] = converter_coordenada(campo(linha, 'longitude'), 'longitude')
+                except ValueError:
+                    valores['latitude'] = valores['longitude'] = None
+                if valores['latitude'] is None or valores['longitude'] is None:
+                    valores['latitude'] = valores['longitude'] = None
+
+            lote[cep] = valores
+            if len(lote) >= TAMANHO_LOTE:
+                _gravar_importados(lote, resumo)
+                lote = {}
+
+        _gravar_importados(lote, resumo)
+
+    return dict(resumo)
+
+
+def _gravar_importados(lote, resumo):
+    novos, atualizados = _gravar_lote(lote, sobrescrever=True)
+    resumo.update(novos=novos, atualizados=atualizados)
+    if novos or atualizados:
+        incrementar_versoes(db.session.connection(), {ESCOPO_CEPS})
+    db.session.commit()
+
+
+# -----------------------------
+# Aprendizado a partir das solicitações
+# -----------------------------
+def endereco_para_aprender(cep, logradouro, bairro, cidade, uf):
+    """Valores para a tabela `ceps`, ou None se o endereço estiver incompleto."""
+    try:
+        digitos = normalizar_cep(cep)
+    except ValueError:
+        return None
+    uf = limpar_texto(uf).upper()
+    cidade = limpar_texto(cidade)
+    if uf not in UFS or not cidade:
+        return None
+    return digitos, {
+        'logradouro': limpar_texto(logradouro)[:150] or None,
+        'bairro': limpar_texto(bairro)[:100] or None,
+        'cidade': cidade[:100],
+        'uf': uf,
+        'origem': ORIGEM_SOLICITACOES,
+    }
+
+
+def aprender_de_solicitacoes():
+    """
+    Cadastra os CEPs das solicitações existentes que ainda não estão na
+    tabela (o endereço mais frequente de cada CEP). Retorna o nº de novos.
+    """
+    contagem = Counter()
+    consulta = db.session.query(
+        Solicitacao.cep, Solicitacao.logradouro, Solicitacao.bairro, Solicitacao.cidade, Solicitacao.uf
+    ).yield_per(5000)
+    for linha in consulta:
+        endereco = endereco_para_aprender(*linha)
+        if endereco is not None:
+            cep, valores = endereco
+            contagem[(cep,) + tuple(sorted(valores.items()))] += 1
+
+    # mais frequentes primeiro: o primeiro visto de cada CEP vence
+    lote = {}
+    for chave, _ in contagem.most_common():
+        lote.setdefault(chave[0], dict(chave[1:]))
+
+    total = 0
+    ceps = list(lote)
+    for inicio in range(0, len(ceps), TAMANHO_LOTE):
+        parte = {cep: lote[cep] for cep in ceps[inicio:inicio + TAMANHO_LOTE]}
+        novos, _ = _gravar_lote(parte, sobrescrever=False)
+        total += novos
+    db.session.commit()
+    return total
+
+
+def aprendidos_das_mudancas(mudancas):
+    """
+    {dígitos: valores} a aprender de solicitações [(antes, depois), ...]
+    (ver app/efeitos.py): as inseridas e as com CEP, cidade ou UF alterados.
+    """
+    aprendidos = {}
+    for antes, depois in mudancas:
+        if depois is None:
+            continue
+        if antes is not None and all(antes[campo] == depois[campo] for campo in ('cep', 'cidade', 'uf')):
+            continue
+        endereco = endereco_para_aprender(
+            depois['cep'], depois['logradouro'], depois['bairro'], depois['cidade'], depois['uf']
+        )
+        if endereco is not None:
+            aprendidos.setdefault(*endereco)
+    return aprendidos
+
+
+def registrar_aprendidos(conexao, aprendidos):
+    """
+    Insere os CEPs {dígitos: valores} que ainda não estão na tabela.
+    Chamado por app/efeitos.py a cada gravação de solicitações.
+    """
+    tabela = Cep.__table__
+    agora = datetime.utcnow()
+    novos = [dict(valores, cep=cep, atualizado_em=agora) for cep, valores in aprendidos.items()]
+    # CEP já existente (inclusive criado agora por outra transação) fica como está
+    conexao.execute(
+        insert_com_conflito(conexao, tabela).on_conflict_do_nothing(index_elements=[tabela.c.cep]),
+        novos
+    )
+
+
+# -----------------------------
+# Linha de comando
+# -----------------------------
+cep_cli = AppGroup('cep', help='Base local de CEPs.')
+
+
+@cep_cli.command('importar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--encoding', default='utf-8-sig', show_default=True)
+def importar_comando(arquivo, encoding):
+    """Importa um CSV de CEPs (cep, logradouro, bairro, cidade, uf[, latitude, longitude])."""
+    resumo = importar_arquivo(arquivo, encoding=encoding)
+    click.echo(
+        f"CEPs importados: {resumo['novos']} novos, {resumo['atualizados']} atualizados, "
+        f"{resumo['ignorados']} linhas ignoradas."
+    )
+
+
+@cep_cli.command('aprender')
+def aprender_comando():
+    """Cadastra os CEPs das solicitações existentes."""
+    total = aprender_de_solicitacoes()
+    click.echo(f"CEPs aprendidos das solicitações: {total}.")
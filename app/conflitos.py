@@ -0,0 +1,225 @@
+import math
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import Solicitacao
+from app.geo import KM_POR_GRAU_LAT, bbox_ao_redor, distancia_km
+from app.busca_geo import filtrar_bbox
+
+# =======================================================================
+# Detecção de Conflitos entre Voos
+# =======================================================================
+# Dois voos conflitam quando estão a até CONFLITO_RAIO_KM um do outro e
+# com horários a até CONFLITO_JANELA_MIN minutos de diferença. Só contam
+# voos ainda ativos (aprovados ou aguardando decisão) e com coordenadas.
+#
+# Nada de comparar todos com todos: o banco filtra pelos índices de data
+# do voo e da grade espacial, e em memória os voos vão para uma grade 3D
+# (latitude, longitude, tempo) com células do tamanho do raio e da janela.
+# Cada voo só é comparado com os das 27 células vizinhas.
+
+STATUS_CONFLITANTES = ("APROVADO", "PENDENTE", "EM ANÁLISE")
+
+RAIO_PADRAO_KM = 0.5
+JANELA_PADRAO_MIN = 60
+
+_EPOCA = datetime(2000, 1, 1)
+
+Voo = namedtuple('Voo', 'id inicio latitude longitude status nome_uvis')
+Conflito = namedtuple('Conflito', 'voo distancia_km diferenca_min')
+ParConflitante = namedtuple('ParConflitante', 'a b distancia_km diferenca_min')
+
+
+def _parametros(raio_km, janela_min):
+    config = current_app.config
+    if raio_km is None:
+        raio_km = config.get('CONFLITO_RAIO_KM', RAIO_PADRAO_KM)
+    if janela_min is None:
+        janela_min = config.get('CONFLITO_JANELA_MIN', JANELA_PADRAO_MIN)
+    return raio_km, janela_min
+
+
+def _consulta_voos():
+    """Voos ativos com coordenadas (somente as colunas usadas na detecção)."""
+    return db.session.query(
+        Solicitacao.id,
+        Solicitacao.data_agendamento,
+        Solicitacao.hora_agendamento,
+        Solicitacao.latitude,
+        Solicitacao.longitude,
+        Solicitacao.status,
+        Solicitacao.nome_uvis
+    ).filter(
+        Solicitacao.status.in_(STATUS_CONFLITANTES),
+        Solicitacao.latitude.isnot(None),
+        Solicitacao.longitude.isnot(None)
+    )
+
+
+def _voo(linha):
+    return Voo(
+        linha.id,
+        datetime.combine(linha.data_agendamento, linha.hora_agendamento),
+        linha.latitude,
+        linha.longitude,
+        linha.status,
+        linha.nome_uvis
+    )
+
+
+def _voo_da_solicitacao(solicitacao):
+    if solicitacao.latitude is None or solicitacao.longitude is None:
+        return None
+    if not solicitacao.data_agendamento or not solicitacao.hora_agendamento:
+        return None
+    return Voo(
+        solicitacao.id,
+        datetime.combine(solicitacao.data_agendamento, solicitacao.hora_agendamento),
+        solicitacao.latitude,
+        solicitacao.longitude,
+        solicitacao.status,
+        solicitacao.nome_uvis
+    )
+
+
+def _dias_janela(janela_min):
+    """Quantos dias antes/depois do voo a janela de horário pode alcançar."""
+    return janela_min // (24 * 60) + 1
+
+
+class IndiceVoos:
+    """Grade 3D em memória: células de raio_km x raio_km x janela_min."""
+
+    def __init__(self, voos, raio_km, janela_min):
+        self.raio_km = raio_km
+        self.janela_min = janela_min
+
+        # longitude encolhe com a latitude: usa a maior |latitude| para
+        # garantir células com pelo menos raio_km de largura
+        lat_ref = max((abs(v.latitude) for v in voos), default=0.0)
+        passo_km = max(raio_km, 0.001)
+        self.passo_lat = passo_km / KM_POR_GRAU_LAT
+        self.passo_lon = passo_km / (KM_POR_GRAU_LAT * max(math.cos(math.radians(lat_ref)), 0.01))
+
+        self.celulas = defaultdict(list)
+        for voo in voos:
+            self.celulas[self._chave(voo)].append(voo)
+
+    def _chave(self, voo):
+        minutos = (voo.inicio - _EPOCA).total_seconds() / 60
+        return (
+            math.floor(voo.latitude / self.passo_lat),
+            math.floor(voo.longitude / self.passo_lon),
+            math.floor(minutos / max(self.janela_min, 1)),
+        )
+
+    def conflitos(self, voo):
+        """Voos do índice que conflitam com `voo` (exceto ele mesmo)."""
+        i, j, k = self._chave(voo)
+        encontrados = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for dk in (-1, 0, 1):
+                    for outro in self.celulas.get((i + di, j + dj, k + dk), ()):
+                        if outro.id == voo.id:
+                            continue
+                        diferenca = abs((outro.inicio - voo.inicio).total_seconds()) / 60
+                        if diferenca > self.janela_min:
+                            continue
+                        distancia = distancia_km(voo.latitude, voo.longitude, outro.latitude, outro.longitude)
+                        if distancia <= self.raio_km:
+                            encontrados.append(Conflito(outro, distancia, diferenca))
+
+        return sorted(encontrados, key=lambda c: (c.diferenca_min, c.distancia_km))
+
+
+# -----------------------------
+# Uma solicitação (ex.: ao aprovar)
+# -----------------------------
+def conflitos_da_solicitacao(solicitacao, raio_km=None, janela_min=None):
+    """Voos ativos que conflitam com a solicitação (lista de Conflito)."""
+    raio_km, janela_min = _parametros(raio_km, janela_min)
+
+    voo = _voo_da_solicitacao(solicitacao)
+    if voo is None:
+        return []
+
+    dias = timedelta(days=_dias_janela(janela_min))
+    query = _consulta_voos().filter(
+        Solicitacao.data_agendamento >= voo.inicio.date() - dias,
+        Solicitacao.data_agendamento <= voo.inicio.date() + dias
+    )
+    query = filtrar_bbox(query, *bbox_ao_redor(voo.latitude, voo.longitude, raio_km))
+
+    candidatos = [_voo(linha) for linha in query]
+    return IndiceVoos(candidatos + [voo], raio_km, janela_min).conflitos(voo)
+
+
+# -----------------------------
+# Página do painel (várias solicitações, uma consulta)
+# -----------------------------
+def mapa_conflitos(solicitacoes, raio_km=None, janela_min=None):
+    """{id da solicitação: [Conflito, ...]} para as solicitações informadas."""
+    raio_km, janela_min = _parametros(raio_km, janela_min)
+
+    # voos negados não precisam de aviso
+    voos = [
+        v for v in map(_voo_da_solicitacao, solicitacoes)
+        if v is not None and v.status in STATUS_CONFLITANTES
+    ]
+    if not voos:
+        return {}
+
+    dias = _dias_janela(janela_min)
+    datas = {
+        v.inicio.date() + timedelta(days=d)
+        for v in voos
+        for d in range(-dias, dias + 1)
+    }
+    candidatos = [_voo(linha) for linha in _consulta_voos().filter(Solicitacao.data_agendamento.in_(datas))]
+    indice = IndiceVoos(candidatos, raio_km, janela_min)
+
+    mapa = {}
+    for voo in voos:
+        encontrados = indice.conflitos(voo)
+        if encontrados:
+            mapa[voo.id] = encontrados
+    return mapa
+
+
+# -----------------------------
+# Relatório mensal (todos os pares do mês)
+# -----------------------------
+def conflitos_do_mes(ano, mes, raio_km=None, janela_min=None):
+    """Pares de voos conflitantes com data de voo no mês (cada par uma vez)."""
+    raio_km, janela_min = _parametros(raio_km, janela_min)
+
+    inicio = datetime(ano, mes, 1).date()
+    fim = (datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)).date()
+    dias = timedelta(days=_dias_janela(janela_min))
+
+    # inclui as bordas para pegar conflitos na virada do mês
+    linhas = _consulta_voos().filter(
+        Solicitacao.data_agendamento >= inicio - dias,
+        Solicitacao.data_agendamento < fim + dias
+    )
+    voos = [_voo(linha) for linha in linhas]
+    indice = IndiceVoos(voos, raio_km, janela_min)
+
+    pares = []
+    vistos = set()
+    for voo in voos:
+        if not (inicio <= voo.inicio.date() < fim):
+            continue
+        for conflito in indice.conflitos(voo):
+            chave = (min(voo.id, conflito.voo.id), max(voo.id, conflito.voo.id))
+            if chave in vistos:
+                continue
+            vistos.add(chave)
+            a, b = sorted((voo, conflito.voo), key=lambda v: (v.inicio, v.id))
+            pares.append(ParConflitante(a, b, conflito.distancia_km, conflito.diferenca_min))
+
+    return sorted(pares, key=lambda p: (p.a.inicio, p.a.id, p.b.id))
@@ -0,0 +1,88 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.models import Usuario, Solicitacao
+from app.estatisticas import mover_copia_uvis
+
+# =======================================================================
+# Cópia dos Dados da UVIS nas Solicitações
+# =======================================================================
+# Solicitacao.nome_uvis / Solicitacao.regiao repetem os campos do autor
+# (Usuario) para que o painel, as exportações e os relatórios filtrem e
+# agrupem por unidade/região sem JOIN com `usuarios`.
+#
+# Os eventos de sessão abaixo mantêm a cópia em dia:
+#
+# - Solicitacao nova (ou trocada de UVIS) -> copia do autor;
+# - Usuario renomeado / mudou de região   -> UPDATE nas solicitações dele
+#   e nos contadores de região/unidade (app/estatisticas.py), na mesma
+#   transação.
+#
+# INSERTs em massa (app/efeitos.py, inserir_em_massa) preenchem as
+# colunas com dados_da_uvis(). CAMPOS lista os atributos copiados.
+
+CHAVE_SESSAO = 'uvis_alteradas'
+
+CAMPOS = ('nome_uvis', 'regiao')
+
+
+def dados_da_uvis(usuario_id):
+    """{'nome_uvis': ..., 'regiao': ...} do Usuario `usuario_id` (vazio se não existir)."""
+    linha = db.session.query(Usuario.nome_uvis, Usuario.regiao).filter(Usuario.id == usuario_id).first()
+    return dict(linha._mapping) if linha else {}
+
+
+def _copiar_do_autor(session, solicitacao):
+    autor = solicitacao.autor
+    if autor is None and solicitacao.usuario_id is not None:
+        autor = session.get(Usuario, solicitacao.usuario_id)
+    if autor is not None:
+        for campo in CAMPOS:
+            setattr(solicitacao, campo, getattr(autor, campo))
+
+
+def _trocou_de_uvis(solicitacao):
+    estado = inspect(solicitacao)
+    return any(estado.attrs[campo].history.has_changes() for campo in ('usuario_id', 'autor'))
+
+
+@event.listens_for(Session, 'before_flush')
+def _coletar_copias(session, flush_context, instances):
+    alteradas = {}
+
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Solicitacao):
+                _copiar_do_autor(session, obj)
+
+        for obj in session.dirty:
+            if isinstance(obj, Solicitacao) and _trocou_de_uvis(obj):
+                _copiar_do_autor(session, obj)
+            elif isinstance(obj, Usuario) and obj.id is not None:
+                estado = inspect(obj)
+                if any(estado.attrs[campo].history.has_changes() for campo in CAMPOS):
+                    alteradas[obj.id] = {campo: getattr(obj, campo) for campo in CAMPOS}
+
+    if alteradas:
+        session.info[CHAVE_SESSAO] = alteradas
+
+
+@event.listens_for(Session, 'after_flush')
+def _propagar_copias(session, flush_context):
+    alteradas = session.info.pop(CHAVE_SESSAO, None)
+    if not alteradas:
+        return
+
+    tabela = Solicitacao.__table__
+    conexao = session.connection()
+    for usuario_id, valores in alteradas.items():
+        conexao.execute(tabela.update().where(tabela.c.usuario_id == usuario_id).values(**valores))
+        mover_copia_uvis(conexao, usuario_id, valores)
+
+    # solicitações já carregadas na sessão passam a mostrar o valor novo
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Solicitacao) and obj.usuario_id in alteradas:
+            for campo, valor in alteradas[obj.usuario_id].items():
+                set_committed_value(obj, campo, valor)
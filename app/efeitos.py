@@ -0,0 +1,128 @@
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Solicitacao
+from app.estatisticas import ATRIBUTOS, aplicar_deltas, deltas_das_mudancas
+from app.versoes import CAMPOS_ENDERECO, incrementar_versoes, escopos_das_mudancas
+from app.cep import registrar_aprendidos, aprendidos_das_mudancas
+from app.copia_uvis import dados_da_uvis
+
+# =======================================================================
+# Efeitos da Gravação de Solicitações
+# =======================================================================
+# Inserir, alterar ou remover uma Solicitacao mexe em outras tabelas, na
+# mesma transação:
+#
+# - contadores de `estatisticas_mensais` (app/estatisticas.py);
+# - versões dos dados (app/versoes.py);
+# - CEPs aprendidos (app/cep.py).
+#
+# Os dois caminhos de gravação descrevem cada linha como uma Mudanca
+# (valores antes/depois, em dicts {coluna: valor}) e chamam
+# aplicar_efeitos():
+#
+# - alterações pelo ORM: eventos de sessão abaixo;
+# - gravações em massa, que não disparam eventos (importação, ações em
+#   lote): chamam aplicar_efeitos() depois do INSERT/UPDATE.
+#
+# Um efeito novo entra em aplicar_efeitos() e vale para os dois.
+
+CHAVE_SESSAO = 'solicitacoes_alteradas'
+
+# Colunas de Solicitacao lidas pelos efeitos
+COLUNAS = tuple(dict.fromkeys(ATRIBUTOS + CAMPOS_ENDERECO + ('bairro', 'data_agendamento')))
+
+# Mudanca(None, valores) = inserida; Mudanca(valores, None) = removida
+Mudanca = namedtuple('Mudanca', 'antes depois')
+
+
+def aplicar_efeitos(conexao, mudancas):
+    """Estatísticas, versões e CEPs aprendidos das mudanças, na conexão informada."""
+    if not mudancas:
+        return
+    deltas = deltas_das_mudancas(mudancas)
+    if deltas:
+        aplicar_deltas(conexao, deltas)
+    incrementar_versoes(conexao, escopos_das_mudancas(mudancas))
+    aprendidos = aprendidos_das_mudancas(mudancas)
+    if aprendidos:
+        registrar_aprendidos(conexao, aprendidos)
+
+
+def inserir_em_massa(linhas, usuario_id):
+    """
+    INSERT em massa de solicitações da UVIS `usuario_id` ({coluna: valor},
+    sem autor/data de criação), com o que o ORM faria: autor, data de
+    criação, cópia dos dados da UVIS e aplicar_efeitos(). Não faz commit.
+    """
+    valores = dict(dados_da_uvis(usuario_id), usuario_id=usuario_id, data_criacao=datetime.utcnow())
+    for linha in linhas:
+        linha.update(valores)
+
+    db.session.execute(Solicitacao.__table__.insert(), linhas)
+    aplicar_efeitos(db.session.connection(), [Mudanca(None, linha) for linha in linhas])
+
+
+# -----------------------------
+# Eventos de sessão (ORM)
+# -----------------------------
+def _valores_atuais(obj):
+    valores = {coluna: getattr(obj, coluna) for coluna in COLUNAS}
+    if valores['usuario_id'] is None and obj.autor is not None:
+        valores['usuario_id'] = obj.autor.id
+    return valores
+
+
+def _valores_antigos(obj):
+    """Valores como estão no banco (antes das alterações pendentes)."""
+    estado = inspect(obj)
+    valores = {}
+    for coluna in COLUNAS:
+        historico = estado.attrs[coluna].history
+        if historico.deleted:
+            valores[coluna] = historico.deleted[0]
+        elif historico.unchanged:
+            valores[coluna] = historico.unchanged[0]
+        else:
+            valores[coluna] = getattr(obj, coluna)
+    return valores
+
+
+# Ao alterar essas colunas, o SQLAlchemy carrega o valor antigo mesmo se
+# estiver expirado — necessário para decrementar o contador certo.
+for _coluna in COLUNAS:
+    event.listen(getattr(Solicitacao, _coluna), 'set', lambda *args: None, active_history=True)
+
+
+@event.listens_for(Session, 'before_flush')
+def _coletar_mudancas(session, flush_context, instances):
+    mudancas = []
+
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Solicitacao):
+                # mesmo default da coluna, aplicado antes para conhecer o mês
+                if obj.data_criacao is None:
+                    obj.data_criacao = datetime.utcnow()
+                mudancas.append(Mudanca(None, _valores_atuais(obj)))
+
+        for obj in session.dirty:
+            if isinstance(obj, Solicitacao) and session.is_modified(obj):
+                mudancas.append(Mudanca(_valores_antigos(obj), _valores_atuais(obj)))
+
+        for obj in session.deleted:
+            if isinstance(obj, Solicitacao):
+                mudancas.append(Mudanca(_valores_antigos(obj), None))
+
+    session.info[CHAVE_SESSAO] = mudancas
+
+
+@event.listens_for(Session, 'after_flush')
+def _aplicar_mudancas(session, flush_context):
+    mudancas = session.info.pop(CHAVE_SESSAO, None)
+    if mudancas:
+        aplicar_efeitos(session.connection(), mudancas)
@@ -0,0 +1,136 @@
+from collections import Counter
+
+import click
+from flask.cli import AppGroup
+
+from app import db
+from app.banco import insert_com_conflito
+from app.models import Solicitacao, EstatisticaMensal
+
+# =======================================================================
+# Estatísticas Mensais (agregado incremental)
+# =======================================================================
+# `estatisticas_mensais` guarda contadores por (ano, mês, usuario_id,
+# dimensão, valor). Os relatórios leem essas poucas centenas de linhas em
+# vez de varrer `solicitacoes` (ver app/agregacao.py).
+#
+# Cada inserção, alteração ou remoção de Solicitacao aplica deltas (+1 /
+# -1) na mesma transação, por app/efeitos.py (eventos de sessão e
+# gravações em massa). Alterações feitas direto no banco pedem
+# `flask estatisticas reconstruir`.
+
+# Dimensão 'total' conta as solicitações (valor sempre vazio); região e
+# unidade contam a cópia feita na solicitação (app/copia_uvis.py), a mesma
+# que o detalhe do PDF imprime.
+DIMENSOES = ('status', 'foco', 'tipo_visita', 'altura_voo', 'regiao', 'nome_uvis')
+ATRIBUTOS = ('data_criacao', 'usuario_id') + DIMENSOES
+
+
+def _chaves(valores):
+    """Chaves de contador de uma solicitação, a partir de {atributo: valor}."""
+    data = valores['data_criacao']
+    base = (data.year, data.month, valores['usuario_id'])
+    chaves = [base + ('total', '')]
+    for dimensao in DIMENSOES:
+        chaves.append(base + (dimensao, valores[dimensao] or ''))
+    return chaves
+
+
+def deltas_das_mudancas(mudancas):
+    """Deltas de [(valores_antes, valores_depois), ...]; None = linha inserida/removida."""
+    deltas = Counter()
+    for antes, depois in mudancas:
+        if antes is not None:
+            for chave in _chaves(antes):
+                deltas[chave] -= 1
+        if depois is not None:
+            for chave in _chaves(depois):
+                deltas[chave] += 1
+    return {chave: delta for chave, delta in deltas.items() if delta}
+
+
+def aplicar_deltas(conexao, deltas):
+    """Soma cada delta {(ano, mes, usuario_id, dimensao, valor): n} ao seu contador."""
+    tabela = EstatisticaMensal.__table__
+
+    for (ano, mes, usuario_id, dimensao, valor), delta in sorted(deltas.items()):
+        # cria o contador ou soma ao existente num comando só (sem corrida
+        # entre duas transações criando a mesma linha)
+        insert = insert_com_conflito(conexao, tabela).values(
+            ano=ano, mes=mes, usuario_id=usuario_id, dimensao=dimensao, valor=valor, total=delta
+        )
+        conexao.execute(insert.on_conflict_do_update(
+            index_elements=[coluna.name for coluna in tabela.primary_key],
+            set_={'total': tabela.c.total + insert.excluded.total},
+        ))
+        if delta < 0:
+            # contador zerado não precisa ficar na tabela
+            conexao.execute(tabela.delete().where(
+                (tabela.c.ano == ano) & (tabela.c.mes == mes) &
+                (tabela.c.usuario_id == usuario_id) &
+                (tabela.c.dimensao == dimensao) & (tabela.c.valor == valor) &
+                (tabela.c.total <= 0)
+            ))
+
+
+def mover_copia_uvis(conexao, usuario_id, valores):
+    """
+    UVIS renomeada / mudou de região: todas as solicitações dela passam a
+    ter `valores` ({campo: valor}), e os contadores desses campos vão para
+    o valor novo (o UPDATE em massa de app/copia_uvis.py não gera deltas).
+    """
+    tabela = EstatisticaMensal.__table__
+    linhas = conexao.execute(
+        db.select(tabela.c.ano, tabela.c.mes, tabela.c.dimensao, tabela.c.valor, tabela.c.total)
+        .where((tabela.c.usuario_id == usuario_id) & tabela.c.dimensao.in_(list(valores)))
+    )
+
+    deltas = Counter()
+    for ano, mes, dimensao, valor, total in linhas:
+        deltas[(ano, mes, usuario_id, dimensao, valor)] -= total
+        deltas[(ano, mes, usuario_id, dimensao, valores[dimensao] or '')] += total
+
+    deltas = {chave: delta for chave, delta in deltas.items() if delta}
+    if deltas:
+        aplicar_deltas(conexao, deltas)
+
+
+# -----------------------------
+# Reconstrução (backfill)
+# -----------------------------
+def reconstruir_estatisticas():
+    """Recalcula toda a tabela a partir de `solicitacoes`. Retorna o nº de contadores."""
+    tabela = EstatisticaMensal.__table__
+    ano = db.cast(db.extract('year', Solicitacao.data_criacao), db.Integer)
+    mes = db.cast(db.extract('month', Solicitacao.data_criacao), db.Integer)
+    colunas = ['ano', 'mes', 'usuario_id', 'dimensao', 'valor', 'total']
+
+    db.session.execute(tabela.delete())
+
+    for dimensao in ('total',) + DIMENSOES:
+        agrupamento = [ano, mes, Solicitacao.usuario_id]
+        if dimensao == 'total':
+            valor = db.literal('')
+        else:
+            valor = db.func.coalesce(getattr(Solicitacao, dimensao), '')
+            agrupamento.append(valor)
+
+        consulta = (
+            db.select(ano, mes, Solicitacao.usuario_id, db.literal(dimensao), valor, db.func.count(Solicitacao.id))
+            .where(Solicitacao.data_criacao.isnot(None))
+            .group_by(*agrupamento)
+        )
+        db.session.execute(tabela.insert().from_select(colunas, consulta))
+
+    db.session.commit()
+    return db.session.query(db.func.count()).select_from(tabela).scalar()
+
+
+estatisticas_cli = AppGroup('estatisticas', help='Estatísticas mensais dos relatórios.')
+
+
+@estatisticas_cli.command('reconstruir')
+def reconstruir_comando():
+    """Recalcula as estatísticas mensais a partir das solicitações."""
+    total = reconstruir_estatisticas()
+    click.echo(f"Estatísticas reconstruídas: {total} contadores.")
@@ -0,0 +1,94 @@
+import math
+
+# =======================================================================
+# Coordenadas e Grade Espacial
+# =======================================================================
+# Funções puras (sem banco) usadas pelo modelo e pelas buscas espaciais.
+#
+# A grade divide o globo em células de TAMANHO_CELULA graus; cada
+# solicitação guarda o número da sua célula (`celula_geo`, indexado).
+# Uma caixa (bounding box) vira poucas faixas contíguas de células — uma
+# por linha da grade — e cada faixa é um BETWEEN que usa o índice.
+
+TAMANHO_CELULA = 0.01          # graus (~1,1 km de latitude)
+COLUNAS_GRADE = 36000          # 360 / TAMANHO_CELULA
+
+RAIO_TERRA_KM = 6371.0088
+KM_POR_GRAU_LAT = 111.32
+
+LIMITES = {
+    'latitude': ('Latitude', 90.0),
+    'longitude': ('Longitude', 180.0),
+}
+
+
+def converter_coordenada(valor, campo='latitude'):
+    """
+    Converte o valor do formulário (ex.: '-23.550520' ou '-23,550520')
+    em float. Vazio vira None; texto inválido ou fora do intervalo gera
+    ValueError com mensagem para o usuário.
+    """
+    rotulo, limite = LIMITES[campo]
+
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        valor = valor.strip().replace(',', '.')
+        if not valor:
+            return None
+
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{rotulo} inválida: '{valor}'. Use graus decimais, ex.: -23.550520")
+
+    if not math.isfinite(numero) or abs(numero) > limite:
+        raise ValueError(f"{rotulo} fora do intervalo (-{limite:.0f} a {limite:.0f}): {valor}")
+
+    return numero
+
+
+def _linha(latitude):
+    return int(math.floor((latitude + 90.0) / TAMANHO_CELULA))
+
+
+def _coluna(longitude):
+    return min(int(math.floor((longitude + 180.0) / TAMANHO_CELULA)), COLUNAS_GRADE - 1)
+
+
+def celula_geo(latitude, longitude):
+    """Número da célula da grade que contém o ponto (None sem coordenadas)."""
+    if latitude is None or longitude is None:
+        return None
+    return _linha(latitude) * COLUNAS_GRADE + _coluna(longitude)
+
+
+def faixas_bbox(sul, oeste, norte, leste):
+    """Faixas [inicio, fim] de células que cobrem a caixa (uma por linha da grade)."""
+    coluna_oeste, coluna_leste = _coluna(oeste), _coluna(leste)
+    return [
+        (linha * COLUNAS_GRADE + coluna_oeste, linha * COLUNAS_GRADE + coluna_leste)
+        for linha in range(_linha(sul), _linha(norte) + 1)
+    ]
+
+
+def bbox_ao_redor(latitude, longitude, raio_km):
+    """(sul, oeste, norte, leste) do quadrado que contém o círculo de raio_km."""
+    delta_lat = raio_km / KM_POR_GRAU_LAT
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    delta_lon = raio_km / (KM_POR_GRAU_LAT * cos_lat)
+    return (
+        max(latitude - delta_lat, -90.0),
+        max(longitude - delta_lon, -180.0),
+        min(latitude + delta_lat, 90.0),
+        min(longitude + delta_lon, 180.0),
+    )
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distância em km entre dois pontos (fórmula de haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(a))
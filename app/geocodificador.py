@@ -0,0 +1,357 @@
+import difflib
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+from functools import lru_cache
+
+import click
+from flask.cli import AppGroup
+
+from app import db
+from app.models import Solicitacao, Cep
+from app.cep import normalizar_cep
+from app.versoes import versao_dados, ESCOPO_ENDERECOS
+
+# =======================================================================
+# Geocodificador Offline
+# =======================================================================
+# Sugere latitude/longitude para logradouro + número + CEP sem serviço
+# externo, a partir de um índice em memória montado com:
+#
+# - solicitações cujas coordenadas foram digitadas/confirmadas por alguém
+#   (coordenadas_origem NULL) — as preenchidas pelo próprio geocodificador
+#   não realimentam o índice;
+# - centroides de CEP/logradouro importados na tabela `ceps`
+#   (`flask cep importar` com colunas latitude/longitude).
+#
+# Ordem de tentativa (da mais para a menos precisa):
+#   'exato'       -> mesmo logradouro e número já geocodificados
+#   'interpolado' -> entre os números vizinhos do mesmo logradouro
+#   'rua'         -> número mais próximo / centro do logradouro
+#   'cep'         -> centroide do CEP
+# O logradouro é comparado normalizado (sem acento, abreviações
+# expandidas) e, se não houver igual, pelo nome mais parecido (difflib).
+
+PRECISOES = ('exato', 'interpolado', 'rua', 'cep')
+
+# Similaridade mínima para aceitar outro nome de logradouro: mais
+# tolerante entre as ruas do mesmo CEP do que na cidade inteira
+SIMILARIDADE_CEP = 0.75
+SIMILARIDADE_CIDADE = 0.85
+
+# Acima disso o número mais próximo já não diz muito sobre o endereço
+MAX_DIFERENCA_NUMERO = 200
+
+TAMANHO_LOTE = 500
+
+ABREVIACOES = {
+    'r': 'rua', 'av': 'avenida', 'al': 'alameda', 'tv': 'travessa', 'trav': 'travessa',
+    'pca': 'praca', 'pc': 'praca', 'est': 'estrada', 'estr': 'estrada', 'rod': 'rodovia',
+    'lgo': 'largo', 'lg': 'largo', 'vl': 'viela', 'pq': 'parque', 'jd': 'jardim',
+    'dr': 'doutor', 'prof': 'professor', 'cel': 'coronel', 'gal': 'general', 'gen': 'general',
+    'eng': 'engenheiro', 'pres': 'presidente', 'sto': 'santo', 'sta': 'santa', 'nsa': 'nossa',
+    'sra': 'senhora', 'vd': 'viaduto',
+}
+PALAVRAS_IGNORADAS = {'de', 'da', 'do', 'das', 'dos', 'e'}
+
+Sugestao = namedtuple('Sugestao', 'latitude longitude precisao fonte similaridade')
+
+
+# -----------------------------
+# Normalização
+# -----------------------------
+def _sem_acento(texto):
+    return unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii').lower()
+
+
+# muitos endereços repetem o mesmo logradouro/cidade: memoriza a normalização
+@lru_cache(maxsize=65536)
+def normalizar_logradouro(logradouro):
+    """'Av. Dr. Arnaldo, ' -> 'avenida doutor arnaldo'."""
+    palavras = re.findall(r'[a-z0-9]+', _sem_acento(logradouro))
+    palavras = [ABREVIACOES.get(p, p) for p in palavras]
+    return ' '.join(p for p in palavras if p not in PALAVRAS_IGNORADAS)
+
+
+@lru_cache(maxsize=4096)
+def normalizar_cidade(cidade):
+    return ' '.join(re.findall(r'[a-z0-9]+', _sem_acento(cidade)))
+
+
+def numero_inteiro(numero):
+    """'123', '123-A', 'nº 45' -> 123 / 45; 'S/N' ou vazio -> None."""
+    encontrado = re.search(r'\d+', str(numero or ''))
+    return int(encontrado.group()) if encontrado else None
+
+
+def _cep_ou_none(cep):
+    try:
+        return normalizar_cep(cep)
+    except ValueError:
+        return None
+
+
+def _media(pontos):
+    return (
+        sum(p[0] for p in pontos) / len(pontos),
+        sum(p[1] for p in pontos) / len(pontos),
+    )
+
+
+# -----------------------------
+# Índice em memória
+# -----------------------------
+class _Logradouro:
+    """Pontos conhecidos de um logradouro: (número, lat, lon)."""
+
+    def __init__(self):
+        self.numerados = defaultdict(list)   # número -> [(lat, lon), ...]
+        self.pontos = []                     # todos (lat, lon)
+
+    def adicionar(self, numero, latitude, longitude):
+        self.pontos.append((latitude, longitude))
+        if numero is not None:
+            self.numerados[numero].append((latitude, longitude))
+
+    def finalizar(self):
+        self.numeros = sorted(self.numerados)
+        self.centro = _media(self.pontos)
+
+    def localizar(self, numero):
+        """(lat, lon, precisao, detalhe) para o número no logradouro."""
+        if numero is None or not self.numeros:
+            return self.centro + ('rua', f"centro do logradouro ({len(self.pontos)} ponto(s))")
+
+        if numero in self.numerados:
+            pontos = self.numerados[numero]
+            return _media(pontos) + ('exato', f"{len(pontos)} solicitação(ões) no mesmo número")
+
+        i = bisect_left(self.numeros, numero)
+        anterior = self.numeros[i - 1] if i > 0 else None
+        seguinte = self.numeros[i] if i < len(self.numeros) else None
+
+        if anterior is not None and seguinte is not None:
+            lat_a, lon_a = _media(self.numerados[anterior])
+            lat_b, lon_b = _media(self.numerados[seguinte])
+            fracao = (numero - anterior) / (seguinte - anterior)
+            return (
+                lat_a + (lat_b - lat_a) * fracao,
+                lon_a + (lon_b - lon_a) * fracao,
+                'interpolado',
+                f"entre os números {anterior} e {seguinte}"
+            )
+
+        mais_proximo = anterior if seguinte is None else seguinte
+        if abs(mais_proximo - numero) <= MAX_DIFERENCA_NUMERO:
+            return _media(self.numerados[mais_proximo]) + ('rua', f"número conhecido mais próximo: {mais_proximo}")
+        return self.centro + ('rua', f"centro do logradouro ({len(self.pontos)} ponto(s))")
+
+
+class IndiceGeocodificacao:
+    def __init__(self):
+        self.logradouros = defaultdict(dict)        # (uf, cidade) -> {logradouro: _Logradouro}
+        self.logradouros_do_cep = defaultdict(set)  # cep -> {(uf, cidade, logradouro)}
+        self.pontos_do_cep = defaultdict(list)      # cep -> [(lat, lon)] das solicitações
+        self.centroides_cep = {}                    # cep -> (lat, lon) importado
+        self.cidade_do_cep = {}                     # cep -> (uf, cidade)
+        self.total_pontos = 0
+
+    def adicionar(self, cep, logradouro, numero, cidade, uf, latitude, longitude):
+        local = ((uf or '').upper(), normalizar_cidade(cidade))
+        rua = normalizar_logradouro(logradouro)
+        cep = _cep_ou_none(cep)
+
+        if rua:
+            registro = self.logradouros[local].get(rua)
+            if registro is None:
+                registro = self.logradouros[local][rua] = _Logradouro()
+            registro.adicionar(numero_inteiro(numero), latitude, longitude)
+        if cep:
+            self.pontos_do_cep[cep].append((latitude, longitude))
+            self.cidade_do_cep.setdefault(cep, local)
+            if rua:
+                self.logradouros_do_cep[cep].add(local + (rua,))
+        self.total_pontos += 1
+
+    def adicionar_cep(self, cep, logradouro, cidade, uf, latitude, longitude):
+        local = ((uf or '').upper(), normalizar_cidade(cidade))
+        self.cidade_do_cep[cep] = local
+        if latitude is not None and longitude is not None:
+            self.centroides_cep[cep] = (latitude, longitude)
+            rua = normalizar_logradouro(logradouro)
+            if rua:
+                self.logradouros_do_cep[cep].add(local + (rua,))
+                # centroide do logradouro conta como um ponto sem número
+                registro = self.logradouros[local].get(rua)
+                if registro is None:
+                    registro = self.logradouros[local][rua] = _Logradouro()
+                registro.adicionar(None, latitude, longitude)
+
+    def finalizar(self):
+        for ruas in self.logradouros.values():
+            for registro in ruas.values():
+                registro.finalizar()
+        return self
+
+    def _encontrar_logradouro(self, rua, cep, local):
+        """(_Logradouro, nome, similaridade) ou None."""
+        if local and rua in self.logradouros.get(local, {}):
+            return self.logradouros[local][rua], rua, 1.0
+
+        # Primeiro entre os logradouros do mesmo CEP, depois na cidade
+        if cep in self.logradouros_do_cep:
+            candidatos = {c[2]: c[:2] for c in self.logradouros_do_cep[cep]}
+            if rua in candidatos:
+                return self.logradouros[candidatos[rua]][rua], rua, 1.0
+            parecido = difflib.get_close_matches(rua, list(candidatos), n=1, cutoff=SIMILARIDADE_CEP)
+            if parecido:
+                nome = parecido[0]
+                return self.logradouros[candidatos[nome]][nome], nome, _similaridade(rua, nome)
+
+        if local and local in self.logradouros:
+            parecido = difflib.get_close_matches(rua, list(self.logradouros[local]), n=1, cutoff=SIMILARIDADE_CIDADE)
+            if parecido:
+                nome = parecido[0]
+                return self.logradouros[local][nome], nome, _similaridade(rua, nome)
+
+        return None
+
+    def resolver(self, logradouro, numero=None, cep=None, cidade=None, uf=None):
+        """Sugestao para o endereço, ou None se não houver nada parecido no índice."""
+        cep = _cep_ou_none(cep)
+        rua = normalizar_logradouro(logradouro)
+
+        if cidade and uf:
+            local = (uf.upper(), normalizar_cidade(cidade))
+        else:
+            local = self.cidade_do_cep.get(cep)
+
+        if rua:
+            encontrado = self._encontrar_logradouro(rua, cep, local)
+            if encontrado:
+                registro, nome, similaridade = encontrado
+                latitude, longitude, precisao, detalhe = registro.localizar(numero_inteiro(numero))
+                if similaridade < 1.0:
+                    detalhe = f"{detalhe}; logradouro parecido: '{nome}'"
+                return Sugestao(latitude, longitude, precisao, detalhe, round(similaridade, 2))
+
+        if cep in self.centroides_cep:
+            return Sugestao(*self.centroides_cep[cep], 'cep', "centroide do CEP (base importada)", 1.0)
+        if cep in self.pontos_do_cep:
+            pontos = self.pontos_do_cep[cep]
+            return Sugestao(*_media(pontos), 'cep', f"centro de {len(pontos)} solicitação(ões) do CEP", 1.0)
+        return None
+
+
+def _similaridade(a, b):
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def construir_indice():
+    """Monta o índice a partir do banco (solicitações + centroides de CEP)."""
+    indice = IndiceGeocodificacao()
+
+    for cep in db.session.query(Cep.cep, Cep.logradouro, Cep.cidade, Cep.uf, Cep.latitude, Cep.longitude) \
+            .yield_per(5000):
+        indice.adicionar_cep(*cep)
+
+    consulta = db.session.query(
+        Solicitacao.cep, Solicitacao.logradouro, Solicitacao.numero,
+        Solicitacao.cidade, Solicitacao.uf, Solicitacao.latitude, Solicitacao.longitude
+    ).filter(
+        Solicitacao.latitude.isnot(None),
+        Solicitacao.longitude.isnot(None),
+        Solicitacao.coordenadas_origem.is_(None)
+    ).yield_per(5000)
+    for linha in consulta:
+        indice.adicionar(*linha)
+
+    return indice.finalizar()
+
+
+_indice = None
+_chave_indice = None
+_lock_indice = threading.Lock()
+
+
+def _chave_atual():
+    """
+    Muda quando endereços/coordenadas das solicitações ou os CEPs mudam
+    (troca de status e outras edições não remontam o índice).
+    """
+    ceps = db.session.query(db.func.count(Cep.cep), db.func.max(Cep.atualizado_em)).one()
+    return (versao_dados(ESCOPO_ENDERECOS),) + tuple(ceps)
+
+
+def obter_indice():
+    """Índice em memória, remontado só quando os dados de origem mudaram."""
+    global _indice, _chave_indice
+    chave = _chave_atual()
+    with _lock_indice:
+        if _indice is None or _chave_indice != chave:
+            _indice = construir_indice()
+            _chave_indice = chave
+        return _indice
+
+
+def sugerir_coordenadas(solicitacao, indice=None):
+    """Sugestao para uma solicitação (não grava nada)."""
+    indice = indice or obter_indice()
+    return indice.resolver(
+        solicitacao.logradouro, solicitacao.numero, solicitacao.cep,
+        solicitacao.cidade, solicitacao.uf
+    )
+
+
+# -----------------------------
+# Preenchimento em lote
+# -----------------------------
+def preencher_coordenadas(precisao_minima='rua', limite=None):
+    """
+    Preenche latitude/longitude das solicitações sem coordenadas, quando a
+    sugestão tiver pelo menos `precisao_minima`. Grava em lotes e marca
+    `coordenadas_origem` com a precisão usada. Retorna um Counter por
+    precisão ('sem_sugestao' para as que ficaram de fora).
+    """
+    aceitas = PRECISOES[:PRECISOES.index(precisao_minima) + 1]
+    indice = construir_indice()
+    resumo = Counter()
+
+    consulta = db.session.query(Solicitacao.id).filter(
+        db.or_(Solicitacao.latitude.is_(None), Solicitacao.longitude.is_(None))
+    ).order_by(Solicitacao.id)
+    if limite:
+        consulta = consulta.limit(limite)
+    ids = [id for (id,) in consulta]
+
+    for inicio in range(0, len(ids), TAMANHO_LOTE):
+        lote = Solicitacao.query.filter(Solicitacao.id.in_(ids[inicio:inicio + TAMANHO_LOTE])).all()
+        for solicitacao in lote:
+            sugestao = sugerir_coordenadas(solicitacao, indice)
+            if sugestao is None or sugestao.precisao not in aceitas:
+                resumo['sem_sugestao'] += 1
+                continue
+            solicitacao.latitude = sugestao.latitude
+            solicitacao.longitude = sugestao.longitude
+            solicitacao.coordenadas_origem = sugestao.precisao
+            resumo[sugestao.precisao] += 1
+        db.session.commit()
+
+    return resumo
+
+
+geocodificar_cli = AppGroup('geocodificar', help='Geocodificador offline de endereços.')
+
+
+@geocodificar_cli.command('preencher')
+@click.option('--precisao', type=click.Choice(PRECISOES), default='rua', show_default=True,
+              help='Precisão mínima aceita para gravar as coordenadas.')
+@click.option('--limite', type=int, default=None, help='Máximo de solicitações processadas.')
+def preencher_comando(precisao, limite):
+    """Preenche as coordenadas que faltam a partir do índice local."""
+    resumo = preencher_coordenadas(precisao, limite)
+    preenchidas = sum(resumo[p] for p in PRECISOES)
+    detalhes = ", ".join(f"{p}: {resumo[p]}" for p in PRECISOES if resumo[p])
+    click.echo(f"Coordenadas preenchidas: {preenchidas} ({detalhes or 'nenhuma'}); sem sugestão: {resumo['sem_sugestao']}.")
@@ -0,0 +1,135 @@
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from flask import current_app
+
+# matplotlib é opcional — tentamos importar e marcamos se disponível
+try:
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    MATPLOTLIB_AVAILABLE = True
+except Exception:
+    MATPLOTLIB_AVAILABLE = False
+
+# =======================================================================
+# Gráficos dos Relatórios (PNG)
+# =======================================================================
+# Cada gráfico é uma função pura: recebe as séries e devolve os bytes do
+# PNG. Usa a API orientada a objetos (Figure + canvas Agg), sem o estado
+# global do pyplot, então é seguro em servidor com threads.
+#
+# Os três gráficos do PDF são desenhados em paralelo num pool de processos
+# e memorizados pelas séries de entrada: relatórios repetidos reaproveitam
+# os PNGs já gerados.
+
+MAX_MEMORIA = 64
+
+_memoria = OrderedDict()
+_lock_memoria = threading.Lock()
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _png(fig):
+    fig.tight_layout()
+    bio = BytesIO()
+    fig.savefig(bio, format='png', dpi=150, bbox_inches='tight')
+    return bio.getvalue()
+
+
+def _nova_figura(largura, altura):
+    fig = Figure(figsize=(largura, altura))
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def grafico_status(labels, values):
+    """Pizza: distribuição por status."""
+    fig, ax = _nova_figura(6, 3)
+    ax.pie(list(values) or [1], labels=list(labels), autopct=lambda p: f'{p:.0f}%' if p > 0 else '', startangle=90, textprops={'fontsize': 8})
+    ax.axis('equal')
+    return _png(fig)
+
+
+def grafico_top_uvis(nomes, valores):
+    """Barras horizontais: UVIS com mais solicitações."""
+    fig, ax = _nova_figura(8, 2.6)
+    ax.barh(list(nomes)[::-1] or ['Nenhum'], list(valores)[::-1] or [0])
+    ax.set_xlabel('Total')
+    ax.set_title('Top UVIS (maiores)', fontsize=9)
+    ax.tick_params(axis='y', labelsize=8)
+    return _png(fig)
+
+
+def grafico_mensal(meses, totais):
+    """Linha: histórico mensal."""
+    fig, ax = _nova_figura(8, 2.6)
+    if meses:
+        ax.plot(list(meses), list(totais), marker='o', linewidth=1)
+        ax.tick_params(axis='x', labelrotation=45, labelsize=8)
+    ax.set_title('Histórico Mensal', fontsize=9)
+    ax.grid(axis='y', linestyle=':', linewidth=0.5)
+    return _png(fig)
+
+
+def _obter_pool():
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            # 'spawn': não herda threads/conexões do processo do servidor
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config.get('GRAFICOS_PROCESSOS', 3),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def renderizar(pedidos):
+    """
+    Renderiza vários gráficos em paralelo.
+    pedidos: lista de (funcao, *series) — as séries devem ser tuplas (hasheáveis).
+    Retorna a lista de PNGs (bytes), na mesma ordem.
+    """
+    resultados = [None] * len(pedidos)
+    pendentes = {}
+
+    with _lock_memoria:
+        for i, pedido in enumerate(pedidos):
+            chave = (pedido[0].__name__,) + tuple(pedido[1:])
+            if chave in _memoria:
+                _memoria.move_to_end(chave)
+                resultados[i] = _memoria[chave]
+            else:
+                pendentes[i] = chave
+
+    if pendentes:
+        try:
+            pool = _obter_pool()
+            futuros = {i: pool.submit(*pedidos[i]) for i in pendentes}
+            prontos = {i: futuro.result() for i, futuro in futuros.items()}
+        except Exception:
+            # pool indisponível (ex.: ambiente sem multiprocessing): desenha aqui mesmo
+            current_app.logger.warning("Pool de gráficos indisponível; renderizando no processo atual.")
+            prontos = {i: pedidos[i][0](*pedidos[i][1:]) for i in pendentes}
+
+        with _lock_memoria:
+            for i, png in prontos.items():
+                resultados[i] = png
+                _memoria[pendentes[i]] = png
+                while len(_memoria) > MAX_MEMORIA:
+                    _memoria.popitem(last=False)
+
+    return resultados
+
+
+def graficos_relatorio(dados_status, dados_unidade, dados_mensais):
+    """Os três gráficos do PDF mensal: status, top UVIS e histórico."""
+    return renderizar([
+        (grafico_status, tuple(s for s, _ in dados_status), tuple(c for _, c in dados_status)),
+        (grafico_top_uvis, tuple(u for u, _ in dados_unidade[:8]), tuple(c for _, c in dados_unidade[:8])),
+        (grafico_mensal, tuple(m for m, _ in dados_mensais), tuple(c for _, c in dados_mensais)),
+    ])
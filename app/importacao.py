@@ -0,0 +1,362 @@
+import csv
+import io
+import os
+from collections import namedtuple
+from datetime import datetime, date, time
+from itertools import islice
+
+import click
+from flask.cli import AppGroup
+from openpyxl import load_workbook
+
+from app import db
+from app.models import Usuario
+from app.cep import normalizar_cep, validar_endereco, buscar_ceps, texto_comparavel, limpar_texto
+from app.geo import converter_coordenada, celula_geo
+from app.efeitos import inserir_em_massa
+
+# =======================================================================
+# Importação em Lote de Solicitações (CSV / XLSX)
+# =======================================================================
+# Para as UVIS que ainda mandam planilhas. O arquivo é lido em streaming
+# (csv.reader / openpyxl read_only) e processado em lotes de TAMANHO_LOTE
+# linhas: valida o lote (CEPs do lote consultados numa query só) e insere
+# as linhas válidas com um INSERT em massa (app/efeitos.py: autor, cópia
+# da UVIS, estatísticas, versões e CEPs aprendidos, como pelo ORM).
+#
+# Tudo numa transação só: um arquivo que quebra no meio (ex.: CSV que
+# deixa de ser UTF-8 na linha 5000) não deixa importação pela metade.
+#
+# Linhas inválidas não interrompem a importação: voltam no relatório de
+# erros (número da linha na planilha + mensagem).
+
+TAMANHO_LOTE = 2000
+
+# Coluna da planilha (normalizada) -> campo
+SINONIMOS_COLUNAS = {
+    'data': 'data', 'data_agendamento': 'data', 'data_do_voo': 'data',
+    'hora': 'hora', 'hora_agendamento': 'hora', 'hora_inicio': 'hora', 'horario': 'hora',
+    'foco': 'foco',
+    'tipo_visita': 'tipo_visita', 'tipo_de_visita': 'tipo_visita', 'tipo_de_operacao': 'tipo_visita',
+    'altura_voo': 'altura_voo', 'altura': 'altura_voo', 'altura_do_voo': 'altura_voo',
+    'altura_maxima_m': 'altura_voo',
+    'criadouro': 'criadouro',
+    'apoio_cet': 'apoio_cet', 'cet': 'apoio_cet',
+    'observacao': 'observacao', 'observacoes': 'observacao', 'obs': 'observacao',
+    'cep': 'cep',
+    'logradouro': 'logradouro', 'endereco': 'logradouro', 'rua': 'logradouro',
+    'numero': 'numero', 'n': 'numero', 'no': 'numero',
+    'complemento': 'complemento',
+    'bairro': 'bairro',
+    'cidade': 'cidade', 'municipio': 'cidade', 'localidade': 'cidade',
+    'uf': 'uf', 'estado': 'uf',
+    'latitude': 'latitude', 'lat': 'latitude',
+    'longitude': 'longitude', 'lon': 'longitude', 'lng': 'longitude',
+}
+OBRIGATORIAS = ('data', 'hora', 'foco', 'cep', 'logradouro', 'bairro', 'cidade', 'uf')
+
+# Mesmos valores do formulário de cadastro
+TIPOS_VISITA = ('monitoramento', 'aedes', 'culex')
+ALTURAS_VOO = ('10m', '20m', '30m', '40m')
+
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y')
+FORMATOS_HORA = ('%H:%M', '%H:%M:%S', '%Hh%M')
+
+VERDADEIROS = {'sim', 's', 'x', 'true', '1', 'yes'}
+FALSOS = {'nao', 'n', 'false', '0', 'no', ''}
+
+# Tamanhos das colunas de texto livre
+TAMANHOS = {'foco': 50, 'numero': 20, 'complemento': 100}
+
+ErroLinha = namedtuple('ErroLinha', 'linha mensagem')
+ResultadoImportacao = namedtuple('ResultadoImportacao', 'importadas erros linhas')
+
+
+# -----------------------------
+# Leitura do arquivo
+# -----------------------------
+ERRO_CODIFICACAO = "o CSV não está em UTF-8 (perto da linha {linha}). Salve a planilha como \"CSV UTF-8\"."
+
+
+def _linhas_csv(arquivo):
+    if not isinstance(arquivo, io.TextIOBase):
+        arquivo = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    try:
+        amostra = arquivo.read(4096)
+    except UnicodeDecodeError:
+        raise ValueError(ERRO_CODIFICACAO.format(linha=1))
+    arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+    except csv.Error:
+        dialeto = csv.excel
+    return _decodificadas(csv.reader(arquivo, dialeto))
+
+
+def _decodificadas(leitor):
+    try:
+        yield from leitor
+    except UnicodeDecodeError:
+        raise ValueError(ERRO_CODIFICACAO.format(linha=leitor.line_num + 1))
+
+
+def _linhas_xlsx(arquivo):
+    planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+    return planilha.iter_rows(values_only=True)
+
+
+def ler_linhas(arquivo, nome_arquivo):
+    """Iterador de linhas (listas de valores) do CSV ou XLSX; a primeira é o cabeçalho."""
+    extensao = os.path.splitext(nome_arquivo or '')[1].lower()
+    if extensao == '.xlsx':
+        return _linhas_xlsx(arquivo)
+    if extensao in ('.csv', '.txt'):
+        return _linhas_csv(arquivo)
+    raise ValueError("Formato não suportado: envie um arquivo .csv ou .xlsx.")
+
+
+def _valor_celula(valor):
+    # XLSX: número inteiro digitado na célula chega como float (ex.: 123.0)
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _mapear_cabecalho(cabecalho):
+    mapa = {}
+    for i, nome in enumerate(cabecalho or []):
+        campo = SINONIMOS_COLUNAS.get(texto_comparavel(nome).replace(' ', '_').replace('.', ''))
+        if campo and campo not in mapa:
+            mapa[campo] = i
+    faltando = [campo for campo in OBRIGATORIAS if campo not in mapa]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}.")
+    return mapa
+
+
+# -----------------------------
+# Conversão / validação de uma linha
+# -----------------------------
+def _data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = limpar_texto(valor)
+    try:
+        return date.fromisoformat(texto)  # caminho rápido: AAAA-MM-DD
+    except ValueError:
+        pass
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Data inválida: '{texto}' (use AAAA-MM-DD ou DD/MM/AAAA).")
+
+
+def _hora(valor):
+    if isinstance(valor, datetime):
+        return valor.time().replace(second=0, microsecond=0)
+    if isinstance(valor, time):
+        return valor.replace(second=0, microsecond=0)
+    texto = limpar_texto(valor)
+    partes = texto.split(':')
+    if 2 <= len(partes) <= 3 and all(p.isdigit() for p in partes):
+        # caminho rápido: H:MM / HH:MM[:SS]
+        try:
+            return time(int(partes[0]), int(partes[1]))
+        except ValueError:
+            raise ValueError(f"Hora inválida: '{texto}' (use HH:MM).")
+    for formato in FORMATOS_HORA:
+        try:
+            return datetime.strptime(texto, formato).time()
+        except ValueError:
+            pass
+    raise ValueError(f"Hora inválida: '{texto}' (use HH:MM).")
+
+
+def _booleano(valor, rotulo):
+    if isinstance(valor, bool):
+        return valor
+    texto = texto_comparavel(valor)
+    if texto in VERDADEIROS:
+        return True
+    if texto in FALSOS:
+        return False
+    raise ValueError(f"{rotulo}: use SIM ou NÃO (recebido '{limpar_texto(valor)}').")
+
+
+def _tipo_visita(valor):
+    texto = texto_comparavel(valor)
+    if not texto:
+        return None
+    if texto not in TIPOS_VISITA:
+        raise ValueError(f"Tipo de visita inválido: '{limpar_texto(valor)}' (use {', '.join(TIPOS_VISITA)}).")
+    return texto
+
+
+def _altura_voo(valor):
+    # '30', '30m', '30 m', '30 metros' -> '30m'
+    texto = texto_comparavel(valor).replace(' ', '').replace('metros', 'm')
+    if not texto:
+        return None
+    if not texto.endswith('m'):
+        texto += 'm'
+    if texto not in ALTURAS_VOO:
+        raise ValueError(f"Altura de voo inválida: '{limpar_texto(valor)}' (use {', '.join(ALTURAS_VOO)}).")
+    return texto
+
+
+def _limitado(valor, campo, rotulo):
+    texto = limpar_texto(valor)
+    if len(texto) > TAMANHOS[campo]:
+        raise ValueError(f"{rotulo} deve ter no máximo {TAMANHOS[campo]} caracteres.")
+    return texto or None
+
+
+def validar_linha(valores, conhecidos):
+    """
+    {campo: valor bruto} -> dict pronto para o INSERT em `solicitacoes`
+    (sem usuario_id/data_criacao). Gera ValueError na primeira inconsistência.
+    """
+    foco = _limitado(valores.get('foco'), 'foco', 'Foco')
+    if not foco:
+        raise ValueError("Foco é obrigatório.")
+
+    linha = {
+        'data_agendamento': _data(valores.get('data')),
+        'hora_agendamento': _hora(valores.get('hora')),
+        'foco': foco,
+        'tipo_visita': _tipo_visita(valores.get('tipo_visita')),
+        'altura_voo': _altura_voo(valores.get('altura_voo')),
+        'criadouro': _booleano(valores.get('criadouro'), 'Criadouro'),
+        'apoio_cet': _booleano(valores.get('apoio_cet'), 'Apoio CET'),
+        'observacao': limpar_texto(valores.get('observacao')) or None,
+        'numero': _limitado(valores.get('numero'), 'numero', 'Número'),
+        'complemento': _limitado(valores.get('complemento'), 'complemento', 'Complemento'),
+        'status': 'PENDENTE',
+    }
+    linha.update(validar_endereco(
+        valores.get('cep'), valores.get('logradouro'), valores.get('bairro'),
+        valores.get('cidade'), valores.get('uf'), conhecidos=conhecidos
+    ))
+
+    latitude = converter_coordenada(valores.get('latitude'), 'latitude')
+    longitude = converter_coordenada(valores.get('longitude'), 'longitude')
+    if (latitude is None) != (longitude is None):
+        raise ValueError("Informe latitude e longitude juntas (ou nenhuma).")
+    linha.update(latitude=latitude, longitude=longitude, celula_geo=celula_geo(latitude, longitude))
+    return linha
+
+
+# -----------------------------
+# Importação
+# -----------------------------
+def _digitos_cep(valor):
+    try:
+        return normalizar_cep(valor)
+    except ValueError:
+        return None
+
+
+def importar_solicitacoes(arquivo, nome_arquivo, usuario_id):
+    """
+    Importa as linhas válidas do arquivo para a UVIS `usuario_id`, numa
+    transação. ValueError se o arquivo em si for inválido (formato,
+    cabeçalho, codificação); nesse caso nada é gravado.
+    """
+    try:
+        resultado = _importar(arquivo, nome_arquivo, usuario_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return resultado
+
+
+def _importar(arquivo, nome_arquivo, usuario_id):
+    linhas = ler_linhas(arquivo, nome_arquivo)
+    mapa = _mapear_cabecalho(next(linhas, None))
+
+    importadas = 0
+    total = 0
+    erros = []
+    numero_linha = 1  # cabeçalho
+
+    while True:
+        lote = []
+        lidas = 0
+        for bruta in islice(linhas, TAMANHO_LOTE):
+            lidas += 1
+            numero_linha += 1
+            if all(v is None or not str(v).strip() for v in bruta):
+                continue  # linha em branco
+            valores = {campo: _valor_celula(bruta[i]) if i < len(bruta) else None for campo, i in mapa.items()}
+            if isinstance(valores['cep'], int):
+                valores['cep'] = f"{valores['cep']:08d}"  # célula numérica perde o zero à esquerda
+            lote.append((numero_linha, valores))
+        if not lidas:
+            break
+        if not lote:
+            continue
+
+        total += len(lote)
+        conhecidos = buscar_ceps(filter(None, (_digitos_cep(v.get('cep')) for _, v in lote)))
+
+        validas = []
+        for numero, valores in lote:
+            try:
+                validas.append(validar_linha(valores, conhecidos))
+            except ValueError as ve:
+                erros.append(ErroLinha(numero, str(ve)))
+
+        if validas:
+            inserir_em_massa(validas, usuario_id)
+            importadas += len(validas)
+
+    return ResultadoImportacao(importadas, erros, total)
+
+
+def escrever_relatorio_erros(erros, arquivo):
+    """Relatório de erros em CSV (';', UTF-8 com BOM, como a exportação SARPAS)."""
+    escritor = csv.writer(arquivo, delimiter=';')
+    escritor.writerow(["Linha", "Erro"])
+    for erro in erros:
+        escritor.writerow([erro.linha, erro.mensagem])
+
+
+# -----------------------------
+# Linha de comando
+# -----------------------------
+importar_cli = AppGroup('importar', help='Importação em lote de solicitações.')
+
+
+@importar_cli.command('solicitacoes')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--uvis', 'login', required=True, help='Login da UVIS dona das solicitações.')
+@click.option('--relatorio', type=click.Path(dir_okay=False), default=None,
+              help='Grava o relatório de erros (CSV) neste caminho.')
+def importar_comando(arquivo, login, relatorio):
+    """Importa solicitações de um CSV ou XLSX."""
+    usuario = Usuario.query.filter_by(login=login).first()
+    if usuario is None:
+        raise click.BadParameter(f"usuário '{login}' não encontrado.", param_hint='--uvis')
+
+    with open(arquivo, 'rb') as entrada:
+        try:
+            resultado = importar_solicitacoes(entrada, arquivo, usuario.id)
+        except ValueError as ve:
+            raise click.ClickException(str(ve))
+
+    click.echo(f"Linhas lidas: {resultado.linhas} | importadas: {resultado.importadas} | com erro: {len(resultado.erros)}")
+    if resultado.erros:
+        if relatorio:
+            with open(relatorio, 'w', newline='', encoding='utf-8-sig') as saida:
+                escrever_relatorio_erros(resultado.erros, saida)
+            click.echo(f"Relatório de erros: {relatorio}")
+        else:
+            for erro in resultado.erros[:20]:
+                click.echo(f"  linha {erro.linha}: {erro.mensagem}")
+            if len(resultado.erros) > 20:
+                click.echo("  ... (use --relatorio para a lista completa)")
@@ -90,9 +90,20 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # índice de busca textual (FTS5 / coluna tsvector) é mantido por SQL
+    # próprio na migração, fora dos modelos: o autogenerate não deve removê-lo
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'table' and name.startswith('solicitacoes_busca'):
+            return False
+        if type_ in ('column', 'index') and name in ('busca', 'ix_solicitacoes_busca'):
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,27 @@
+"""Index solicitacoes.data_criacao
+
+Revision ID: 4f1c2a9d7b3e
+Revises: cd09f940837b
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1c2a9d7b3e'
+down_revision = 'cd09f940837b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filtros de mês/ano usam intervalos [inicio, fim) sobre data_criacao
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_solicitacoes_data_criacao'), ['data_criacao'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_solicitacoes_data_criacao'))
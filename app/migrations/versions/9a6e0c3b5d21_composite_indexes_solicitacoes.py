@@ -0,0 +1,35 @@
+"""Composite indexes for solicitacoes access paths
+
+Revision ID: 9a6e0c3b5d21
+Revises: 4f1c2a9d7b3e
+Create Date: 2026-10-18 10:03:54.118620
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6e0c3b5d21'
+down_revision = '4f1c2a9d7b3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        # Dashboard UVIS: usuario_id (+ status) ordenado por data_criacao desc
+        batch_op.create_index('ix_solicitacoes_usuario_status_criacao', ['usuario_id', 'status', 'data_criacao'], unique=False)
+        batch_op.create_index('ix_solicitacoes_usuario_criacao', ['usuario_id', 'data_criacao'], unique=False)
+        # Painel de gestão: status ordenado por data_criacao desc
+        batch_op.create_index('ix_solicitacoes_status_criacao', ['status', 'data_criacao'], unique=False)
+        # Agenda: busca por data do voo
+        batch_op.create_index('ix_solicitacoes_data_agendamento', ['data_agendamento', 'hora_agendamento'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.drop_index('ix_solicitacoes_data_agendamento')
+        batch_op.drop_index('ix_solicitacoes_status_criacao')
+        batch_op.drop_index('ix_solicitacoes_usuario_criacao')
+        batch_op.drop_index('ix_solicitacoes_usuario_status_criacao')
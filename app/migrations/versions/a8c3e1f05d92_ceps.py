@@ -0,0 +1,77 @@
+"""Local CEP table, filled from the addresses already in solicitacoes
+
+Revision ID: a8c3e1f05d92
+Revises: f3b9d6a04c1e
+Create Date: 2026-10-18 16:05:12.481930
+
+"""
+import re
+from collections import Counter
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c3e1f05d92'
+down_revision = 'f3b9d6a04c1e'
+branch_labels = None
+depends_on = None
+
+
+UFS = {
+    'AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+    'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO',
+}
+
+
+def _texto(valor):
+    return re.sub(r'\s+', ' ', str(valor or '')).strip()
+
+
+def upgrade():
+    ceps = op.create_table('ceps',
+        sa.Column('cep', sa.String(length=8), nullable=False),
+        sa.Column('logradouro', sa.String(length=150), nullable=True),
+        sa.Column('bairro', sa.String(length=100), nullable=True),
+        sa.Column('cidade', sa.String(length=100), nullable=False),
+        sa.Column('uf', sa.String(length=2), nullable=False),
+        sa.Column('origem', sa.String(length=20), nullable=False),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('cep')
+    )
+
+    # Backfill: endereço mais frequente de cada CEP das solicitações
+    solicitacoes = sa.table('solicitacoes',
+        sa.column('cep', sa.String),
+        sa.column('logradouro', sa.String),
+        sa.column('bairro', sa.String),
+        sa.column('cidade', sa.String),
+        sa.column('uf', sa.String),
+    )
+    contagem = Counter()
+    for cep, logradouro, bairro, cidade, uf in op.get_bind().execute(sa.select(
+        solicitacoes.c.cep, solicitacoes.c.logradouro, solicitacoes.c.bairro,
+        solicitacoes.c.cidade, solicitacoes.c.uf
+    )):
+        cep = re.sub(r'\D', '', str(cep or ''))
+        uf = _texto(uf).upper()
+        cidade = _texto(cidade)
+        if len(cep) != 8 or uf not in UFS or not cidade:
+            continue
+        contagem[(cep, _texto(logradouro)[:150] or None, _texto(bairro)[:100] or None, cidade[:100], uf)] += 1
+
+    linhas = {}
+    agora = datetime.utcnow()
+    for (cep, logradouro, bairro, cidade, uf), _ in contagem.most_common():
+        linhas.setdefault(cep, {
+            'cep': cep, 'logradouro': logradouro, 'bairro': bairro, 'cidade': cidade,
+            'uf': uf, 'origem': 'solicitacoes', 'atualizado_em': agora,
+        })
+    if linhas:
+        op.bulk_insert(ceps, list(linhas.values()))
+
+
+def downgrade():
+    op.drop_table('ceps')
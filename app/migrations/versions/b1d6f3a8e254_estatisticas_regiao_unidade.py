@@ -0,0 +1,65 @@
+"""Region/unit counters in estatisticas_mensais (from the copy on solicitacoes)
+
+Revision ID: b1d6f3a8e254
+Revises: e7c1a5d3f920
+Create Date: 2026-10-18 21:12:40.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1d6f3a8e254'
+down_revision = 'e7c1a5d3f920'
+branch_labels = None
+depends_on = None
+
+
+DIMENSOES = ('regiao', 'nome_uvis')
+
+
+def upgrade():
+    # valor passa a guardar o nome da UVIS (até 100 caracteres)
+    with op.batch_alter_table('estatisticas_mensais', schema=None) as batch_op:
+        batch_op.alter_column('valor', existing_type=sa.String(length=50), type_=sa.String(length=100),
+                              existing_nullable=False)
+
+    # Backfill a partir das solicitações existentes
+    estatisticas = sa.table('estatisticas_mensais',
+        sa.column('ano', sa.Integer),
+        sa.column('mes', sa.Integer),
+        sa.column('usuario_id', sa.Integer),
+        sa.column('dimensao', sa.String),
+        sa.column('valor', sa.String),
+        sa.column('total', sa.Integer),
+    )
+    solicitacoes = sa.table('solicitacoes',
+        sa.column('id', sa.Integer),
+        sa.column('usuario_id', sa.Integer),
+        sa.column('data_criacao', sa.DateTime),
+        sa.column('regiao', sa.String),
+        sa.column('nome_uvis', sa.String),
+    )
+    ano = sa.cast(sa.extract('year', solicitacoes.c.data_criacao), sa.Integer)
+    mes = sa.cast(sa.extract('month', solicitacoes.c.data_criacao), sa.Integer)
+
+    for dimensao in DIMENSOES:
+        valor = sa.func.coalesce(solicitacoes.c[dimensao], '')
+        consulta = (
+            sa.select(ano, mes, solicitacoes.c.usuario_id, sa.literal(dimensao), valor, sa.func.count(solicitacoes.c.id))
+            .where(solicitacoes.c.data_criacao.isnot(None))
+            .group_by(ano, mes, solicitacoes.c.usuario_id, valor)
+        )
+        op.execute(estatisticas.insert().from_select(
+            ['ano', 'mes', 'usuario_id', 'dimensao', 'valor', 'total'], consulta
+        ))
+
+
+def downgrade():
+    estatisticas = sa.table('estatisticas_mensais', sa.column('dimensao', sa.String))
+    op.execute(estatisticas.delete().where(estatisticas.c.dimensao.in_(DIMENSOES)))
+
+    with op.batch_alter_table('estatisticas_mensais', schema=None) as batch_op:
+        batch_op.alter_column('valor', existing_type=sa.String(length=100), type_=sa.String(length=50),
+                              existing_nullable=False)
@@ -0,0 +1,29 @@
+"""Data version counters (versoes_dados)
+
+Revision ID: b7d41e2c9f08
+Revises: 9a6e0c3b5d21
+Create Date: 2026-10-18 13:40:02.551873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41e2c9f08'
+down_revision = '9a6e0c3b5d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('versoes_dados',
+    sa.Column('escopo', sa.String(length=50), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('escopo')
+    )
+
+
+def downgrade():
+    op.drop_table('versoes_dados')
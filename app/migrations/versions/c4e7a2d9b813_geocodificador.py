@@ -0,0 +1,35 @@
+"""CEP centroids and origin of automatically filled coordinates
+
+Revision ID: c4e7a2d9b813
+Revises: a8c3e1f05d92
+Create Date: 2026-10-18 17:21:44.106382
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a2d9b813'
+down_revision = 'a8c3e1f05d92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ceps', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+    # Coordenadas já existentes contam como digitadas (NULL)
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('coordenadas_origem', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.drop_column('coordenadas_origem')
+
+    with op.batch_alter_table('ceps', schema=None) as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -0,0 +1,100 @@
+"""Full-text search index over addresses, observations and protocols
+
+Revision ID: d2f8b4a61c07
+Revises: c4e7a2d9b813
+Create Date: 2026-10-18 18:02:37.554210
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f8b4a61c07'
+down_revision = 'c4e7a2d9b813'
+branch_labels = None
+depends_on = None
+
+
+COLUNAS = 'logradouro, bairro, cidade, cep, observacao, protocolo'
+
+# CEP sem hífen, para "01001-000" e "01001000" acharem o mesmo registro
+VALORES = "{p}.logradouro, {p}.bairro, {p}.cidade, replace({p}.cep, '-', ''), {p}.observacao, {p}.protocolo"
+
+
+def _upgrade_sqlite():
+    op.execute(
+        f"CREATE VIRTUAL TABLE solicitacoes_busca USING fts5({COLUNAS}, "
+        "prefix = '2 3 4', tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER solicitacoes_busca_ai AFTER INSERT ON solicitacoes BEGIN "
+        f"INSERT INTO solicitacoes_busca(rowid, {COLUNAS}) VALUES (new.id, {VALORES.format(p='new')}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER solicitacoes_busca_ad AFTER DELETE ON solicitacoes BEGIN "
+        "DELETE FROM solicitacoes_busca WHERE rowid = old.id; END"
+    )
+    op.execute(
+        f"CREATE TRIGGER solicitacoes_busca_au AFTER UPDATE OF {COLUNAS} ON solicitacoes BEGIN "
+        "DELETE FROM solicitacoes_busca WHERE rowid = old.id; "
+        f"INSERT INTO solicitacoes_busca(rowid, {COLUNAS}) VALUES (new.id, {VALORES.format(p='new')}); END"
+    )
+    op.execute(
+        f"INSERT INTO solicitacoes_busca(rowid, {COLUNAS}) "
+        f"SELECT id, {VALORES.format(p='solicitacoes')} FROM solicitacoes"
+    )
+
+
+def _upgrade_postgresql():
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pt_sem_acento') THEN
+                CREATE TEXT SEARCH CONFIGURATION pt_sem_acento (COPY = portuguese);
+                ALTER TEXT SEARCH CONFIGURATION pt_sem_acento
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+            END IF;
+        END $$
+    """)
+    op.execute("ALTER TABLE solicitacoes ADD COLUMN busca tsvector")
+    op.execute("""
+        CREATE FUNCTION solicitacoes_busca_atualizar() RETURNS trigger AS $$
+        BEGIN
+            NEW.busca :=
+                setweight(to_tsvector('pt_sem_acento', coalesce(NEW.protocolo, '')), 'A') ||
+                setweight(to_tsvector('simple', replace(coalesce(NEW.cep, ''), '-', '')), 'A') ||
+                setweight(to_tsvector('pt_sem_acento', coalesce(NEW.logradouro, '')), 'B') ||
+                setweight(to_tsvector('pt_sem_acento', coalesce(NEW.bairro, '') || ' ' || coalesce(NEW.cidade, '')), 'C') ||
+                setweight(to_tsvector('pt_sem_acento', coalesce(NEW.observacao, '')), 'D');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f"""
+        CREATE TRIGGER solicitacoes_busca_tg BEFORE INSERT OR UPDATE OF {COLUNAS}
+        ON solicitacoes FOR EACH ROW EXECUTE FUNCTION solicitacoes_busca_atualizar()
+    """)
+    # dispara o trigger nas linhas existentes
+    op.execute("UPDATE solicitacoes SET protocolo = protocolo")
+    op.execute("CREATE INDEX ix_solicitacoes_busca ON solicitacoes USING gin (busca)")
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+    else:
+        _upgrade_sqlite()
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_solicitacoes_busca")
+        op.execute("DROP TRIGGER IF EXISTS solicitacoes_busca_tg ON solicitacoes")
+        op.execute("DROP FUNCTION IF EXISTS solicitacoes_busca_atualizar()")
+        op.execute("ALTER TABLE solicitacoes DROP COLUMN IF EXISTS busca")
+        op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS pt_sem_acento")
+    else:
+        op.execute("DROP TRIGGER IF EXISTS solicitacoes_busca_au")
+        op.execute("DROP TRIGGER IF EXISTS solicitacoes_busca_ad")
+        op.execute("DROP TRIGGER IF EXISTS solicitacoes_busca_ai")
+        op.execute("DROP TABLE IF EXISTS solicitacoes_busca")
@@ -0,0 +1,65 @@
+"""Monthly statistics rollup (estatisticas_mensais)
+
+Revision ID: e5a2c8f17b34
+Revises: b7d41e2c9f08
+Create Date: 2026-10-18 14:05:11.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a2c8f17b34'
+down_revision = 'b7d41e2c9f08'
+branch_labels = None
+depends_on = None
+
+
+DIMENSOES = ('total', 'status', 'foco', 'tipo_visita', 'altura_voo')
+
+
+def upgrade():
+    estatisticas = op.create_table('estatisticas_mensais',
+    sa.Column('ano', sa.Integer(), nullable=False),
+    sa.Column('mes', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('dimensao', sa.String(length=20), nullable=False),
+    sa.Column('valor', sa.String(length=50), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('ano', 'mes', 'usuario_id', 'dimensao', 'valor')
+    )
+
+    # Backfill a partir das solicitações existentes
+    solicitacoes = sa.table('solicitacoes',
+        sa.column('id', sa.Integer),
+        sa.column('usuario_id', sa.Integer),
+        sa.column('data_criacao', sa.DateTime),
+        sa.column('status', sa.String),
+        sa.column('foco', sa.String),
+        sa.column('tipo_visita', sa.String),
+        sa.column('altura_voo', sa.String),
+    )
+    ano = sa.cast(sa.extract('year', solicitacoes.c.data_criacao), sa.Integer)
+    mes = sa.cast(sa.extract('month', solicitacoes.c.data_criacao), sa.Integer)
+
+    for dimensao in DIMENSOES:
+        agrupamento = [ano, mes, solicitacoes.c.usuario_id]
+        if dimensao == 'total':
+            valor = sa.literal('')
+        else:
+            valor = sa.func.coalesce(solicitacoes.c[dimensao], '')
+            agrupamento.append(valor)
+
+        consulta = (
+            sa.select(ano, mes, solicitacoes.c.usuario_id, sa.literal(dimensao), valor, sa.func.count(solicitacoes.c.id))
+            .where(solicitacoes.c.data_criacao.isnot(None))
+            .group_by(*agrupamento)
+        )
+        op.execute(estatisticas.insert().from_select(
+            ['ano', 'mes', 'usuario_id', 'dimensao', 'valor', 'total'], consulta
+        ))
+
+
+def downgrade():
+    op.drop_table('estatisticas_mensais')
@@ -0,0 +1,53 @@
+"""Copy of the UVIS name/region on solicitacoes (no join for list queries)
+
+Revision ID: e7c1a5d3f920
+Revises: d2f8b4a61c07
+Create Date: 2026-10-18 18:47:09.318264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c1a5d3f920'
+down_revision = 'd2f8b4a61c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ADD COLUMN simples (sem recriar a tabela, que levaria os triggers da busca)
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('nome_uvis', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('regiao', sa.String(length=50), nullable=True))
+
+    # Backfill: copia do autor de cada solicitação
+    solicitacoes = sa.table('solicitacoes',
+        sa.column('usuario_id', sa.Integer),
+        sa.column('nome_uvis', sa.String),
+        sa.column('regiao', sa.String),
+    )
+    usuarios = sa.table('usuarios',
+        sa.column('id', sa.Integer),
+        sa.column('nome_uvis', sa.String),
+        sa.column('regiao', sa.String),
+    )
+    op.execute(solicitacoes.update().values(
+        nome_uvis=sa.select(usuarios.c.nome_uvis).where(usuarios.c.id == solicitacoes.c.usuario_id).scalar_subquery(),
+        regiao=sa.select(usuarios.c.regiao).where(usuarios.c.id == solicitacoes.c.usuario_id).scalar_subquery(),
+    ))
+
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.create_index('ix_solicitacoes_regiao_criacao', ['regiao', 'data_criacao'], unique=False)
+        batch_op.create_index('ix_solicitacoes_uvis_criacao', ['nome_uvis', 'data_criacao'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.drop_index('ix_solicitacoes_uvis_criacao')
+        batch_op.drop_index('ix_solicitacoes_regiao_criacao')
+
+    # DROP COLUMN direto: a recriação da tabela no modo batch perderia os triggers da busca
+    op.drop_column('solicitacoes', 'regiao')
+    op.drop_column('solicitacoes', 'nome_uvis')
@@ -0,0 +1,101 @@
+"""Numeric latitude/longitude and spatial grid cell on solicitacoes
+
+Revision ID: f3b9d6a04c1e
+Revises: e5a2c8f17b34
+Create Date: 2026-10-18 14:42:37.918204
+
+"""
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9d6a04c1e'
+down_revision = 'e5a2c8f17b34'
+branch_labels = None
+depends_on = None
+
+
+# Mesma grade de app/geo.py (copiada: a migração não depende do código da app)
+TAMANHO_CELULA = 0.01
+COLUNAS_GRADE = 36000
+
+
+def _numero(valor, limite):
+    """Texto legado ('-23,55', ' -23.55 ', 'abc') -> float válido ou None."""
+    if valor is None:
+        return None
+    try:
+        numero = float(str(valor).strip().replace(',', '.'))
+    except ValueError:
+        return None
+    if not math.isfinite(numero) or abs(numero) > limite:
+        return None
+    return numero
+
+
+def _celula(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    linha = int(math.floor((latitude + 90.0) / TAMANHO_CELULA))
+    coluna = min(int(math.floor((longitude + 180.0) / TAMANHO_CELULA)), COLUNAS_GRADE - 1)
+    return linha * COLUNAS_GRADE + coluna
+
+
+def upgrade():
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('celula_geo', sa.Integer(), nullable=True))
+
+    # Normaliza o texto antes da troca de tipo (o CAST do banco não entende
+    # vírgula decimal) e calcula a célula da grade
+    solicitacoes = sa.table('solicitacoes',
+        sa.column('id', sa.Integer),
+        sa.column('latitude', sa.String),
+        sa.column('longitude', sa.String),
+        sa.column('celula_geo', sa.Integer),
+    )
+    conexao = op.get_bind()
+    linhas = conexao.execute(
+        sa.select(solicitacoes.c.id, solicitacoes.c.latitude, solicitacoes.c.longitude)
+        .where(sa.or_(solicitacoes.c.latitude.isnot(None), solicitacoes.c.longitude.isnot(None)))
+    ).fetchall()
+
+    for id, latitude, longitude in linhas:
+        latitude = _numero(latitude, 90.0)
+        longitude = _numero(longitude, 180.0)
+        conexao.execute(
+            solicitacoes.update().where(solicitacoes.c.id == id).values(
+                latitude=None if latitude is None else repr(latitude),
+                longitude=None if longitude is None else repr(longitude),
+                celula_geo=_celula(latitude, longitude),
+            )
+        )
+
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.alter_column('latitude',
+               existing_type=sa.String(length=50),
+               type_=sa.Float(),
+               existing_nullable=True,
+               postgresql_using='latitude::double precision')
+        batch_op.alter_column('longitude',
+               existing_type=sa.String(length=50),
+               type_=sa.Float(),
+               existing_nullable=True,
+               postgresql_using='longitude::double precision')
+        batch_op.create_index('ix_solicitacoes_celula_geo', ['celula_geo'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('solicitacoes', schema=None) as batch_op:
+        batch_op.drop_index('ix_solicitacoes_celula_geo')
+        batch_op.alter_column('longitude',
+               existing_type=sa.Float(),
+               type_=sa.String(length=50),
+               existing_nullable=True)
+        batch_op.alter_column('latitude',
+               existing_type=sa.Float(),
+               type_=sa.String(length=50),
+               existing_nullable=True)
+        batch_op.drop_column('celula_geo')
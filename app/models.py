@@ -1,6 +1,8 @@
 from app import db
+from app.geo import converter_coordenada, celula_geo
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import validates
+from app.senhas import gerar_hash, verificar
 
 # -------------------------------------------------------------
 # USUÁRIO
@@ -25,10 +27,11 @@ class Usuario(db.Model):
     )
 
     def set_senha(self, senha):
-        self.senha_hash = generate_password_hash(senha)
+        # Algoritmo e custo: SENHA_HASH_METODO (ver app/senhas.py)
+        self.senha_hash = gerar_hash(senha)
 
     def check_senha(self, senha):
-        return check_password_hash(self.senha_hash, senha)
+        return verificar(self.senha_hash, senha)
 
 
 # -------------------------------------------------------------
@@ -37,6 +40,24 @@ class Usuario(db.Model):
 class Solicitacao(db.Model):
     __tablename__ = 'solicitacoes'
 
+    # ----------------------
+    # Índices (caminhos de acesso das telas principais)
+    # ----------------------
+    __table_args__ = (
+        # Dashboard UVIS: usuario_id (+ status) ordenado por data_criacao desc
+        db.Index('ix_solicitacoes_usuario_status_criacao', 'usuario_id', 'status', 'data_criacao'),
+        db.Index('ix_solicitacoes_usuario_criacao', 'usuario_id', 'data_criacao'),
+        # Painel de gestão: status ordenado por data_criacao desc
+        db.Index('ix_solicitacoes_status_criacao', 'status', 'data_criacao'),
+        # Agenda: busca por data do voo
+        db.Index('ix_solicitacoes_data_agendamento', 'data_agendamento', 'hora_agendamento'),
+        # Buscas espaciais: célula da grade (ver app/geo.py)
+        db.Index('ix_solicitacoes_celula_geo', 'celula_geo'),
+        # Painel/exportações/relatórios: região e unidade sem JOIN com usuarios
+        db.Index('ix_solicitacoes_regiao_criacao', 'regiao', 'data_criacao'),
+        db.Index('ix_solicitacoes_uvis_criacao', 'nome_uvis', 'data_criacao'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     # ----------------------
@@ -69,20 +90,97 @@ class Solicitacao(db.Model):
     numero = db.Column(db.String(20))
     complemento = db.Column(db.String(100))
 
-    # Gealocalização
-    latitude = db.Column(db.String(50))
-    longitude = db.Column(db.String(50))
+    # Gealocalização (graus decimais)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    celula_geo = db.Column(db.Integer)  # preenchida a partir de latitude/longitude
+    # NULL = digitadas/confirmadas por alguém; senão, a precisão do
+    # geocodificador que as preencheu (ver app/geocodificador.py)
+    coordenadas_origem = db.Column(db.String(20))
 
     # ----------------------
     # Controle Admin
     # ----------------------
     protocolo = db.Column(db.String(50))
     justificativa = db.Column(db.String(255))
-    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     status = db.Column(db.String(20), default="EM ANÁLISE")
 
     usuario_id = db.Column(
         db.Integer,
         db.ForeignKey("usuarios.id"),
         nullable=False
-    )
\ No newline at end of file
+    )
+
+    # Cópia de Usuario.nome_uvis/regiao do autor (mantida por app/copia_uvis.py)
+    nome_uvis = db.Column(db.String(100))
+    regiao = db.Column(db.String(50))
+
+    # Aceita o texto do formulário ('-23.55', '-23,55', '') e mantém a célula em dia
+    @validates('latitude', 'longitude')
+    def validar_coordenada(self, campo, valor):
+        valor = converter_coordenada(valor, campo)
+        if valor != getattr(self, campo):
+            self.coordenadas_origem = None
+        if campo == 'latitude':
+            self.celula_geo = celula_geo(valor, self.longitude)
+        else:
+            self.celula_geo = celula_geo(self.latitude, valor)
+        return valor
+
+# -------------------------------------------------------------
+# VERSÃO DOS DADOS (invalidação de caches)
+# -------------------------------------------------------------
+class VersaoDados(db.Model):
+    """
+    Contador por escopo (ex.: 'mes:2025-11'), incrementado a cada
+    inserção/alteração/remoção de Solicitacao naquele escopo.
+    Ver app/versoes.py.
+    """
+    __tablename__ = 'versoes_dados'
+
+    escopo = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# -------------------------------------------------------------
+# ESTATÍSTICAS MENSAIS (agregado incremental dos relatórios)
+# -------------------------------------------------------------
+class EstatisticaMensal(db.Model):
+    """
+    Contador por mês de criação, UVIS (usuario_id) e dimensão do relatório
+    (status, foco, tipo_visita, altura_voo, regiao, nome_uvis; 'total' com
+    valor vazio).
+    Mantido pelos eventos de sessão em app/estatisticas.py.
+    """
+    __tablename__ = 'estatisticas_mensais'
+
+    ano = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, primary_key=True)
+    dimensao = db.Column(db.String(20), primary_key=True)
+    valor = db.Column(db.String(100), primary_key=True)  # '' = não informado
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+# -------------------------------------------------------------
+# CEPs (consulta local de endereços)
+# -------------------------------------------------------------
+class Cep(db.Model):
+    """
+    Endereço de cada CEP, importado de arquivo ou aprendido das
+    solicitações já cadastradas. Ver app/cep.py e app/geocodificador.py.
+    """
+    __tablename__ = 'ceps'
+
+    cep = db.Column(db.String(8), primary_key=True)  # somente dígitos
+    logradouro = db.Column(db.String(150))
+    bairro = db.Column(db.String(100))
+    cidade = db.Column(db.String(100), nullable=False)
+    uf = db.Column(db.String(2), nullable=False)
+    # Centroide do CEP/logradouro (opcional, vem da importação)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    origem = db.Column(db.String(20), nullable=False, default='importacao')  # importacao | solicitacoes
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
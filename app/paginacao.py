@@ -0,0 +1,128 @@
+from datetime import datetime
+from math import ceil
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import tuple_
+
+# =======================================================================
+# Paginação por Cursor (keyset / seek)
+# =======================================================================
+# Em vez de OFFSET + COUNT(*) a cada página, a consulta "continua" a partir
+# da chave (data_criacao, id) do último (ou primeiro) registro exibido:
+#
+#     WHERE (data_criacao, id) < (:data, :id) ORDER BY data_criacao DESC, id DESC
+#
+# O custo é o mesmo na página 1 e na página 500. O cursor vai na URL como um
+# token assinado e opaco, que carrega também o número da página e o total
+# contado na primeira página (o COUNT roda uma única vez por navegação).
+#
+# Observação: data_criacao é sempre preenchida pelo default do modelo;
+# registros com data_criacao nula não entram na paginação.
+
+SALT_CURSOR = 'paginacao-cursor'
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.secret_key, salt=SALT_CURSOR)
+
+
+def gerar_cursor(direcao, data, id, pagina, total):
+    """Monta o token opaco. direcao: 'n' (próxima) ou 'p' (anterior)."""
+    return _serializer().dumps([direcao, data.isoformat(), id, pagina, total])
+
+
+def ler_cursor(token):
+    """Decodifica o token; retorna None se estiver ausente ou adulterado."""
+    if not token:
+        return None
+    try:
+        direcao, data, id, pagina, total = _serializer().loads(token)
+        return direcao, datetime.fromisoformat(data), int(id), int(pagina), total
+    except (BadSignature, ValueError, TypeError):
+        return None
+
+
+class PaginacaoCursor:
+    """
+    Página de resultados por cursor, com a mesma interface usada pelos
+    templates para a paginação clássica (items, page, pages, has_prev,
+    has_next), trocando prev_num/next_num por prev_cursor/next_cursor.
+    """
+
+    def __init__(self, query, coluna_data, coluna_id, cursor=None, per_page=6, contar_total=True):
+        self.per_page = per_page
+        dados_cursor = ler_cursor(cursor)
+        query = query.filter(coluna_data.isnot(None))
+
+        chave = tuple_(coluna_data, coluna_id)
+
+        if dados_cursor is None:
+            # Primeira página
+            self.page = 1
+            self.total = query.order_by(None).count() if contar_total else None
+            linhas = query.order_by(coluna_data.desc(), coluna_id.desc()).limit(per_page + 1).all()
+            self.has_prev = False
+            self.has_next = len(linhas) > per_page
+            linhas = linhas[:per_page]
+
+        else:
+            direcao, data, id, pagina, self.total = dados_cursor
+
+            if direcao == 'p':
+                # Volta uma página: busca em ordem crescente e inverte
+                self.page = max(pagina - 1, 1)
+                linhas = (
+                    query.filter(chave > tuple_(data, id))
+                    .order_by(coluna_data.asc(), coluna_id.asc())
+                    .limit(per_page + 1)
+                    .all()
+                )
+                self.has_prev = len(linhas) > per_page
+                linhas = linhas[:per_page][::-1]
+                self.has_next = True
+                if not self.has_prev:
+                    self.page = 1
+            else:
+                self.page = pagina + 1
+                linhas = (
+                    query.filter(chave < tuple_(data, id))
+                    .order_by(coluna_data.desc(), coluna_id.desc())
+                    .limit(per_page + 1)
+                    .all()
+                )
+                self.has_next = len(linhas) > per_page
+                linhas = linhas[:per_page]
+                self.has_prev = True
+
+        self.items = linhas
+
+        # Cursores para os links "Anterior" / "Próxima"
+        self.prev_cursor = None
+        self.next_cursor = None
+        if self.items:
+            primeiro = self._chave_do_item(self.items[0], coluna_data, coluna_id)
+            ultimo = self._chave_do_item(self.items[-1], coluna_data, coluna_id)
+            if self.has_prev:
+                self.prev_cursor = gerar_cursor('p', *primeiro, self.page, self.total)
+            if self.has_next:
+                self.next_cursor = gerar_cursor('n', *ultimo, self.page, self.total)
+
+        # Página vazia (registros removidos entre uma navegação e outra)
+        self.has_prev = self.prev_cursor is not None
+        self.has_next = self.next_cursor is not None
+
+    @staticmethod
+    def _chave_do_item(item, coluna_data, coluna_id):
+        return getattr(item, coluna_data.key), getattr(item, coluna_id.key)
+
+    @property
+    def pages(self):
+        """Total de páginas (aproximado: baseado no COUNT da primeira página)."""
+        if self.total is None:
+            return None
+        return max(ceil(self.total / self.per_page), self.page, 1)
+
+    @property
+    def tem_navegacao(self):
+        return self.has_prev or self.has_next
@@ -0,0 +1,327 @@
+import os
+from io import BytesIO
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import mm
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
+    PageBreak, Image as RLImage
+)
+
+from app import db
+from app.models import Usuario, Solicitacao
+from app.agregacao import aplicar_filtros_base, calcular_agregados, historico_mensal
+from app.graficos import MATPLOTLIB_AVAILABLE, graficos_relatorio
+
+
+# =======================================================================
+# Geração do PDF do Relatório Mensal
+# =======================================================================
+# Executada fora da requisição pela fila de tarefas (app/tarefas.py);
+# precisa apenas de um app_context ativo para acessar o banco.
+
+def nome_arquivo_relatorio(ano, mes, uvis_id=None):
+    nome_arquivo = f"relatorio_SGSV_{ano}_{mes:02d}"
+    if uvis_id:
+        nome_arquivo += f"_UVIS_{uvis_id}"
+    return nome_arquivo
+
+
+def gerar_relatorio_pdf(caminho_pdf, ano, mes, uvis_id=None, orient='portrait'):
+    """Monta o relatório mensal (totais, agrupamentos, gráficos e registros) em caminho_pdf."""
+    # 2. Busca Principal para os Registros Detalhados
+    query_base = db.session.query(Solicitacao)
+    query_base = aplicar_filtros_base(query_base, ano, mes, uvis_id)
+    query_results = query_base.order_by(Solicitacao.data_criacao.desc()).all()
+
+    # 3. Totais e agrupamentos (mesmo motor de agregação da tela de relatórios)
+    agregados = calcular_agregados(ano, mes, uvis_id)
+
+    total_solicitacoes = agregados['total_solicitacoes']
+    total_aprovadas = agregados['total_aprovadas']
+    total_recusadas = agregados['total_recusadas']
+    total_analise = agregados['total_analise']
+    total_pendentes = agregados['total_pendentes']
+
+    # 4. Agrupamentos com rótulo padrão para valores vazios
+    def rotular(dados):
+        return [(valor or "Não informado", c) for valor, c in dados]
+
+    dados_regiao = rotular(agregados['dados_regiao'])
+    dados_status = rotular(agregados['dados_status'])
+    dados_foco = rotular(agregados['dados_foco'])
+    dados_tipo_visita = rotular(agregados['dados_tipo_visita'])
+    dados_altura_voo = rotular(agregados['dados_altura_voo'])
+    dados_unidade = rotular(agregados['dados_unidade'])
+
+    dados_mensais = historico_mensal()
+
+    # -------------------------
+    # 5. Preparar documento PDF
+    # -------------------------
+    pagesize = A4
+    if orient == 'landscape':
+        pagesize = landscape(A4)
+
+    doc = SimpleDocTemplate(caminho_pdf,
+                            pagesize=pagesize,
+                            leftMargin=16*mm, rightMargin=16*mm,
+                            topMargin=16*mm, bottomMargin=20*mm)
+
+    # Styles aprimorados
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('title', parent=styles['Title'], fontSize=22, leading=26, alignment=1, spaceAfter=8, textColor=colors.HexColor('#0d6efd'))
+    subtitle_style = ParagraphStyle('subtitle', parent=styles['Normal'], fontSize=10, textColor=colors.HexColor('#666'), alignment=1, spaceAfter=6)
+    section_h = ParagraphStyle('sec', parent=styles['Heading2'], fontSize=12, spaceAfter=6, textColor=colors.HexColor('#0d6efd'))
+    normal = styles['Normal']
+    small = ParagraphStyle('small', parent=styles['BodyText'], fontSize=9, textColor=colors.HexColor('#555'))
+
+    story = []
+
+    # -------------------------
+    # Funções utilitárias
+    # -------------------------
+    def img_png(png):
+        """Recebe os bytes de um PNG, retorna ReportLab Image."""
+        return RLImage(BytesIO(png), width=170*mm)  # escala automática
+
+    def render_small_table(rows, colWidths):
+        tbl = Table(rows, colWidths=colWidths)
+        tbl.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('ALIGN', (0,0), (-1,0), 'CENTER'),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#fbfdff')]),
+            ('LEFTPADDING', (0,0), (-1,-1), 6),
+            ('RIGHTPADDING', (0,0), (-1,-1), 6),
+            ('TOPPADDING', (0,0), (-1,-1), 4),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+        ]))
+        return tbl
+
+    # -------------------------
+    # Cabeçalho / Capa
+    # -------------------------
+    # Logo: procura em static/logo.png por padrão — se não existir, pula
+    logo_path = os.path.join(os.getcwd(), 'static', 'logo.png')
+    if os.path.exists(logo_path):
+        try:
+            logo = RLImage(logo_path, width=36*mm, height=36*mm)
+        except Exception:
+            logo = None
+    else:
+        logo = None
+
+    # Título e capa
+    story.append(Spacer(1, 6))
+    if logo:
+        # coloca o logo e título lado a lado
+        h = [[logo, Paragraph(f"<b>Relatório Mensal — {mes:02d}/{ano}</b>", title_style)]]
+        cap_tbl = Table(h, colWidths=[40*mm, (doc.width - 40*mm)])
+        cap_tbl.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]))
+        story.append(cap_tbl)
+    else:
+        story.append(Paragraph(f"Relatório Mensal — {mes:02d}/{ano}", title_style))
+
+    # subtítulo e linhas
+    titulo_uvis = ""
+    if uvis_id:
+        uvis_obj = db.session.query(Usuario.nome_uvis).filter(Usuario.id == uvis_id).first()
+        if uvis_obj:
+            titulo_uvis = f" — {uvis_obj.nome_uvis}"
+    story.append(Paragraph(f"Sistema de Gestão de Solicitações{titulo_uvis}", subtitle_style))
+    story.append(Spacer(1, 8))
+
+    # capa: box com resumo principal (centralizado)
+    resumo_box = [
+        ['Métrica', 'Quantidade'],
+        ['Total de Solicitações', str(total_solicitacoes)],
+        ['Aprovadas', str(total_aprovadas)],
+        ['Recusadas', str(total_recusadas)],
+        ['Em Análise', str(total_analise)],
+        ['Pendentes', str(total_pendentes)]
+    ]
+    story.append(render_small_table(resumo_box, [80*mm, 40*mm]))
+    story.append(Spacer(1, 12))
+
+    # Capa: breve meta-infos
+    story.append(Paragraph(f"Gerado por: Sistema SGSV — Gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')}", small))
+    story.append(Spacer(1, 18))
+
+    # -------------------------
+    # Sumário simples (lista de seções)
+    # -------------------------
+    story.append(Paragraph("Sumário", section_h))
+    sumario_itens = [
+        "Resumo Geral",
+        "Solicitações por Região",
+        "Status Detalhado",
+        "Solicitações por Foco / Tipo / Altura",
+        "Solicitações por Unidade (UVIS)",
+        "Histórico Mensal",
+        "Gráficos (Visão Geral)",
+        "Registros Detalhados"
+    ]
+    for i, it in enumerate(sumario_itens, 1):
+        story.append(Paragraph(f"{i}. {it}", normal))
+    story.append(PageBreak())
+
+    # -------------------------
+    # Seções com tabelas (formatadas)
+    # -------------------------
+    # 1) Resumo Geral (repetição do box com estilo)
+    story.append(Paragraph("Resumo Geral", section_h))
+    story.append(render_small_table(resumo_box, [110*mm, 50*mm]))
+    story.append(Spacer(1, 8))
+
+    # 2) Regiões
+    story.append(Paragraph("Solicitações por Região", section_h))
+    rows = [['Região', 'Total']] + [[r, str(c)] for r, c in dados_regiao]
+    story.append(render_small_table(rows, [110*mm, 50*mm]))
+    story.append(Spacer(1, 8))
+
+    # 3) Status
+    story.append(Paragraph("Status Detalhado", section_h))
+    rows = [['Status', 'Total']] + [[s, str(c)] for s, c in dados_status]
+    story.append(render_small_table(rows, [110*mm, 50*mm]))
+    story.append(Spacer(1, 8))
+
+    # 4) Foco / Tipo / Altura
+    story.append(Paragraph("Solicitações por Foco", section_h))
+    rows = [['Foco', 'Total']] + [[f, str(c)] for f, c in dados_foco]
+    story.append(render_small_table(rows, [110*mm, 50*mm]))
+    story.append(Spacer(1, 6))
+
+    story.append(Paragraph("Solicitações por Tipo de Visita", section_h))
+    rows = [['Tipo', 'Total']] + [[t, str(c)] for t, c in dados_tipo_visita]
+    story.append(render_small_table(rows, [110*mm, 50*mm]))
+    story.append(Spacer(1, 6))
+
+    story.append(Paragraph("Solicitações por Altura de Voo", section_h))
+    rows = [['Altura (m)', 'Total']] + [[str(a), str(c)] for a, c in dados_altura_voo]
+    story.append(render_small_table(rows, [110*mm, 50*mm]))
+    story.append(Spacer(1, 8))
+
+    # 5) UVIS
+    story.append(Paragraph("Solicitações por Unidade (UVIS) — Top", section_h))
+    rows = [['Unidade', 'Total']] + [[u, str(c)] for u, c in dados_unidade]
+    story.append(render_small_table(rows, [110*mm, 50*mm]))
+    story.append(Spacer(1, 8))
+
+    # 6) Histórico mensal
+    story.append(Paragraph("Histórico Mensal (Total por Mês)", section_h))
+    rows = [['Mês', 'Total']] + [[m, str(c)] for m, c in dados_mensais]
+    story.append(render_small_table(rows, [70*mm, 40*mm]))
+    story.append(Spacer(1, 12))
+
+    # 7) Gráficos — somente se matplotlib disponível
+    story.append(PageBreak())
+    story.append(Paragraph("Gráficos (Visão Geral)", section_h))
+    if MATPLOTLIB_AVAILABLE:
+        try:
+            # Pizza (status), barras (top UVIS) e linha (histórico mensal),
+            # desenhados em paralelo e memorizados por app/graficos.py
+            for png in graficos_relatorio(dados_status, dados_unidade, dados_mensais):
+                story.append(img_png(png))
+                story.append(Spacer(1, 8))
+        except Exception:
+            # se algo falhar nos gráficos, apenas passa
+            story.append(Paragraph("Gráficos indisponíveis (erro ao gerar).", normal))
+            story.append(Spacer(1, 8))
+    else:
+        story.append(Paragraph("Matplotlib não disponível — gráficos foram omitidos.", normal))
+        story.append(Spacer(1, 8))
+
+    # 8) Registros detalhados (tabela grande)
+    story.append(PageBreak())
+    story.append(Paragraph("Registros Detalhados", section_h))
+    story.append(Spacer(1, 6))
+
+    registros_header = ['Data', 'Hora', 'Unidade', 'Protocolo', 'Status', 'Região', 'Foco', 'Tipo Visita', 'Observação']
+    registros_rows = [registros_header]
+
+    for s in query_results:
+        # data/hora safe formatting
+        data_str = ''
+        try:
+            if getattr(s, 'data_agendamento', None):
+                data_str = s.data_agendamento.strftime("%d/%m/%Y") if hasattr(s.data_agendamento, 'strftime') else str(s.data_agendamento)
+            else:
+                data_str = s.data_criacao.strftime("%d/%m/%Y") if hasattr(s.data_criacao, 'strftime') else str(s.data_criacao)
+        except:
+            data_str = str(getattr(s, 'data_agendamento', '') or getattr(s, 'data_criacao', ''))
+
+        hora = getattr(s, 'hora_agendamento', '')
+        hora_str = hora.strftime("%H:%M") if hasattr(hora, 'strftime') else str(hora or '')
+
+        unidade = getattr(s, 'nome_uvis', '') or "Não informado"
+        protocolo = getattr(s, 'protocolo', '') or ''
+        status = getattr(s, 'status', '') or ''
+        regiao = getattr(s, 'regiao', '') or ''
+        foco = getattr(s, 'foco', '') or ''
+        tipo_visita = getattr(s, 'tipo_visita', '') or ''
+        obs = getattr(s, 'observacao', '') or ''
+
+        registros_rows.append([data_str, hora_str, unidade, protocolo, status, regiao, foco, tipo_visita, obs])
+
+    # Dividimos a tabela em pedaços para evitar problemas de memória/páginas
+    # e garantir que não estoure
+    chunk_size = 40
+    for i in range(0, len(registros_rows), chunk_size):
+        chunk = registros_rows[i:i+chunk_size]
+        tbl = Table(chunk, repeatRows=1, colWidths=[18*mm, 14*mm, 35*mm, 26*mm, 22*mm, 28*mm, 28*mm, 30*mm, 45*mm])
+        tbl.setStyle(TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#0d6efd')),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,0), 9),
+            ('GRID', (0,0), (-1,-1), 0.25, colors.lightgrey),
+            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#fbfdff')]),
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('LEFTPADDING', (0,0), (-1,-1), 4),
+            ('RIGHTPADDING', (0,0), (-1,-1), 4),
+            ('TOPPADDING', (0,0), (-1,-1), 3),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 3),
+        ]))
+        story.append(tbl)
+        story.append(Spacer(1, 8))
+        # adiciona quebra de página entre chunks (exceto se for o último)
+        if i + chunk_size < len(registros_rows):
+            story.append(PageBreak())
+
+    # -------------------------
+    # Footer fixo e page numbers
+    # -------------------------
+    # Usaremos canvas callbacks quando build() for chamado.
+    def _header_footer(canvas, doc):
+        # header (linha superior colorida)
+        canvas.saveState()
+        w, h = pagesize
+        # linha azul
+        canvas.setFillColor(colors.HexColor('#0d6efd'))
+        canvas.rect(doc.leftMargin, h - (12*mm), doc.width, 4, fill=1, stroke=0)
+
+        # rodapé: texto e número de página
+        footer_text = "Sistema de Gestão de Solicitações — SGSV"
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColor(colors.HexColor('#777'))
+        canvas.drawString(doc.leftMargin, 10*mm, footer_text)
+
+        # número de páginas
+        page_num_text = f"Página {canvas.getPageNumber()}"
+        canvas.drawRightString(doc.leftMargin + doc.width, 10*mm, page_num_text)
+        canvas.restoreState()
+
+    # -------------------------
+    # Build
+    # -------------------------
+    doc.build(story, onFirstPage=_header_footer, onLaterPages=_header_footer)
+
+    return caminho_pdf
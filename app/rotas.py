@@ -0,0 +1,315 @@
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+
+from app.models import Solicitacao
+from app.geo import RAIO_TERRA_KM
+
+# =======================================================================
+# Planejamento de Rotas do Dia (equipes de drone)
+# =======================================================================
+# Entrada: solicitações APROVADAS de uma data, com coordenadas.
+# Saída: uma rota ordenada por equipe, saindo e voltando à sua base.
+#
+# - Matriz de distâncias (haversine) calculada de uma vez com NumPy,
+#   convertida em minutos de deslocamento (velocidade média + fator de
+#   desvio das ruas).
+# - Janela de horário de cada voo: hora_agendamento ± tolerância (menor
+#   para voos com apoio da CET, que tem horário marcado).
+# - Heurística de inserção mais barata com janelas de tempo (VRPTW):
+#   cada parada entra na posição viável de menor custo entre todas as
+#   rotas; a viabilidade é testada em O(1) com o "último início possível"
+#   de cada parada. Depois, rodadas de realocação melhoram o resultado.
+#
+# Tudo em minutos desde 00:00 do dia.
+
+PADROES = {
+    # Cada base tem N equipes (drone + piloto)
+    'ROTAS_BASES': [
+        {'nome': 'Base Central', 'latitude': -23.5505, 'longitude': -46.6333, 'equipes': 2},
+    ],
+    'ROTAS_VELOCIDADE_KMH': 25.0,
+    'ROTAS_FATOR_DESVIO': 1.3,          # distância em ruas ≈ 1,3 x linha reta
+    'ROTAS_TEMPO_VOO_MIN': 30,          # montagem + voo + desmontagem
+    'ROTAS_TOLERANCIA_MIN': 60,         # janela: hora_agendamento ± tolerância
+    'ROTAS_TOLERANCIA_CET_MIN': 15,     # apoio da CET: horário mais rígido
+    'ROTAS_INICIO': '07:00',            # saída mais cedo da base
+    'ROTAS_FIM': '19:00',               # retorno mais tarde à base
+    'ROTAS_RODADAS_MELHORIA': 3,
+}
+
+Parada = namedtuple('Parada', 'solicitacao inicio_janela fim_janela servico')
+Visita = namedtuple('Visita', 'ordem parada chegada inicio saida trecho_km')
+Rota = namedtuple('Rota', 'equipe base visitas distancia_km retorno')
+NaoAlocada = namedtuple('NaoAlocada', 'solicitacao motivo')
+Plano = namedtuple('Plano', 'data rotas nao_alocadas distancia_km')
+
+
+def _config(chave):
+    return current_app.config.get(chave, PADROES[chave])
+
+
+def _minutos(valor):
+    if isinstance(valor, str):
+        valor = datetime.strptime(valor, '%H:%M').time()
+    return valor.hour * 60 + valor.minute
+
+
+def horario(minutos):
+    """Minutos desde 00:00 -> 'HH:MM'."""
+    minutos = int(round(minutos))
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def matriz_distancias_km(latitudes, longitudes):
+    """Matriz N x N de distâncias haversine (km), vetorizada."""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# -----------------------------
+# Rota de uma equipe (estado da heurística)
+# -----------------------------
+class _RotaEquipe:
+    """
+    Sequência de nós (índices da matriz) de uma equipe. Guarda o início
+    de cada visita e o último início possível sem violar as janelas das
+    visitas seguintes (inclui o retorno à base).
+    """
+
+    def __init__(self, equipe, base, no_base, planejador):
+        self.equipe = equipe
+        self.base = base
+        self.no_base = no_base
+        self.p = planejador
+        self.nos = []
+        self.recalcular()
+
+    def recalcular(self):
+        p = self.p
+        caminho = [self.no_base] + self.nos + [self.no_base]
+
+        # início (para frente)
+        inicios = [p.inicio_dia]
+        for anterior, atual in zip(caminho, caminho[1:]):
+            chegada = inicios[-1] + p.servico[anterior] + p.tempo[anterior][atual]
+            inicios.append(max(chegada, p.abre[atual]))
+
+        # último início possível (para trás)
+        ultimos = [p.fim_dia] * len(caminho)
+        for k in range(len(caminho) - 2, -1, -1):
+            atual, seguinte = caminho[k], caminho[k + 1]
+            ultimos[k] = min(p.fecha[atual], ultimos[k + 1] - p.servico[atual] - p.tempo[atual][seguinte])
+
+        self.caminho = caminho
+        self.inicios = inicios
+        self.ultimos = ultimos
+
+    def custo(self):
+        return sum(self.p.distancia[a][b] for a, b in zip(self.caminho, self.caminho[1:]))
+
+    def melhor_insercao(self, no):
+        """(custo adicional, posição) da inserção viável mais barata, ou None."""
+        p = self.p
+        melhor = None
+        for k in range(len(self.caminho) - 1):
+            anterior, seguinte = self.caminho[k], self.caminho[k + 1]
+
+            inicio = max(p.abre[no], self.inicios[k] + p.servico[anterior] + p.tempo[anterior][no])
+            if inicio > p.fecha[no]:
+                continue
+            inicio_seguinte = max(p.abre[seguinte], inicio + p.servico[no] + p.tempo[no][seguinte])
+            if inicio_seguinte > self.ultimos[k + 1]:
+                continue
+
+            acrescimo = p.distancia[anterior][no] + p.distancia[no][seguinte] - p.distancia[anterior][seguinte]
+            if melhor is None or acrescimo < melhor[0]:
+                melhor = (acrescimo, k)
+        return melhor
+
+    def inserir(self, no, posicao):
+        self.nos.insert(posicao, no)
+        self.recalcular()
+
+    def remover(self, no):
+        self.nos.remove(no)
+        self.recalcular()
+
+
+class _Planejador:
+    def __init__(self, bases, paradas):
+        self.bases = bases
+        self.paradas = paradas
+
+        latitudes = [b['latitude'] for b in bases] + [pd.solicitacao.latitude for pd in paradas]
+        longitudes = [b['longitude'] for b in bases] + [pd.solicitacao.longitude for pd in paradas]
+
+        distancia = matriz_distancias_km(latitudes, longitudes) * _config('ROTAS_FATOR_DESVIO')
+        tempo = distancia / _config('ROTAS_VELOCIDADE_KMH') * 60
+
+        # listas Python: acesso elemento a elemento bem mais rápido que ndarray
+        self.distancia = distancia.tolist()
+        self.tempo = tempo.tolist()
+
+        self.inicio_dia = _minutos(_config('ROTAS_INICIO'))
+        self.fim_dia = _minutos(_config('ROTAS_FIM'))
+
+        n_bases = len(bases)
+        self.abre = [self.inicio_dia] * n_bases + [pd.inicio_janela for pd in paradas]
+        self.fecha = [self.fim_dia] * n_bases + [pd.fim_janela for pd in paradas]
+        self.servico = [0] * n_bases + [pd.servico for pd in paradas]
+        self.no_parada = {id(pd): n_bases + i for i, pd in enumerate(paradas)}
+
+        self.rotas = []
+        for i, base in enumerate(bases):
+            for _ in range(int(base.get('equipes', 1))):
+                self.rotas.append(_RotaEquipe(len(self.rotas) + 1, base, i, self))
+
+    def _melhor_rota(self, no):
+        melhor = None
+        for rota in self.rotas:
+            insercao = rota.melhor_insercao(no)
+            if insercao and (melhor is None or insercao[0] < melhor[0]):
+                melhor = (insercao[0], rota, insercao[1])
+        return melhor
+
+    def resolver(self):
+        nao_alocados = []
+
+        # janelas mais apertadas/cedo primeiro
+        ordem = sorted(self.paradas, key=lambda pd: (pd.fim_janela, pd.inicio_janela))
+        for parada in ordem:
+            no = self.no_parada[id(parada)]
+            melhor = self._melhor_rota(no)
+            if melhor is None:
+                nao_alocados.append(parada)
+            else:
+                melhor[1].inserir(no, melhor[2])
+
+        # Melhoria: retira cada parada e reinsere onde ficar mais barato
+        for _ in range(_config('ROTAS_RODADAS_MELHORIA')):
+            melhorou = False
+            for rota in list(self.rotas):
+                for no in list(rota.nos):
+                    posicao = rota.nos.index(no)
+                    anterior = rota.caminho[posicao]
+                    seguinte = rota.caminho[posicao + 2]
+                    economia = (self.distancia[anterior][no] + self.distancia[no][seguinte]
+                                - self.distancia[anterior][seguinte])
+
+                    rota.remover(no)
+                    melhor = self._melhor_rota(no)
+                    if melhor is not None and melhor[0] < economia - 1e-9:
+                        melhor[1].inserir(no, melhor[2])
+                        melhorou = True
+                    else:
+                        rota.inserir(no, posicao)
+            if not melhorou:
+                break
+
+        # Segunda chance para as não alocadas (as rotas mudaram)
+        restantes = []
+        for parada in nao_alocados:
+            no = self.no_parada[id(parada)]
+            melhor = self._melhor_rota(no)
+            if melhor is None:
+                restantes.append(parada)
+            else:
+                melhor[1].inserir(no, melhor[2])
+
+        return restantes
+
+    def montar_rotas(self):
+        n_bases = len(self.bases)
+        rotas = []
+        for rota in self.rotas:
+            visitas = []
+            # caminho = [base, parada 1, ..., parada N, base]
+            for k in range(1, len(rota.caminho) - 1):
+                anterior, no = rota.caminho[k - 1], rota.caminho[k]
+                visitas.append(Visita(
+                    k,
+                    self.paradas[no - n_bases],
+                    rota.inicios[k - 1] + self.servico[anterior] + self.tempo[anterior][no],
+                    rota.inicios[k],
+                    rota.inicios[k] + self.servico[no],
+                    self.distancia[anterior][no]
+                ))
+            rotas.append(Rota(rota.equipe, rota.base, visitas, rota.custo(), rota.inicios[-1]))
+        return rotas
+
+
+# -----------------------------
+# API do módulo
+# -----------------------------
+def paradas_do_dia(data):
+    """Solicitações APROVADAS da data (com a UVIS), em ordem de horário."""
+    return (
+        Solicitacao.query
+        .filter(Solicitacao.data_agendamento == data, Solicitacao.status == 'APROVADO')
+        .order_by(Solicitacao.hora_agendamento, Solicitacao.id)
+        .all()
+    )
+
+
+def planejar_dia(data, bases=None):
+    """Planeja as rotas das equipes para as solicitações aprovadas da data."""
+    bases = bases or _config('ROTAS_BASES')
+    tolerancia = _config('ROTAS_TOLERANCIA_MIN')
+    tolerancia_cet = _config('ROTAS_TOLERANCIA_CET_MIN')
+    servico = _config('ROTAS_TEMPO_VOO_MIN')
+
+    paradas = []
+    nao_alocadas = []
+    for s in paradas_do_dia(data):
+        if s.latitude is None or s.longitude is None:
+            nao_alocadas.append(NaoAlocada(s, "Sem coordenadas"))
+            continue
+        hora = _minutos(s.hora_agendamento)
+        folga = tolerancia_cet if s.apoio_cet else tolerancia
+        paradas.append(Parada(s, hora - folga, hora + folga, servico))
+
+    if not paradas:
+        return Plano(data, [], nao_alocadas, 0.0)
+
+    planejador = _Planejador(bases, paradas)
+    for parada in planejador.resolver():
+        nao_alocadas.append(NaoAlocada(parada.solicitacao, "Nenhuma equipe consegue cumprir a janela de horário"))
+
+    rotas = planejador.montar_rotas()
+    return Plano(data, rotas, nao_alocadas, sum(r.distancia_km for r in rotas))
+
+
+# Exportação (planilha): uma linha por visita
+CABECALHO_EXPORTACAO = [
+    "Equipe", "Base", "Ordem", "Chegada", "Início", "Término", "Janela",
+    "ID", "Unidade", "Endereço", "Bairro", "Latitude", "Longitude",
+    "Apoio CET", "Trecho (km)",
+]
+
+
+def linhas_exportacao(plano):
+    for rota in plano.rotas:
+        for v in rota.visitas:
+            s = v.parada.solicitacao
+            yield [
+                rota.equipe, rota.base['nome'], v.ordem,
+                horario(v.chegada), horario(v.inicio), horario(v.saida),
+                f"{horario(v.parada.inicio_janela)}-{horario(v.parada.fim_janela)}",
+                s.id, s.nome_uvis, f"{s.logradouro}, {s.numero or 'S/N'}", s.bairro,
+                s.latitude, s.longitude, s.apoio_cet, round(v.trecho_km, 2),
+            ]
+    for item in plano.nao_alocadas:
+        s = item.solicitacao
+        yield [
+            "-", "-", "-", "", "", "", item.motivo,
+            s.id, s.nome_uvis, f"{s.logradouro}, {s.numero or 'S/N'}", s.bairro,
+            s.latitude, s.longitude, s.apoio_cet, "",
+        ]
@@ -1,17 +1,32 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from app import db
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, Response, stream_with_context, jsonify, abort, g
+from app import db, fila_tarefas, cache_relatorios
 from app.models import Usuario, Solicitacao
+from app.agregacao import calcular_agregados, historico_mensal
+from app.paginacao import PaginacaoCursor
+from app.xlsx_stream import gerar_xlsx
+from app.sarpas import COLUNAS_SARPAS, gerar_csv_sarpas
+from app.relatorio_pdf import gerar_relatorio_pdf, nome_arquivo_relatorio
+from app.relatorio_excel import gerar_relatorio_excel
+from app.versoes import (
+    versao_dados, escopo_mes, escopo_usuario, estado_versoes, escopos_leitura, escopos_agenda,
+    PERFIS_GLOBAIS, ESCOPO_HISTORICO, ESCOPO_USUARIOS,
+)
+from app.tarefas import CONCLUIDA
+from app.conflitos import conflitos_da_solicitacao, mapa_conflitos, conflitos_do_mes
+from app.rotas import planejar_dia, horario, CABECALHO_EXPORTACAO, linhas_exportacao
+from app.cep import buscar_cep, validar_endereco
+from app.geocodificador import sugerir_coordenadas
+from app.importacao import importar_solicitacoes, escrever_relatorio_erros
+from app.acoes_lote import atualizar_em_lote, ErroAcaoLote, ATUALIZADA, MAX_LOTE
+from app.busca import aplicar_busca, termos_busca
+from app.usuario_atual import usuario_da_sessao, ANONIMO
+from app.senhas import precisa_rehash
+import os
+import hashlib
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 from flask import json
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from io import BytesIO
-from flask import send_file
-from datetime import datetime, date 
-import tempfile
-from sqlalchemy.orm import joinedload
+from flask import send_file, make_response
 
 
 print("--- ROTAS CARREGADAS COM SUCESSO ---")
@@ -26,14 +41,15 @@ def datetimeformat(value, format='%d-%m-%y'):
         return value  # se falhar, retorna como está
 
 # --- Context Processor: Simula o 'current_user' para o HTML ---
-@bp.context_processor
+# Usuário logado: carregado uma vez por requisição (cache em app/usuario_atual.py)
+@bp.before_app_request
+def carregar_usuario():
+    g.usuario = usuario_da_sessao()
+
+
+@bp.app_context_processor
 def inject_user():
-    class MockUser:
-        is_authenticated = 'user_id' in session
-        name = session.get('user_nome')
-        id = session.get('user_id')
-        tipo_usuario = session.get('user_tipo')
-    return dict(current_user=MockUser())
+    return dict(current_user=getattr(g, 'usuario', None) or ANONIMO)
 
 # --- DASHBOARD UVIS ---
 
@@ -62,12 +78,14 @@ def dashboard():
     if filtro_status:
         query = query.filter(Solicitacao.status == filtro_status)
 
-    # 3. Lógica da Paginação:
-    page = request.args.get("page", 1, type=int)
-
-    paginacao = query.order_by(
-        Solicitacao.data_criacao.desc()
-    ).paginate(page=page, per_page=6, error_out=False)
+    # 3. Lógica da Paginação (por cursor em (data_criacao, id)):
+    paginacao = PaginacaoCursor(
+        query,
+        Solicitacao.data_criacao,
+        Solicitacao.id,
+        cursor=request.args.get("cursor"),
+        per_page=6
+    )
 
     return render_template(
         'dashboard.html',
@@ -76,6 +94,40 @@ def dashboard():
         paginacao=paginacao
     )
 
+# --- Filtros do Painel de Gestão (reutilizados nas exportações) ---
+def aplicar_filtros_painel(query, args=None, limite_busca=None):
+    """
+    Aplica os filtros status/unidade/regiao/q (do GET, ou de `args`). Unidade e
+    região usam a cópia em Solicitacao (sem JOIN). Com busca (q), a query sai
+    ordenada por relevância (entre as `limite_busca` correspondências mais
+    recentes, se informado).
+    """
+    args = request.args if args is None else args
+    filtro_status = args.get("status")
+    filtro_unidade = args.get("unidade")
+    filtro_regiao = args.get("regiao")
+    filtro_busca = (args.get("q") or "").strip()
+
+    if filtro_status:
+        query = query.filter(Solicitacao.status == filtro_status)
+
+    # igualdade (valores das listas do painel): usa os índices (nome_uvis/regiao, data_criacao)
+    if filtro_unidade:
+        query = query.filter(Solicitacao.nome_uvis == filtro_unidade)
+
+    if filtro_regiao:
+        query = query.filter(Solicitacao.regiao == filtro_regiao)
+
+    if filtro_busca:
+        query = aplicar_busca(query, filtro_busca, Solicitacao.id, limite_busca)
+
+    return query
+
+# Busca textual do painel: resultados exibidos (por relevância) e quantas
+# correspondências mais recentes entram no ranking
+LIMITE_BUSCA = 30
+CANDIDATOS_BUSCA = 2000
+
 # --- PAINEL DE GESTÃO (Visualização para todos) ---
 @bp.route('/admin')
 def admin_dashboard():
@@ -87,38 +139,46 @@ def admin_dashboard():
     # Flag para controlar a renderização dos botões de edição no template
     is_editable = session.get('user_tipo') in ['admin', 'operario']
     
-    # --- Captura filtros enviados pelo GET ---
-    filtro_status = request.args.get("status")
-    filtro_unidade = request.args.get("unidade")
-    filtro_regiao = request.args.get("regiao")
-
-    # --- Query base: Necessário dar JOIN com Usuario para filtrar por nome/região ---
-    query = Solicitacao.query.join(Usuario)
+    # --- Query base: nome/região da UVIS já estão na própria Solicitacao (sem JOIN) ---
+    query = Solicitacao.query
     
-    # 🔑 APLICAÇÃO DOS FILTROS 🔑
-    if filtro_status:
-        query = query.filter(Solicitacao.status == filtro_status)
-
-    if filtro_unidade:
-        query = query.filter(Usuario.nome_uvis.ilike(f"%{filtro_unidade}%"))
+    # 🔑 APLICAÇÃO DOS FILTROS (status/unidade/regiao/q do GET) 🔑
+    query = aplicar_filtros_painel(query, limite_busca=CANDIDATOS_BUSCA)
 
-    if filtro_regiao:
-        query = query.filter(Usuario.regiao.ilike(f"%{filtro_regiao}%"))
-    # 🔑 FIM APLICAÇÃO DOS FILTROS 🔑
-
-    page = request.args.get("page", 1, type=int)
-
-    paginacao = query.order_by(
-        Solicitacao.data_criacao.desc()
-    ).paginate(page=page, per_page=6)
+    if termos_busca(request.args.get("q", "")):
+        # Busca textual: só os mais relevantes, em ordem de relevância
+        pedidos = query.limit(LIMITE_BUSCA).all()
+        paginacao = None
+    else:
+        # Paginação por cursor em (data_criacao, id)
+        paginacao = PaginacaoCursor(
+            query,
+            Solicitacao.data_criacao,
+            Solicitacao.id,
+            cursor=request.args.get("cursor"),
+            per_page=6
+        )
+        pedidos = paginacao.items
 
     # Injeta a data/hora atual (para evitar o erro 'now is undefined' se fosse usado)
     data_atual = datetime.now() 
     
+    # Conflitos de horário/local dos voos da página (uma consulta só)
+    conflitos = mapa_conflitos(pedidos)
+
+    # Opções dos filtros de unidade e região
+    uvis = db.session.query(Usuario.nome_uvis, Usuario.regiao).filter(Usuario.tipo_usuario == 'uvis').all()
+    unidades = sorted({nome for nome, _ in uvis if nome})
+    regioes = sorted({regiao for _, regiao in uvis if regiao})
+
     return render_template(
         'admin.html',
-        pedidos=paginacao.items,
+        pedidos=pedidos,
+        unidades=unidades,
+        regioes=regioes,
         paginacao=paginacao,
+        limite_busca=LIMITE_BUSCA,
+        conflitos=conflitos,
         is_editable=is_editable,
         now=data_atual
     )
@@ -130,29 +190,38 @@ def exportar_excel():
         flash('Permissão negada para exportar.', 'danger')
         return redirect(url_for('main.admin_dashboard'))
 
-    # --- Captura filtros ---
-    filtro_status = request.args.get("status")
-    filtro_unidade = request.args.get("unidade")
-    filtro_regiao = request.args.get("regiao")
-
-    # Query base
-    query = Solicitacao.query.join(Usuario)
-
-    if filtro_status:
-        query = query.filter(Solicitacao.status == filtro_status)
-
-    if filtro_unidade:
-        query = query.filter(Usuario.nome_uvis.ilike(f"%{filtro_unidade}%"))
-
-    if filtro_regiao:
-        query = query.filter(Usuario.regiao.ilike(f"%{filtro_regiao}%"))
+    # Query base: somente as colunas usadas na planilha (UVIS copiada na solicitação)
+    query = db.session.query(
+        Solicitacao.id,
+        Solicitacao.data_agendamento,
+        Solicitacao.hora_agendamento,
+        Solicitacao.logradouro,
+        Solicitacao.numero,
+        Solicitacao.bairro,
+        Solicitacao.cidade,
+        Solicitacao.uf,
+        Solicitacao.cep,
+        Solicitacao.complemento,
+        Solicitacao.latitude,
+        Solicitacao.longitude,
+        Solicitacao.foco,
+        Solicitacao.tipo_visita,
+        Solicitacao.altura_voo,
+        Solicitacao.criadouro,
+        Solicitacao.apoio_cet,
+        Solicitacao.observacao,
+        Solicitacao.status,
+        Solicitacao.protocolo,
+        Solicitacao.justificativa,
+        Solicitacao.nome_uvis,
+        Solicitacao.regiao
+    )
 
-    pedidos = query.order_by(Solicitacao.data_criacao.desc()).all()
+    # --- Filtros do painel ---
+    query = aplicar_filtros_painel(query)
 
-    # --- CRIA EXCEL ---
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Relatório de Solicitações"
+    # Lê em lotes (yield_per) conforme a planilha vai sendo enviada
+    pedidos = query.order_by(Solicitacao.data_criacao.desc()).yield_per(500)
 
     # Cabeçalho atualizado com ENDEREÇO ÚNICO
     headers = [
@@ -165,116 +234,91 @@ def exportar_excel():
         "Observação",
         "Status", "Protocolo", "Justificativa"
     ]
+    # Larguras fixas (textos mais longos quebram linha na célula)
+    larguras = [8, 30, 12, 14, 8, 60, 12, 12, 20, 14, 8, 12, 12, 60, 14, 20, 60]
+
+    def gerar_linhas():
+        for p in pedidos:
+
+            # --- ENDEREÇO COMPLETO ---
+            endereco_completo = (
+                f"{p.logradouro or ''}, {getattr(p, 'numero', '')} - "
+                f"{p.bairro or ''} - "
+                f"{(p.cidade or '')}/{(p.uf or '')} - "
+                f"{p.cep or ''}"
+            )
 
-    # Estilos
-    header_fill = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    # Cabeçalho
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-        cell.border = thin_border
-
-    # Conteúdo
-    row_num = 2
-    for p in pedidos:
-
-        # --- ENDEREÇO COMPLETO ---
-        endereco_completo = (
-            f"{p.logradouro or ''}, {getattr(p, 'numero', '')} - "
-            f"{p.bairro or ''} - "
-            f"{(p.cidade or '')}/{(p.uf or '')} - "
-            f"{p.cep or ''}"
-        )
+            if getattr(p, 'complemento', None):
+                endereco_completo += f" - {p.complemento}"
 
-        if getattr(p, 'complemento', None):
-            endereco_completo += f" - {p.complemento}"
+            # Booleans
+            criadouro_txt = "SIM" if getattr(p, 'criadouro', None) else "NÃO"
+            cet_txt = "SIM" if getattr(p, 'apoio_cet', None) else "NÃO"
+
+            # Data formatada
+            if p.data_agendamento:
+                try:
+                    if isinstance(p.data_agendamento, (date, datetime)):
+                        data_formatada = p.data_agendamento.strftime("%d-%m-%y")
+                    else:
+                        data_formatada = datetime.strptime(str(p.data_agendamento), "%Y-%m-%d").strftime("%d-%m-%y")
+                except ValueError:
+                    data_formatada = str(p.data_agendamento)
+            else:
+                data_formatada = ""
+
+            # Hora formatada
+            hora_formatada = p.hora_agendamento.strftime("%H:%M") if p.hora_agendamento else ""
+
+            # Linha completa
+            yield [
+                p.id,
+                p.nome_uvis,
+                p.regiao,
+                data_formatada,
+                hora_formatada,
+
+                endereco_completo,     # <-- CAMPO ÚNICO AQUI
+
+                getattr(p, 'latitude', ''),
+                getattr(p, 'longitude', ''),
+
+                p.foco,
+                getattr(p, 'tipo_visita', ''),
+                getattr(p, 'altura_voo', ''),
+                criadouro_txt,
+                cet_txt,
+                getattr(p, 'observacao', ''),
+                p.status,
+                p.protocolo,
+                p.justificativa
+            ]
+
+    # Envia a planilha em pedaços, à medida que as linhas são lidas
+    return Response(
+        stream_with_context(gerar_xlsx("Relatório de Solicitações", headers, gerar_linhas(), larguras)),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": "attachment; filename=relatorio_solicitacoes.xlsx"}
+    )
 
-        # Booleans
-        criadouro_txt = "SIM" if getattr(p, 'criadouro', None) else "NÃO"
-        cet_txt = "SIM" if getattr(p, 'apoio_cet', None) else "NÃO"
 
-        # Data formatada
-        if p.data_agendamento:
-            try:
-                if isinstance(p.data_agendamento, (date, datetime)):
-                    data_formatada = p.data_agendamento.strftime("%d-%m-%y")
-                else:
-                    data_formatada = datetime.strptime(str(p.data_agendamento), "%Y-%m-%d").strftime("%d-%m-%y")
-            except ValueError:
-                data_formatada = str(p.data_agendamento)
-        else:
-            data_formatada = ""
-
-        # Linha completa
-        row = [
-            p.id,
-            p.autor.nome_uvis,
-            p.autor.regiao,
-            data_formatada,
-            p.hora_agendamento,
-
-            endereco_completo,     # <-- CAMPO ÚNICO AQUI
-
-            getattr(p, 'latitude', ''),
-            getattr(p, 'longitude', ''),
-
-            p.foco,
-            getattr(p, 'tipo_visita', ''),
-            getattr(p, 'altura_voo', ''),
-            criadouro_txt,
-            cet_txt,
-            getattr(p, 'observacao', ''),
-            p.status,
-            p.protocolo,
-            p.justificativa
-        ]
-
-        # Escreve na planilha
-        for col_num, value in enumerate(row, 1):
-            cell = ws.cell(row=row_num, column=col_num, value=value)
-            cell.border = thin_border
-            cell.alignment = Alignment(vertical="center", wrap_text=True)
-
-        row_num += 1
-
-    # Congela o cabeçalho
-    ws.freeze_panes = "A2"
-
-    # Ajuste automático de largura
-    for col in ws.columns:
-        max_length = 0
-        column_letter = col[0].column_letter
-
-        for cell in col:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
+# --- EXPORTAÇÃO SARPAS (CSV em streaming) ---
+@bp.route('/admin/exportar_sarpas.csv')
+def exportar_sarpas():
+    # Permite APENAS admin e operario
+    if 'user_id' not in session or session.get('user_tipo') not in ['admin', 'operario']:
+        flash('Permissão negada para exportar.', 'danger')
+        return redirect(url_for('main.admin_dashboard'))
 
-        ws.column_dimensions[column_letter].width = max_length + 2
+    query = db.session.query(*COLUNAS_SARPAS)
 
-    # Salvar em memória
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
+    query = aplicar_filtros_painel(query) \
+        .order_by(Solicitacao.data_agendamento, Solicitacao.hora_agendamento)
 
-    # Enviar arquivo
-    return send_file(
-        output,
-        download_name="relatorio_solicitacoes.xlsx",
-        as_attachment=True,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return Response(
+        stream_with_context(gerar_csv_sarpas(query)),
+        mimetype="text/csv; charset=utf-8",
+        headers={"Content-Disposition": "attachment; filename=sarpas_solicitacoes.csv"}
     )
 
 
@@ -289,18 +333,186 @@ def atualizar(id):
     pedido = Solicitacao.query.get_or_404(id)
 
     # Campos de Geo/Status:
-    pedido.protocolo = request.form.get('protocolo')
-    pedido.status = request.form.get('status')
-    pedido.justificativa = request.form.get('justificativa')
-    pedido.latitude = request.form.get('latitude')
-    pedido.longitude = request.form.get('longitude')
-
+    try:
+        pedido.protocolo = request.form.get('protocolo')
+        pedido.status = request.form.get('status')
+        pedido.justificativa = request.form.get('justificativa')
+        pedido.latitude = request.form.get('latitude')
+        pedido.longitude = request.form.get('longitude')
+    except ValueError as ve:
+        # coordenada inválida (validada no modelo)
+        db.session.rollback()
+        flash(str(ve), 'warning')
+        return redirect(url_for('main.admin_dashboard'))
 
     db.session.commit()
     flash('Pedido atualizado com sucesso!', 'success')
 
+    # Aviso (não bloqueia): outro voo ativo perto, no mesmo horário
+    if pedido.status == 'APROVADO':
+        _avisar_conflitos(pedido)
+
     return redirect(url_for('main.admin_dashboard'))
 
+
+# --- AÇÃO EM LOTE (Admin/Operário) ---
+@bp.route('/admin/atualizar_lote', methods=['POST'])
+def atualizar_lote():
+    """
+    Aplica status/protocolo/justificativa às solicitações marcadas
+    (ids) ou a todo o resultado do filtro (escopo=filtro). Responde JSON
+    com o resultado de cada linha; sem JS, resume em flash.
+    """
+    quer_json = request.accept_mimetypes.best == 'application/json'
+
+    if session.get('user_tipo') not in ['admin', 'operario']:
+        if quer_json:
+            return jsonify({"erro": "Permissão negada para esta ação."}), 403
+        flash('Permissão negada para esta ação.', 'danger')
+        return redirect(url_for('main.admin_dashboard'))
+
+    # filtros do painel vêm como campos ocultos (f_status, f_unidade, f_regiao, f_q)
+    filtros = {campo: request.form.get(f"f_{campo}") for campo in ("status", "unidade", "regiao", "q")}
+
+    if request.form.get('escopo') == 'filtro':
+        query = db.session.query(Solicitacao.id)
+        ids = [id_ for (id_,) in aplicar_filtros_painel(query, filtros).limit(MAX_LOTE + 1)]
+    else:
+        ids = request.form.getlist('ids', type=int)
+
+    try:
+        resultados = atualizar_em_lote(
+            ids,
+            status=request.form.get('status'),
+            protocolo=request.form.get('protocolo'),
+            justificativa=request.form.get('justificativa'),
+        )
+    except ErroAcaoLote as e:
+        if quer_json:
+            return jsonify({"erro": str(e)}), 400
+        flash(str(e), 'warning')
+        return redirect(url_for('main.admin_dashboard', **filtros))
+
+    atualizadas = [r.id for r in resultados if r.resultado == ATUALIZADA]
+
+    # Aviso (não bloqueia): aprovadas com outro voo ativo perto, no mesmo horário
+    conflitos = {}
+    if atualizadas and request.form.get('status') == 'APROVADO':
+        conflitos = mapa_conflitos(Solicitacao.query.filter(Solicitacao.id.in_(atualizadas)).all())
+
+    linhas = [
+        {
+            "id": r.id,
+            "resultado": r.resultado,
+            "mensagem": r.mensagem,
+            "status_anterior": r.status_anterior,
+            "conflitos": [c.voo.id for c in conflitos.get(r.id, [])],
+        }
+        for r in resultados
+    ]
+
+    if quer_json:
+        return jsonify({"atualizadas": len(atualizadas), "total": len(resultados), "linhas": linhas})
+
+    flash(f"{len(atualizadas)} de {len(resultados)} solicitação(ões) atualizada(s).", 'success')
+    if conflitos:
+        flash(f"Atenção: possível conflito de voo em {', '.join(f'#{id_}' for id_ in conflitos)}.", 'warning')
+    return redirect(url_for('main.admin_dashboard', **filtros))
+
+
+def _avisar_conflitos(pedido):
+    conflitos = conflitos_da_solicitacao(pedido)
+    if conflitos:
+        lista = "; ".join(
+            f"#{c.voo.id} {c.voo.nome_uvis} ({c.distancia_km:.2f} km, {c.diferenca_min:.0f} min, {c.voo.status})"
+            for c in conflitos[:5]
+        )
+        flash(f"Atenção: possível conflito de voo com {lista}.", "warning")
+
+
+# --- SUGESTÃO DE COORDENADAS (geocodificador offline) ---
+@bp.route('/api/solicitacoes/<int:id>/sugestao_coordenadas')
+def sugestao_coordenadas(id):
+    if 'user_id' not in session or session.get('user_tipo') not in ['admin', 'operario']:
+        return jsonify({"erro": "Acesso restrito"}), 403
+
+    pedido = Solicitacao.query.get_or_404(id)
+    sugestao = sugerir_coordenadas(pedido)
+    if sugestao is None:
+        return jsonify({"erro": "Nenhum endereço parecido na base local"}), 404
+
+    return jsonify({
+        "latitude": round(sugestao.latitude, 6),
+        "longitude": round(sugestao.longitude, 6),
+        "precisao": sugestao.precisao,
+        "fonte": sugestao.fonte,
+        "similaridade": sugestao.similaridade
+    })
+
+
+# --- MÊS/ANO DOS FILTROS ---
+def _mes_ano(valores):
+    """(ano, mes) do GET/POST; fora do calendário vale o mês atual, como um valor não numérico."""
+    hoje = datetime.now()
+    mes = valores.get('mes', type=int)
+    ano = valores.get('ano', type=int)
+    if mes is None or not 1 <= mes <= 12:
+        mes = hoje.month
+    if ano is None or not 1 <= ano < 9999:
+        ano = hoje.year
+    return ano, mes
+
+
+# --- RELATÓRIO MENSAL DE CONFLITOS ---
+@bp.route('/admin/conflitos')
+def relatorio_conflitos():
+    if 'user_id' not in session or session.get('user_tipo') not in ['admin', 'operario', 'visualizar']:
+        flash('Acesso restrito.', 'danger')
+        return redirect(url_for('main.login'))
+
+    ano, mes = _mes_ano(request.args)
+
+    return render_template(
+        'conflitos.html',
+        pares=conflitos_do_mes(ano, mes),
+        mes_selecionado=mes,
+        ano_selecionado=ano,
+        is_editable=session.get('user_tipo') in ['admin', 'operario']
+    )
+
+# --- PLANEJAMENTO DE ROTAS DO DIA (Admin/Operário) ---
+def _data_planejamento():
+    try:
+        return datetime.strptime(request.args.get('data', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return date.today()
+
+
+@bp.route('/admin/rotas')
+def rotas_do_dia():
+    if 'user_id' not in session or session.get('user_tipo') not in ['admin', 'operario']:
+        flash('Acesso restrito.', 'danger')
+        return redirect(url_for('main.admin_dashboard'))
+
+    data = _data_planejamento()
+    return render_template('rotas.html', plano=planejar_dia(data), horario=horario)
+
+
+@bp.route('/admin/rotas/exportar')
+def exportar_rotas():
+    if 'user_id' not in session or session.get('user_tipo') not in ['admin', 'operario']:
+        flash('Permissão negada para exportar.', 'danger')
+        return redirect(url_for('main.admin_dashboard'))
+
+    data = _data_planejamento()
+    plano = planejar_dia(data)
+
+    return Response(
+        stream_with_context(gerar_xlsx("Rotas", CABECALHO_EXPORTACAO, linhas_exportacao(plano))),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename=rotas_{data.isoformat()}.xlsx"}
+    )
+
 # --- ROTA DE EDIÇÃO COMPLETA (Admin) ---
 @bp.route('/admin/editar_completo/<int:id>', methods=['GET', 'POST'], endpoint='admin_editar') 
 def admin_editar_completo(id):
@@ -331,12 +543,9 @@ def admin_editar_completo(id):
             pedido.observacao = request.form.get('observacao')
 
             # 3. Localização
-            pedido.cep = request.form.get('cep')
-            pedido.logradouro = request.form.get('logradouro')
+            for campo, valor in _endereco_do_formulario().items():
+                setattr(pedido, campo, valor)
             pedido.numero = request.form.get('numero')
-            pedido.bairro = request.form.get('bairro')
-            pedido.cidade = request.form.get('cidade')
-            pedido.uf = request.form.get('uf')
             pedido.complemento = request.form.get('complemento')
             
             # GPS
@@ -354,7 +563,7 @@ def admin_editar_completo(id):
         
         except ValueError as ve:
             db.session.rollback()
-            flash(f"Erro no formato de data/hora: {ve}", "warning")
+            flash(f"Erro no formato dos dados: {ve}", "warning")
         except Exception as e:
             db.session.rollback()
             flash(f"Erro ao salvar: {e}", "danger")
@@ -362,6 +571,35 @@ def admin_editar_completo(id):
     # Renderiza o formulário pré-preenchido
     return render_template('admin_editar_completo.html', pedido=pedido)
 
+# --- ENDEREÇO (validação no servidor + consulta de CEP local) ---
+def _endereco_do_formulario():
+    """cep/logradouro/bairro/cidade/uf validados (ValueError se inválidos)."""
+    return validar_endereco(
+        request.form.get('cep'),
+        request.form.get('logradouro'),
+        request.form.get('bairro'),
+        request.form.get('cidade'),
+        request.form.get('uf')
+    )
+
+
+@bp.route('/api/cep/<cep>')
+def consultar_cep(cep):
+    if 'user_id' not in session:
+        return jsonify({"erro": "Não autenticado"}), 401
+
+    try:
+        endereco = buscar_cep(cep)
+    except ValueError as ve:
+        return jsonify({"erro": str(ve)}), 400
+
+    if endereco is None:
+        return jsonify({"erro": "CEP não encontrado"}), 404
+
+    resposta = jsonify(endereco._asdict())
+    resposta.headers['Cache-Control'] = 'private, max-age=86400'
+    return resposta
+
 # --- NOVO PEDIDO ---
 @bp.route('/novo_cadastro', methods=['GET', 'POST'], endpoint='novo')
 def novo():
@@ -395,12 +633,8 @@ def novo():
                 data_agendamento=data_obj,
                 hora_agendamento=hora_obj,
 
-                cep=request.form.get('cep'),
-                logradouro=request.form.get('logradouro'),
-                bairro=request.form.get('bairro'),
-                cidade=request.form.get('cidade'),
+                **_endereco_do_formulario(),
                 numero=request.form.get('numero'),
-                uf=request.form.get('uf'),
                 complemento=request.form.get('complemento'), 
 
                 foco=request.form.get('foco'),
@@ -426,13 +660,72 @@ def novo():
 
         except ValueError as ve:
             db.session.rollback()
-            flash(f"Erro no formato de data/hora: {ve}", "warning")
+            flash(f"Erro no formato dos dados: {ve}", "warning")
         except Exception as e:
             db.session.rollback()
             flash(f"Erro ao salvar: {e}", "danger")
 
     return render_template('cadastro.html', hoje=hoje)
 
+# --- IMPORTAÇÃO EM LOTE (planilha CSV/XLSX) ---
+ERROS_EXIBIDOS = 200
+
+
+@bp.route('/importar', methods=['GET', 'POST'])
+def importar():
+    if 'user_id' not in session or session.get('user_tipo') not in ['uvis', 'admin', 'operario']:
+        flash('Permissão negada para importar.', 'danger')
+        return redirect(url_for('main.login'))
+
+    # UVIS importa para si; admin/operário escolhem a unidade
+    escolhe_unidade = session.get('user_tipo') in ['admin', 'operario']
+    unidades = Usuario.query.filter_by(tipo_usuario='uvis').order_by(Usuario.nome_uvis).all() if escolhe_unidade else []
+
+    resultado = None
+    relatorio_url = None
+
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        usuario_id = request.form.get('usuario_id', type=int) if escolhe_unidade else int(session['user_id'])
+
+        if not arquivo or not arquivo.filename:
+            flash('Selecione um arquivo .csv ou .xlsx.', 'warning')
+        elif escolhe_unidade and not any(u.id == usuario_id for u in unidades):
+            flash('Selecione a unidade (UVIS) das solicitações.', 'warning')
+        else:
+            try:
+                resultado = importar_solicitacoes(arquivo.stream, arquivo.filename, usuario_id)
+            except ValueError as ve:
+                db.session.rollback()
+                flash(f"Arquivo inválido: {ve}", "danger")
+
+        if resultado is not None:
+            flash(f"{resultado.importadas} de {resultado.linhas} linha(s) importada(s).",
+                  'success' if not resultado.erros else 'warning')
+
+            if resultado.erros:
+                # Relatório completo fica disponível pelo download de tarefas (com TTL)
+                caminho = fila_tarefas.novo_arquivo('.csv')
+                with open(caminho, 'w', newline='', encoding='utf-8-sig') as saida:
+                    escrever_relatorio_erros(resultado.erros, saida)
+                tarefa = fila_tarefas.registrar_concluida(
+                    caminho,
+                    usuario_id=session.get('user_id'),
+                    nome_download='erros_importacao.csv',
+                    mimetype='text/csv',
+                    temporario=True
+                )
+                relatorio_url = url_for('main.baixar_tarefa', id=tarefa.id)
+
+    return render_template(
+        'importar.html',
+        resultado=resultado,
+        erros=resultado.erros[:ERROS_EXIBIDOS] if resultado else [],
+        relatorio_url=relatorio_url,
+        unidades=unidades,
+        escolhe_unidade=escolhe_unidade
+    )
+
 # --- LOGIN ---
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -446,6 +739,11 @@ def login():
         user = Usuario.query.filter_by(login=request.form.get('login')).first()
 
         if user and user.check_senha(request.form.get('senha')):
+            # Hash de método/custo antigo: refaz com o SENHA_HASH_METODO atual
+            if precisa_rehash(user.senha_hash):
+                user.set_senha(request.form.get('senha'))
+                db.session.commit()
+
             session['user_id'] = int(user.id)
             session['user_nome'] = user.nome_uvis
             session['user_tipo'] = user.tipo_usuario
@@ -472,53 +770,68 @@ def forcar_erro():
     1 / 0  # erro proposital
     return "nunca vai chegar aqui"
 
-# ReportLab (PDF)
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import mm
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-)
-
-# Openpyxl (Excel)
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-
-# O objeto 'bp' precisa ser definido (Exemplo: bp = Blueprint('main', __name__))
-# E 'Usuario' e 'Solicitacao' precisam ser seus modelos SQLAlchemy
-
 # =======================================================================
-# Função Auxiliar de Filtros (Reutilizada em todas as rotas)
+# ROTA 1: Visualização do Relatório (HTML)
 # =======================================================================
-
-def aplicar_filtros_base(query, filtro_data, uvis_id):
-    """Aplica o filtro de mês/ano e opcionalmente o filtro de UVIS (usuario_id)."""
-    
-    # Filtro de Mês/Ano (obrigatório)
-    query = query.filter(db.func.strftime('%Y-%m', Solicitacao.data_criacao) == filtro_data)
-    
-    # Filtro de UVIS (opcional)
-    if uvis_id:
-        query = query.filter(Solicitacao.usuario_id == uvis_id)
-        
-    return query
-
-
 # =======================================================================
-# ROTA 1: Visualização do Relatório (HTML)
+# GET condicional (ETag / Last-Modified) a partir da versão dos dados
 # =======================================================================
+def _validadores(escopos, *variantes):
+    """
+    ETag forte e Last-Modified dos escopos de dados lidos (app/versoes.py).
+    `variantes` distingue representações diferentes dos mesmos dados
+    (perfil do usuário, parâmetros da consulta...).
+    """
+    escopos = list(escopos)
+    versoes, atualizado_em = estado_versoes(escopos)
+    bruto = json.dumps([escopos, versoes, *variantes], default=str)
+    etag = hashlib.sha256(bruto.encode('utf-8')).hexdigest()[:32]
+    if atualizado_em is not None:
+        atualizado_em = atualizado_em.replace(microsecond=0, tzinfo=timezone.utc)
+    return etag, atualizado_em
+
+
+def _nao_modificado(etag, atualizado_em):
+    """True se o cliente já tem esta versão (If-None-Match tem prioridade)."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and atualizado_em is not None:
+        return atualizado_em <= request.if_modified_since
+    return False
+
+
+def _resposta_condicional(etag, atualizado_em, resposta=None):
+    """Aplica os validadores na resposta; sem resposta, devolve um 304."""
+    if resposta is None:
+        resposta = Response(status=304)
+    resposta.set_etag(etag)
+    if atualizado_em is not None:
+        resposta.last_modified = atualizado_em
+    # dados por usuário: só o navegador guarda, sempre revalidando
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+
 @bp.route('/relatorios', methods=['GET'])
 def relatorios():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
 
     # 1. Parâmetros de Filtro
-    mes_atual = request.args.get('mes', datetime.now().month, type=int)
-    ano_atual = request.args.get('ano', datetime.now().year, type=int)
+    ano_atual, mes_atual = _mes_ano(request.args)
     uvis_id = request.args.get('uvis_id', type=int)
-    filtro_data = f"{ano_atual}-{mes_atual:02d}"
+
+    # 304 antes de qualquer agregação. A página mostra o mês de todas as
+    # UVIS, o histórico mensal, a lista de UVIS e o menu do usuário logado;
+    # com mensagem flash pendente ela é sempre renderizada e não vai para o
+    # cache do navegador.
+    etag, atualizado_em = _validadores(
+        (escopo_mes(ano_atual, mes_atual), ESCOPO_HISTORICO, ESCOPO_USUARIOS), 'relatorios.html', session.get('user_id'), session.get('user_tipo'),
+        ano_atual, mes_atual, uvis_id
+    )
+    com_mensagens = bool(session.get('_flashes'))
+    if not com_mensagens and _nao_modificado(etag, atualizado_em):
+        return _resposta_condicional(etag, atualizado_em)
 
     # 2. UVIS disponíveis para o dropdown
     uvis_disponiveis = db.session.query(Usuario.id, Usuario.nome_uvis) \
@@ -527,105 +840,19 @@ def relatorios():
         .all()
 
     # 3. Histórico Mensal (usado para gerar anos disponíveis - não filtra por uvis_id)
-    dados_mensais_raw = (
-        db.session.query(
-            db.func.strftime('%Y-%m', Solicitacao.data_criacao).label('mes'),
-            db.func.count(Solicitacao.id)
-        )
-        .group_by('mes')
-        .order_by('mes')
-        .all()
-    )
-    dados_mensais = [tuple(row) for row in dados_mensais_raw]
+    dados_mensais = historico_mensal()
 
     anos_disponiveis = sorted(list(set([d[0].split('-')[0] for d in dados_mensais])), reverse=True)
     if not anos_disponiveis:
         anos_disponiveis = [ano_atual]
 
-    # 4. Totalizações (usando a função de filtro)
-    base_query = db.session.query(Solicitacao)
+    # 4. Totalizações e Agrupamentos (uma única consulta agrupada)
+    agregados = calcular_agregados(ano_atual, mes_atual, uvis_id)
 
-    total_solicitacoes = aplicar_filtros_base(base_query, filtro_data, uvis_id).count()
-    
-    total_aprovadas = aplicar_filtros_base(base_query, filtro_data, uvis_id) \
-        .filter(Solicitacao.status == "APROVADO").count()
-
-    total_recusadas = aplicar_filtros_base(base_query, filtro_data, uvis_id) \
-        .filter(Solicitacao.status == "NEGADO").count()
-
-    total_analise = aplicar_filtros_base(base_query, filtro_data, uvis_id) \
-        .filter(Solicitacao.status == "EM ANÁLISE").count()
-
-    total_pendentes = aplicar_filtros_base(base_query, filtro_data, uvis_id) \
-        .filter(Solicitacao.status == "PENDENTE").count()
-
-    # 5. Consultas Agrupadas (usando a função de filtro)
-
-    # Região (requer JOIN)
-    query_regiao = db.session.query(Usuario.regiao, db.func.count(Solicitacao.id)) \
-        .join(Usuario, Usuario.id == Solicitacao.usuario_id)
-    dados_regiao_raw = aplicar_filtros_base(query_regiao, filtro_data, uvis_id) \
-        .group_by(Usuario.regiao) \
-        .order_by(db.func.count(Solicitacao.id).desc()) \
-        .all()
-    dados_regiao = [tuple(row) for row in dados_regiao_raw]
-
-    # Status
-    query_status = db.session.query(Solicitacao.status, db.func.count(Solicitacao.id))
-    dados_status_raw = aplicar_filtros_base(query_status, filtro_data, uvis_id) \
-        .group_by(Solicitacao.status) \
-        .order_by(db.func.count(Solicitacao.id).desc()) \
-        .all()
-    dados_status = [tuple(row) for row in dados_status_raw]
-
-    # Foco
-    query_foco = db.session.query(Solicitacao.foco, db.func.count(Solicitacao.id))
-    dados_foco_raw = aplicar_filtros_base(query_foco, filtro_data, uvis_id) \
-        .group_by(Solicitacao.foco) \
-        .order_by(db.func.count(Solicitacao.id).desc()) \
-        .all()
-    dados_foco = [tuple(row) for row in dados_foco_raw]
-    
-    # Tipo Visita
-    query_tipo_visita = db.session.query(Solicitacao.tipo_visita, db.func.count(Solicitacao.id))
-    dados_tipo_visita_raw = aplicar_filtros_base(query_tipo_visita, filtro_data, uvis_id) \
-        .group_by(Solicitacao.tipo_visita) \
-        .order_by(db.func.count(Solicitacao.id).desc()) \
-        .all()
-    dados_tipo_visita = [tuple(row) for row in dados_tipo_visita_raw]
-    
-    # Altura de Voo
-    query_altura_voo = db.session.query(Solicitacao.altura_voo, db.func.count(Solicitacao.id))
-    dados_altura_voo_raw = aplicar_filtros_base(query_altura_voo, filtro_data, uvis_id) \
-        .group_by(Solicitacao.altura_voo) \
-        .order_by(db.func.count(Solicitacao.id).desc()) \
-        .all()
-    dados_altura_voo = [tuple(row) for row in dados_altura_voo_raw]
-
-    # Unidade (UVIS) - Requer JOIN e filtro adicional de tipo_usuario
-    query_unidade = db.session.query(Usuario.nome_uvis, db.func.count(Solicitacao.id)) \
-        .join(Usuario, Usuario.id == Solicitacao.usuario_id) \
-        .filter(Usuario.tipo_usuario == 'uvis')
-    dados_unidade_raw = aplicar_filtros_base(query_unidade, filtro_data, uvis_id) \
-        .group_by(Usuario.nome_uvis) \
-        .order_by(db.func.count(Solicitacao.id).desc()) \
-        .all()
-    dados_unidade = [tuple(row) for row in dados_unidade_raw]
-
-    # 6. Retorno
-    return render_template(
+    # 5. Retorno
+    html = render_template(
         'relatorios.html',
-        total_solicitacoes=total_solicitacoes,
-        total_aprovadas=total_aprovadas,
-        total_recusadas=total_recusadas,
-        total_analise=total_analise,
-        total_pendentes=total_pendentes,
-        dados_regiao=dados_regiao,
-        dados_status=dados_status,
-        dados_foco=dados_foco,
-        dados_tipo_visita=dados_tipo_visita,
-        dados_altura_voo=dados_altura_voo,
-        dados_unidade=dados_unidade,
+        **agregados,
         dados_mensais=dados_mensais,
         mes_selecionado=mes_atual,
         ano_selecionado=ano_atual,
@@ -633,417 +860,148 @@ def relatorios():
         uvis_id_selecionado=uvis_id, # Passa o ID selecionado
         uvis_disponiveis=uvis_disponiveis # Passa a lista completa para o dropdown
     )
+    if com_mensagens:
+        return html
+    return _resposta_condicional(etag, atualizado_em, make_response(html))
+
+
+@bp.route('/api/relatorios/agregados')
+def api_relatorios_agregados():
+    if 'user_id' not in session:
+        return jsonify(erro="Sessão expirada."), 401
+
+    user_tipo = session.get("user_tipo")
+    user_id = session.get("user_id")
+
+    ano, mes = _mes_ano(request.args)
+    uvis_id = request.args.get('uvis_id', type=int)
+
+    # UVIS recebe apenas os próprios números
+    if user_tipo not in PERFIS_GLOBAIS:
+        uvis_id = user_id
+
+    # 304 antes de qualquer agregação
+    etag, atualizado_em = _validadores(
+        escopos_leitura(user_tipo, user_id, (escopo_mes(ano, mes), ESCOPO_HISTORICO)),
+        'relatorios', ano, mes, uvis_id
+    )
+    if _nao_modificado(etag, atualizado_em):
+        return _resposta_condicional(etag, atualizado_em)
+
+    resposta = jsonify(
+        mes=mes,
+        ano=ano,
+        uvis_id=uvis_id,
+        dados_mensais=historico_mensal(uvis_id),
+        **calcular_agregados(ano, mes, uvis_id)
+    )
+    return _resposta_condicional(etag, atualizado_em, resposta)
 
 
 # =======================================================================
-# ROTA 2: Exportar PDF (Com Filtro UVIS)
+# ROTA 2: Exportar PDF (Com Filtro UVIS) — gerado na fila de tarefas
 # =======================================================================
-import os
-import tempfile
-from io import BytesIO
-from datetime import datetime
-from math import ceil
-
-from flask import send_file, request
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.units import mm
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    PageBreak, Image as RLImage, Flowable, KeepTogether
-)
+def _versao_relatorio(ano, mes, uvis_id, historico=False):
+    """Versão dos dados de um relatório: o mês, a UVIS do título e, no PDF, o gráfico de histórico."""
+    versao = [versao_dados(escopo_mes(ano, mes))]
+    if uvis_id:
+        versao.append(versao_dados(escopo_usuario(uvis_id)))
+    if historico:
+        versao.append(versao_dados(ESCOPO_HISTORICO))
+    return '-'.join(str(v) for v in versao)
 
-# matplotlib é opcional — tentamos importar e marcamos se disponível
-try:
-    import matplotlib.pyplot as plt
-    MATPLOTLIB_AVAILABLE = True
-except Exception:
-    MATPLOTLIB_AVAILABLE = False
 
-@bp.route('/admin/exportar_relatorio_pdf')
-def exportar_relatorio_pdf():
-    # -------------------------
-    # 1. Parâmetros e filtros
-    # -------------------------
-    mes = int(request.args.get('mes', datetime.now().month))
-    ano = int(request.args.get('ano', datetime.now().year))
-    uvis_id = request.args.get('uvis_id', type=int)
-    orient = request.args.get('orient', default='portrait')  # 'portrait' ou 'landscape'
-    filtro_data = f"{ano}-{mes:02d}"
-
-    # 2. Busca Principal para Totais e Detalhes (mesma lógica sua)
-    query_base = db.session.query(Solicitacao, Usuario).join(Usuario, Usuario.id == Solicitacao.usuario_id)
-    query_base = aplicar_filtros_base(query_base, filtro_data, uvis_id)
-    query_results = query_base.order_by(Solicitacao.data_criacao.desc()).all()
-
-    # 3. Totais
-    total_solicitacoes = len(query_results)
-    total_aprovadas = sum(1 for s, u in query_results if s.status == "APROVADO")
-    total_recusadas = sum(1 for s, u in query_results if s.status == "NEGADO")
-    total_analise = sum(1 for s, u in query_results if s.status == "EM ANÁLISE")
-    total_pendentes = sum(1 for s, u in query_results if s.status == "PENDENTE")
-
-    # 4. Buscas agrupadas (mantendo sua lógica)
-    def aplicar_filtros_agrupados(query):
-        query = query.filter(db.func.strftime('%Y-%m', Solicitacao.data_criacao) == filtro_data)
-        if uvis_id:
-            query = query.filter(Solicitacao.usuario_id == uvis_id)
-        return query
-
-    dados_regiao_raw = aplicar_filtros_agrupados(
-        db.session.query(Usuario.regiao, db.func.count(Solicitacao.id)).join(Usuario, Usuario.id == Solicitacao.usuario_id)
-    ).group_by(Usuario.regiao).all()
-    dados_regiao = [(r or "Não informado", c) for r, c in dados_regiao_raw]
-
-    dados_status_raw = aplicar_filtros_agrupados(
-        db.session.query(Solicitacao.status, db.func.count(Solicitacao.id))
-    ).group_by(Solicitacao.status).all()
-    dados_status = [(s or "Não informado", c) for s, c in dados_status_raw]
-
-    dados_foco_raw = aplicar_filtros_agrupados(
-        db.session.query(Solicitacao.foco, db.func.count(Solicitacao.id))
-    ).group_by(Solicitacao.foco).all()
-    dados_foco = [(f or "Não informado", c) for f, c in dados_foco_raw]
-
-    dados_tipo_visita_raw = aplicar_filtros_agrupados(
-        db.session.query(Solicitacao.tipo_visita, db.func.count(Solicitacao.id))
-    ).group_by(Solicitacao.tipo_visita).all()
-    dados_tipo_visita = [(t or "Não informado", c) for t, c in dados_tipo_visita_raw]
-
-    dados_altura_raw = aplicar_filtros_agrupados(
-        db.session.query(Solicitacao.altura_voo, db.func.count(Solicitacao.id))
-    ).group_by(Solicitacao.altura_voo).all()
-    dados_altura_voo = [(a or "Não informado", c) for a, c in dados_altura_raw]
-
-    dados_unidade_query = db.session.query(Usuario.nome_uvis, db.func.count(Solicitacao.id)) \
-        .join(Usuario, Usuario.id == Solicitacao.usuario_id) \
-        .filter(Usuario.tipo_usuario == 'uvis')
-    dados_unidade_raw = aplicar_filtros_agrupados(dados_unidade_query).group_by(Usuario.nome_uvis).order_by(db.func.count(Solicitacao.id).desc()).all()
-    dados_unidade = [(u or "Não informado", c) for u, c in dados_unidade_raw]
-
-    dados_mensais_raw = (
-        db.session.query(
-            db.func.strftime('%Y-%m', Solicitacao.data_criacao).label('mes'),
-            db.func.count(Solicitacao.id)
+def _enfileirar_relatorio_pdf():
+    """Lê os filtros do GET/POST e agenda a geração do PDF."""
+    ano, mes = _mes_ano(request.values)
+    uvis_id = request.values.get('uvis_id', type=int)
+    orient = request.values.get('orient', default='portrait')  # 'portrait' ou 'landscape'
+
+    nome_download = f"{nome_arquivo_relatorio(ano, mes, uvis_id)}.pdf"
+
+    # Cache: mesma chave (parâmetros + versão do mês e do histórico) = mesmo arquivo
+    chave = cache_relatorios.chave(
+        formato='pdf', ano=ano, mes=mes, uvis_id=uvis_id, orient=orient,
+        versao=_versao_relatorio(ano, mes, uvis_id, historico=True)
+    )
+    caminho = cache_relatorios.obter(chave, '.pdf')
+    if caminho:
+        return fila_tarefas.registrar_concluida(
+            caminho, usuario_id=session.get('user_id'), nome_download=nome_download
         )
-        .group_by('mes')
-        .order_by('mes')
-        .all()
+
+    return fila_tarefas.enfileirar(
+        cache_relatorios.gravar, gerar_relatorio_pdf, ano, mes, uvis_id, orient,
+        caminho=cache_relatorios.caminho(chave, '.pdf'),
+        usuario_id=session.get('user_id'),
+        nome_download=nome_download
     )
-    dados_mensais = [(m, c) for m, c in dados_mensais_raw]
-
-    # -------------------------
-    # 5. Preparar documento PDF
-    # -------------------------
-    tmp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    caminho_pdf = tmp_pdf.name
-    tmp_pdf.close()
-
-    pagesize = A4
-    if orient == 'landscape':
-        pagesize = landscape(A4)
-
-    doc = SimpleDocTemplate(caminho_pdf,
-                            pagesize=pagesize,
-                            leftMargin=16*mm, rightMargin=16*mm,
-                            topMargin=16*mm, bottomMargin=20*mm)
-
-    # Styles aprimorados
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('title', parent=styles['Title'], fontSize=22, leading=26, alignment=1, spaceAfter=8, textColor=colors.HexColor('#0d6efd'))
-    subtitle_style = ParagraphStyle('subtitle', parent=styles['Normal'], fontSize=10, textColor=colors.HexColor('#666'), alignment=1, spaceAfter=6)
-    section_h = ParagraphStyle('sec', parent=styles['Heading2'], fontSize=12, spaceAfter=6, textColor=colors.HexColor('#0d6efd'))
-    normal = styles['Normal']
-    small = ParagraphStyle('small', parent=styles['BodyText'], fontSize=9, textColor=colors.HexColor('#555'))
-
-    story = []
-
-    # -------------------------
-    # Funções utilitárias
-    # -------------------------
-    def safe_img_from_plt(fig):
-        """Recebe um matplotlib.figure.Figure, retorna ReportLab Image (BytesIO)."""
-        bio = BytesIO()
-        fig.tight_layout()
-        fig.savefig(bio, format='png', dpi=150, bbox_inches='tight')
-        plt.close(fig)
-        bio.seek(0)
-        return RLImage(bio, width=170*mm)  # escala automática
-
-    def render_small_table(rows, colWidths):
-        tbl = Table(rows, colWidths=colWidths)
-        tbl.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.lightgrey),
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#fbfdff')]),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('TOPPADDING', (0,0), (-1,-1), 4),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-        ]))
-        return tbl
-
-    # -------------------------
-    # Cabeçalho / Capa
-    # -------------------------
-    # Logo: procura em static/logo.png por padrão — se não existir, pula
-    logo_path = os.path.join(os.getcwd(), 'static', 'logo.png')
-    if os.path.exists(logo_path):
-        try:
-            logo = RLImage(logo_path, width=36*mm, height=36*mm)
-        except Exception:
-            logo = None
-    else:
-        logo = None
-
-    # Título e capa
-    story.append(Spacer(1, 6))
-    if logo:
-        # coloca o logo e título lado a lado
-        h = [[logo, Paragraph(f"<b>Relatório Mensal — {mes:02d}/{ano}</b>", title_style)]]
-        cap_tbl = Table(h, colWidths=[40*mm, (doc.width - 40*mm)])
-        cap_tbl.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]))
-        story.append(cap_tbl)
-    else:
-        story.append(Paragraph(f"Relatório Mensal — {mes:02d}/{ano}", title_style))
 
-    # subtítulo e linhas
-    titulo_uvis = ""
-    if uvis_id:
-        uvis_obj = db.session.query(Usuario.nome_uvis).filter(Usuario.id == uvis_id).first()
-        if uvis_obj:
-            titulo_uvis = f" — {uvis_obj.nome_uvis}"
-    story.append(Paragraph(f"Sistema de Gestão de Solicitações{titulo_uvis}", subtitle_style))
-    story.append(Spacer(1, 8))
-
-    # capa: box com resumo principal (centralizado)
-    resumo_box = [
-        ['Métrica', 'Quantidade'],
-        ['Total de Solicitações', str(total_solicitacoes)],
-        ['Aprovadas', str(total_aprovadas)],
-        ['Recusadas', str(total_recusadas)],
-        ['Em Análise', str(total_analise)],
-        ['Pendentes', str(total_pendentes)]
-    ]
-    story.append(render_small_table(resumo_box, [80*mm, 40*mm]))
-    story.append(Spacer(1, 12))
-
-    # Capa: breve meta-infos
-    story.append(Paragraph(f"Gerado por: Sistema SGSV — Gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')}", small))
-    story.append(Spacer(1, 18))
-
-    # -------------------------
-    # Sumário simples (lista de seções)
-    # -------------------------
-    story.append(Paragraph("Sumário", section_h))
-    sumario_itens = [
-        "Resumo Geral",
-        "Solicitações por Região",
-        "Status Detalhado",
-        "Solicitações por Foco / Tipo / Altura",
-        "Solicitações por Unidade (UVIS)",
-        "Histórico Mensal",
-        "Gráficos (Visão Geral)",
-        "Registros Detalhados"
-    ]
-    for i, it in enumerate(sumario_itens, 1):
-        story.append(Paragraph(f"{i}. {it}", normal))
-    story.append(PageBreak())
-
-    # -------------------------
-    # Seções com tabelas (formatadas)
-    # -------------------------
-    # 1) Resumo Geral (repetição do box com estilo)
-    story.append(Paragraph("Resumo Geral", section_h))
-    story.append(render_small_table(resumo_box, [110*mm, 50*mm]))
-    story.append(Spacer(1, 8))
-
-    # 2) Regiões
-    story.append(Paragraph("Solicitações por Região", section_h))
-    rows = [['Região', 'Total']] + [[r, str(c)] for r, c in dados_regiao]
-    story.append(render_small_table(rows, [110*mm, 50*mm]))
-    story.append(Spacer(1, 8))
-
-    # 3) Status
-    story.append(Paragraph("Status Detalhado", section_h))
-    rows = [['Status', 'Total']] + [[s, str(c)] for s, c in dados_status]
-    story.append(render_small_table(rows, [110*mm, 50*mm]))
-    story.append(Spacer(1, 8))
-
-    # 4) Foco / Tipo / Altura
-    story.append(Paragraph("Solicitações por Foco", section_h))
-    rows = [['Foco', 'Total']] + [[f, str(c)] for f, c in dados_foco]
-    story.append(render_small_table(rows, [110*mm, 50*mm]))
-    story.append(Spacer(1, 6))
-
-    story.append(Paragraph("Solicitações por Tipo de Visita", section_h))
-    rows = [['Tipo', 'Total']] + [[t, str(c)] for t, c in dados_tipo_visita]
-    story.append(render_small_table(rows, [110*mm, 50*mm]))
-    story.append(Spacer(1, 6))
-
-    story.append(Paragraph("Solicitações por Altura de Voo", section_h))
-    rows = [['Altura (m)', 'Total']] + [[str(a), str(c)] for a, c in dados_altura_voo]
-    story.append(render_small_table(rows, [110*mm, 50*mm]))
-    story.append(Spacer(1, 8))
-
-    # 5) UVIS
-    story.append(Paragraph("Solicitações por Unidade (UVIS) — Top", section_h))
-    rows = [['Unidade', 'Total']] + [[u, str(c)] for u, c in dados_unidade]
-    story.append(render_small_table(rows, [110*mm, 50*mm]))
-    story.append(Spacer(1, 8))
-
-    # 6) Histórico mensal
-    story.append(Paragraph("Histórico Mensal (Total por Mês)", section_h))
-    rows = [['Mês', 'Total']] + [[m, str(c)] for m, c in dados_mensais]
-    story.append(render_small_table(rows, [70*mm, 40*mm]))
-    story.append(Spacer(1, 12))
-
-    # 7) Gráficos — somente se matplotlib disponível
-    story.append(PageBreak())
-    story.append(Paragraph("Gráficos (Visão Geral)", section_h))
-    if MATPLOTLIB_AVAILABLE:
-        try:
-            # Pie chart: distribuição por status
-            labels = [s for s, _ in dados_status]
-            values = [c for _, c in dados_status]
-            fig1, ax1 = plt.subplots(figsize=(6, 3))
-            ax1.pie(values or [1], labels=labels, autopct=lambda p: f'{p:.0f}%' if p > 0 else '', startangle=90, textprops={'fontsize': 8})
-            ax1.axis('equal')
-            story.append(safe_img_from_plt(fig1))
-            story.append(Spacer(1, 8))
-
-            # Bar chart: top UVIS
-            u_names = [u for u, _ in dados_unidade[:8]]
-            u_vals = [c for _, c in dados_unidade[:8]]
-            fig2, ax2 = plt.subplots(figsize=(8, 2.6))
-            ax2.barh(u_names[::-1] or ['Nenhum'], u_vals[::-1] or [0])
-            ax2.set_xlabel('Total')
-            ax2.set_title('Top UVIS (maiores)', fontsize=9)
-            ax2.tick_params(axis='y', labelsize=8)
-            story.append(safe_img_from_plt(fig2))
-            story.append(Spacer(1, 8))
-
-            # Line chart: histórico mensal
-            months = [m for m, _ in dados_mensais]
-            counts = [c for _, c in dados_mensais]
-            fig3, ax3 = plt.subplots(figsize=(8, 2.6))
-            if months:
-                ax3.plot(months, counts, marker='o', linewidth=1)
-                ax3.set_xticklabels(months, rotation=45, fontsize=8)
-            ax3.set_title('Histórico Mensal', fontsize=9)
-            ax3.grid(axis='y', linestyle=':', linewidth=0.5)
-            story.append(safe_img_from_plt(fig3))
-            story.append(Spacer(1, 6))
-        except Exception:
-            # se algo falhar nos gráficos, apenas passa
-            story.append(Paragraph("Gráficos indisponíveis (erro ao gerar).", normal))
-            story.append(Spacer(1, 8))
-    else:
-        story.append(Paragraph("Matplotlib não disponível — gráficos foram omitidos.", normal))
-        story.append(Spacer(1, 8))
 
-    # 8) Registros detalhados (tabela grande)
-    story.append(PageBreak())
-    story.append(Paragraph("Registros Detalhados", section_h))
-    story.append(Spacer(1, 6))
+def _tarefa_do_usuario(id):
+    """Cada usuário só enxerga as próprias tarefas."""
+    tarefa = fila_tarefas.obter(id)
+    if tarefa is None or tarefa.usuario_id != session.get('user_id'):
+        abort(404)
+    return tarefa
 
-    registros_header = ['Data', 'Hora', 'Unidade', 'Protocolo', 'Status', 'Região', 'Foco', 'Tipo Visita', 'Observação']
-    registros_rows = [registros_header]
 
-    for s, u in query_results:
-        # data/hora safe formatting
-        data_str = ''
-        try:
-            if getattr(s, 'data_agendamento', None):
-                data_str = s.data_agendamento.strftime("%d/%m/%Y") if hasattr(s.data_agendamento, 'strftime') else str(s.data_agendamento)
-            else:
-                data_str = s.data_criacao.strftime("%d/%m/%Y") if hasattr(s.data_criacao, 'strftime') else str(s.data_criacao)
-        except:
-            data_str = str(getattr(s, 'data_agendamento', '') or getattr(s, 'data_criacao', ''))
-
-        hora = getattr(s, 'hora_agendamento', '')
-        hora_str = hora.strftime("%H:%M") if hasattr(hora, 'strftime') else str(hora or '')
-
-        unidade = getattr(u, 'nome_uvis', '') or "Não informado"
-        protocolo = getattr(s, 'protocolo', '') or ''
-        status = getattr(s, 'status', '') or ''
-        regiao = getattr(u, 'regiao', '') or ''
-        foco = getattr(s, 'foco', '') or ''
-        tipo_visita = getattr(s, 'tipo_visita', '') or ''
-        obs = getattr(s, 'observacao', '') or ''
-
-        registros_rows.append([data_str, hora_str, unidade, protocolo, status, regiao, foco, tipo_visita, obs])
-
-    # Dividimos a tabela em pedaços para evitar problemas de memória/páginas
-    # e garantir que não estoure
-    chunk_size = 40
-    for i in range(0, len(registros_rows), chunk_size):
-        chunk = registros_rows[i:i+chunk_size]
-        tbl = Table(chunk, repeatRows=1, colWidths=[18*mm, 14*mm, 35*mm, 26*mm, 22*mm, 28*mm, 28*mm, 30*mm, 45*mm])
-        tbl.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#0d6efd')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 9),
-            ('GRID', (0,0), (-1,-1), 0.25, colors.lightgrey),
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#fbfdff')]),
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('LEFTPADDING', (0,0), (-1,-1), 4),
-            ('RIGHTPADDING', (0,0), (-1,-1), 4),
-            ('TOPPADDING', (0,0), (-1,-1), 3),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 3),
-        ]))
-        story.append(tbl)
-        story.append(Spacer(1, 8))
-        # adiciona quebra de página entre chunks (exceto se for o último)
-        if i + chunk_size < len(registros_rows):
-            story.append(PageBreak())
-
-    # -------------------------
-    # Footer fixo e page numbers
-    # -------------------------
-    # Usaremos canvas callbacks quando build() for chamado.
-    def _header_footer(canvas, doc):
-        # header (linha superior colorida)
-        canvas.saveState()
-        w, h = pagesize
-        # linha azul
-        canvas.setFillColor(colors.HexColor('#0d6efd'))
-        canvas.rect(doc.leftMargin, h - (12*mm), doc.width, 4, fill=1, stroke=0)
-
-        # rodapé: texto e número de página
-        footer_text = "Sistema de Gestão de Solicitações — SGSV"
-        canvas.setFont("Helvetica", 8)
-        canvas.setFillColor(colors.HexColor('#777'))
-        canvas.drawString(doc.leftMargin, 10*mm, footer_text)
-
-        # número de páginas
-        page_num_text = f"Página {canvas.getPageNumber()}"
-        canvas.drawRightString(doc.leftMargin + doc.width, 10*mm, page_num_text)
-        canvas.restoreState()
-
-    # -------------------------
-    # Build e retorno
-    # -------------------------
-    doc.build(story, onFirstPage=_header_footer, onLaterPages=_header_footer)
-
-    # nome do arquivo
-    nome_arquivo = f"relatorio_SGSV_{ano}_{mes:02d}"
-    if uvis_id:
-        nome_arquivo += f"_UVIS_{uvis_id}"
+def _dados_tarefa(tarefa):
+    """JSON de status usado pela tela de relatórios."""
+    dados = tarefa.como_dict()
+    dados['status_url'] = url_for('main.status_tarefa', id=tarefa.id)
+    if tarefa.status == CONCLUIDA:
+        dados['download_url'] = url_for('main.baixar_tarefa', id=tarefa.id)
+    return dados
+
+
+def _resposta_tarefa(tarefa):
+    """202 com o status da tarefa; o cliente consulta `status_url` até ficar pronta."""
+    resposta = jsonify(_dados_tarefa(tarefa))
+    resposta.status_code = 202
+    resposta.headers['Location'] = url_for('main.status_tarefa', id=tarefa.id)
+    return resposta
+
+
+@bp.route('/admin/exportar_relatorio_pdf')
+def exportar_relatorio_pdf():
+    # Sem JavaScript: agenda e responde na hora (o PDF não é gerado na requisição)
+    if 'user_id' not in session:
+        return redirect(url_for('main.login'))
+
+    return _resposta_tarefa(_enfileirar_relatorio_pdf())
+
+
+@bp.route('/admin/tarefas/relatorio_pdf', methods=['POST'])
+def criar_tarefa_relatorio_pdf():
+    if 'user_id' not in session:
+        return jsonify(erro="Sessão expirada."), 401
+
+    return _resposta_tarefa(_enfileirar_relatorio_pdf())
+
+
+@bp.route('/admin/tarefas/<id>')
+def status_tarefa(id):
+    if 'user_id' not in session:
+        return jsonify(erro="Sessão expirada."), 401
+
+    return jsonify(_dados_tarefa(_tarefa_do_usuario(id)))
+
+
+@bp.route('/admin/tarefas/<id>/arquivo')
+def baixar_tarefa(id):
+    if 'user_id' not in session:
+        return redirect(url_for('main.login'))
+
+    tarefa = _tarefa_do_usuario(id)
+    if tarefa.status != CONCLUIDA or not os.path.exists(tarefa.caminho):
+        abort(404)
 
-    # envia o pdf
     return send_file(
-        caminho_pdf,
+        tarefa.caminho,
         as_attachment=True,
-        download_name=f"{nome_arquivo}.pdf",
-        mimetype="application/pdf"
+        download_name=tarefa.nome_download,
+        mimetype=tarefa.mimetype
     )
 
 # =======================================================================
@@ -1055,148 +1013,24 @@ def exportar_relatorio_excel():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
 
-    mes = request.args.get('mes', datetime.now().month, type=int)
-    ano = request.args.get('ano', datetime.now().year, type=int)
+    ano, mes = _mes_ano(request.args)
     uvis_id = request.args.get('uvis_id', type=int) # NOVO FILTRO
-    filtro_data = f"{ano}-{mes:02d}"
-
-    # 2. Busca de Dados
-    query_dados = db.session.query(
-        Solicitacao.id,
-        Solicitacao.status,
-        Solicitacao.foco,
-        Solicitacao.tipo_visita,
-        Solicitacao.altura_voo,
-        Solicitacao.data_agendamento,
-        Solicitacao.hora_agendamento,
-        Solicitacao.cep,
-        Solicitacao.logradouro,
-        Solicitacao.numero,
-        Solicitacao.bairro,
-        Solicitacao.cidade,
-        Solicitacao.uf,
-        Solicitacao.latitude,
-        Solicitacao.longitude,
-        Usuario.nome_uvis,
-        Usuario.regiao
-    ) \
-        .join(Usuario, Usuario.id == Solicitacao.usuario_id) \
-        .filter(db.func.strftime('%Y-%m', Solicitacao.data_criacao) == filtro_data)
-
-    # APLICAÇÃO DO NOVO FILTRO
-    if uvis_id:
-        query_dados = query_dados.filter(Solicitacao.usuario_id == uvis_id)
-
-    dados = query_dados.all()
 
-    # 3. Criar arquivo Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Relatório"
-
-    # Cabeçalho
-    colunas = [
-        "ID", "Status", "Foco", "Tipo Visita", "Altura Voo",
-        "Data Agendamento", "Hora Agendamento",
-        "CEP", "Logradouro", "Número", "Bairro", "Cidade", "UF",
-        "Latitude", "Longitude", "UVIS", "Região"
-    ]
-
-    # ... (Estilos e escrita do cabeçalho) ...
-    header_fill = PatternFill(start_color="1E90FF", end_color="1E90FF", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    center = Alignment(horizontal="center", vertical="center")
-    thin = Side(style='thin', color="000000")
-    thin_border = Border(left=thin, right=thin, top=thin, bottom=thin)
-    zebra1 = PatternFill(start_color="FFFFFFFF", end_color="FFFFFFFF", fill_type="solid")
-    zebra2 = PatternFill(start_color="FFF7FBFF", end_color="FFF7FBFF", fill_type="solid")
-
-    for col_num, col_name in enumerate(colunas, 1):
-        cell = ws.cell(row=1, column=col_num, value=col_name)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center
-        cell.border = thin_border
-
-    # 4. Preenchimento das linhas
-    for row_num, row in enumerate(dados, 2):
-
-        # ---- FORMATAR DATAS ----
-        data_agendamento_fmt = ""
-        if row.data_agendamento:
-            try:
-                data_agendamento_fmt = row.data_agendamento.strftime("%d/%m/%Y")
-            except:
-                data_agendamento_fmt = str(row.data_agendamento)
-
-        # ---- FORMATAR HORA ----
-        hora_agendamento_fmt = ""
-        if row.hora_agendamento:
-            try:
-                hora_agendamento_fmt = row.hora_agendamento.strftime("%H:%M")
-            except:
-                hora_agendamento_fmt = str(row.hora_agendamento)
-
-        # ---- PREENCHER LINHAS ----
-        values = [
-            row.id,
-            row.status,
-            row.foco,
-            row.tipo_visita,
-            row.altura_voo,
-            data_agendamento_fmt,
-            hora_agendamento_fmt,
-            row.cep,
-            row.logradouro,
-            row.numero,
-            row.bairro,
-            row.cidade,
-            row.uf,
-            row.latitude,
-            row.longitude,
-            row.nome_uvis,
-            row.regiao
-        ]
-
-        for col_index, value in enumerate(values, 1):
-            cell = ws.cell(row=row_num, column=col_index, value=value)
-            cell.border = thin_border
-            if col_index in (1, 3, 6, 8, 15, 16):
-                cell.alignment = center
-            else:
-                cell.alignment = Alignment(vertical="top", horizontal="left")
-
-            fill = zebra1 if (row_num % 2 == 0) else zebra2
-            cell.fill = fill
-
-    # 5. Ajustar e Finalizar
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if cell.value is not None:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-        ws.column_dimensions[column].width = max(10, min(max_length + 2, 60))
-
-    ws.freeze_panes = "A2"
-    ws.auto_filter.ref = f"A1:{get_column_letter(len(colunas))}1"
-
-    # Gerar arquivo em memória
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    # Nome do arquivo
-    nome_arquivo = f"relatorio_SGSV_{ano}_{mes:02d}"
-    if uvis_id:
-        nome_arquivo += f"_UVIS_{uvis_id}"
+    # 2. Cache: mesma chave (parâmetros + versão dos dados do mês) = mesmo arquivo
+    chave = cache_relatorios.chave(
+        formato='xlsx', ano=ano, mes=mes, uvis_id=uvis_id,
+        versao=_versao_relatorio(ano, mes, uvis_id)
+    )
+    caminho = cache_relatorios.obter(chave, '.xlsx')
+    if caminho is None:
+        caminho = cache_relatorios.gravar(
+            cache_relatorios.caminho(chave, '.xlsx'),
+            gerar_relatorio_excel, ano, mes, uvis_id
+        )
 
     return send_file(
-        output,
-        download_name=f"{nome_arquivo}.xlsx",
+        caminho,
+        download_name=f"{nome_arquivo_relatorio(ano, mes, uvis_id)}.xlsx",
         as_attachment=True,
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -1235,11 +1069,8 @@ def admin_editar_completo(id):
             pedido.observacao = request.form.get('observacao')
             
             # Endereço
-            pedido.cep = request.form.get('cep')
-            pedido.logradouro = request.form.get('logradouro')
-            pedido.bairro = request.form.get('bairro')
-            pedido.cidade = request.form.get('cidade')
-            pedido.uf = request.form.get('uf')
+            for campo, valor in _endereco_do_formulario().items():
+                setattr(pedido, campo, valor)
             pedido.numero = request.form.get('numero')
             pedido.complemento = request.form.get('complemento')
 
@@ -1265,7 +1096,6 @@ def admin_editar_completo(id):
 
 
 
-from sqlalchemy.orm import joinedload
 from flask import session, flash, redirect, url_for
 
 @bp.route('/admin/deletar/<int:id>', methods=['POST'], endpoint='deletar_registro')
@@ -1275,15 +1105,10 @@ def deletar(id):
         flash('Permissão negada. Apenas administradores podem deletar registros.', 'danger')
         return redirect(url_for('main.admin_dashboard'))
 
-    # Carrega o autor junto (evita lazy load pós-delete)
-    pedido = (
-        Solicitacao.query
-        .options(joinedload(Solicitacao.autor))
-        .get_or_404(id)
-    )
+    pedido = Solicitacao.query.get_or_404(id)
 
     pedido_id = pedido.id
-    autor_nome = pedido.autor.nome_uvis if pedido.autor else "UVIS"
+    autor_nome = pedido.nome_uvis or "UVIS"
 
     try:
         db.session.delete(pedido)
@@ -1303,29 +1128,73 @@ def agenda():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
 
+    # Os eventos são buscados pelo FullCalendar, por intervalo visível
+    return render_template("agenda.html", eventos_url=url_for('main.api_agenda_eventos'))
+
+
+# Maior janela aceita pelo feed (a visão mensal pede ~6 semanas)
+MAX_DIAS_AGENDA = 366
+
+
+def _data_iso(valor):
+    """'2025-11-30' ou '2025-11-30T00:00:00-03:00' (formato do FullCalendar) -> date."""
+    try:
+        return date.fromisoformat((valor or '')[:10])
+    except ValueError:
+        return None
+
+
+@bp.route("/api/agenda/events")
+def api_agenda_eventos():
+    if 'user_id' not in session:
+        return jsonify(erro="Sessão expirada."), 401
+
+    inicio = _data_iso(request.args.get('start'))
+    fim = _data_iso(request.args.get('end'))
+    if not inicio or not fim or fim <= inicio:
+        return jsonify(erro="Parâmetros 'start' e 'end' inválidos."), 400
+    if (fim - inicio).days > MAX_DIAS_AGENDA:
+        return jsonify(erro=f"Intervalo máximo de {MAX_DIAS_AGENDA} dias."), 400
+
     user_tipo = session.get("user_tipo")
     user_id = session.get("user_id")
 
+    # 304 antes da consulta; o perfil entra na ETag (muda o link do evento)
+    etag, atualizado_em = _validadores(
+        escopos_leitura(user_tipo, user_id, escopos_agenda(inicio, fim)), 'agenda', user_tipo, inicio, fim
+    )
+    if _nao_modificado(etag, atualizado_em):
+        return _resposta_condicional(etag, atualizado_em)
+
+    # Somente as colunas do evento (nome da UVIS copiado na solicitação);
+    # o intervalo [start, end) usa o índice de data_agendamento
+    query = db.session.query(
+        Solicitacao.id,
+        Solicitacao.data_agendamento,
+        Solicitacao.hora_agendamento,
+        Solicitacao.foco,
+        Solicitacao.status,
+        Solicitacao.nome_uvis
+    ).filter(
+        Solicitacao.data_agendamento >= inicio,
+        Solicitacao.data_agendamento < fim
+    )
+
     # Admin, Operário e Visualizar enxergam tudo
-    if user_tipo in ['admin', 'operario', 'visualizar']:
-        eventos = Solicitacao.query.options(joinedload(Solicitacao.autor)).all()
-    else:
-        # UVIS vê apenas seus próprios agendamentos
-        eventos = Solicitacao.query \
-            .filter_by(usuario_id=user_id) \
-            .options(joinedload(Solicitacao.autor)).all()
+    if user_tipo not in PERFIS_GLOBAIS:
+        # UVIS vê apenas seus próprios agendamentos
+        query = query.filter(Solicitacao.usuario_id == user_id)
+
+    eventos = query.order_by(Solicitacao.data_agendamento, Solicitacao.hora_agendamento)
 
     # Converter eventos para o FullCalendar (JSON)
     agenda_eventos = []
     for e in eventos:
-        if not e.data_agendamento:
-            continue
-
         data = e.data_agendamento.strftime("%Y-%m-%d")
         hora = e.hora_agendamento.strftime("%H:%M") if e.hora_agendamento else "00:00"
 
         agenda_eventos.append({
-            "title": f"{e.foco} - {e.autor.nome_uvis}",
+            "title": f"{e.foco} - {e.nome_uvis}",
             "start": f"{data}T{hora}",
             "url": url_for("main.admin_editar", id=e.id) if user_tipo in ["admin", "operario"] else None,
             "color": "#198754" if e.status == "APROVADO" else
@@ -1334,4 +1203,4 @@ def agenda():
                      "#0d6efd"
         })
 
-    return render_template("agenda.html", eventos_json=json.dumps(agenda_eventos))
\ No newline at end of file
+    return _resposta_condicional(etag, atualizado_em, jsonify(agenda_eventos))
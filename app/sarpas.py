@@ -0,0 +1,87 @@
+import csv
+
+from app.models import Solicitacao
+
+# =======================================================================
+# Exportação SARPAS (RF06)
+# =======================================================================
+# Layout em CSV (separador ';', UTF-8 com BOM para abrir direto no Excel)
+# usado na importação em massa das solicitações no sistema de controle do
+# espaço aéreo. Cada item é (título da coluna, coluna do banco).
+
+LAYOUT_SARPAS = [
+    ("ID Solicitação", Solicitacao.id),
+    ("Protocolo DECEA", Solicitacao.protocolo),
+    ("Data do Voo", Solicitacao.data_agendamento),
+    ("Hora Início", Solicitacao.hora_agendamento),
+    ("Latitude", Solicitacao.latitude),
+    ("Longitude", Solicitacao.longitude),
+    ("Altura Máxima (m)", Solicitacao.altura_voo),
+    ("Logradouro", Solicitacao.logradouro),
+    ("Número", Solicitacao.numero),
+    ("Bairro", Solicitacao.bairro),
+    ("Cidade", Solicitacao.cidade),
+    ("UF", Solicitacao.uf),
+    ("CEP", Solicitacao.cep),
+    ("Unidade Solicitante", Solicitacao.nome_uvis),
+    ("Região", Solicitacao.regiao),
+    ("Tipo de Operação", Solicitacao.tipo_visita),
+    ("Foco", Solicitacao.foco),
+    ("Apoio CET", Solicitacao.apoio_cet),
+    ("Status", Solicitacao.status),
+]
+
+COLUNAS_SARPAS = [coluna for _, coluna in LAYOUT_SARPAS]
+INDICE_ALTURA = next(i for i, coluna in enumerate(COLUNAS_SARPAS) if coluna is Solicitacao.altura_voo)
+
+LINHAS_POR_LOTE = 1000
+
+
+class _Linha:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de gravá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def _formatar(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "SIM" if valor else "NÃO"
+    if hasattr(valor, 'hour') and not hasattr(valor, 'year'):
+        return valor.strftime("%H:%M")
+    if hasattr(valor, 'strftime'):
+        return valor.strftime("%d/%m/%Y")
+    return str(valor)
+
+
+def _altura_metros(valor):
+    # "30m" -> "30"
+    return _formatar(valor).lower().replace("m", "").strip()
+
+
+def gerar_csv_sarpas(query):
+    """
+    Generator com as linhas do CSV SARPAS. A query deve selecionar
+    COLUNAS_SARPAS; é lida por cursor no servidor (stream_results) em lotes,
+    então o uso de memória não depende do tamanho da exportação.
+    """
+    escritor = csv.writer(_Linha(), delimiter=';', lineterminator='\r\n')
+
+    yield '\ufeff' + escritor.writerow([titulo for titulo, _ in LAYOUT_SARPAS])
+
+    linhas = query.execution_options(stream_results=True, yield_per=LINHAS_POR_LOTE)
+
+    lote = []
+    for row in linhas:
+        valores = [_formatar(v) for v in row]
+        valores[INDICE_ALTURA] = _altura_metros(row[INDICE_ALTURA])
+        lote.append(escritor.writerow(valores))
+
+        if len(lote) >= LINHAS_POR_LOTE:
+            yield ''.join(lote)
+            lote = []
+
+    if lote:
+        yield ''.join(lote)
@@ -0,0 +1,50 @@
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# =======================================================================
+# Hash de Senhas (algoritmo e custo configuráveis)
+# =======================================================================
+# SENHA_HASH_METODO segue o formato do werkzeug:
+#
+#     'scrypt:32768:8:1'       -> scrypt, N=32768, r=8, p=1 (padrão)
+#     'pbkdf2:sha256:600000'   -> PBKDF2-SHA256 com 600 mil iterações
+#
+# O custo de cada login é o custo de um hash nesse método; meça com
+# benchmarks/bench_senhas.py antes de mudar (o pico é às 8h, quando as
+# UVIS entram juntas).
+#
+# Hashes gravados com outro método/custo continuam válidos: no próximo
+# login bem-sucedido a senha é refeita com o método atual
+# (precisa_rehash + Usuario.set_senha).
+
+METODO_PADRAO = 'scrypt:32768:8:1'
+SALT_PADRAO = 16
+
+
+def metodo_atual():
+    if has_app_context():
+        return current_app.config.get('SENHA_HASH_METODO', METODO_PADRAO)
+    return METODO_PADRAO
+
+
+@lru_cache(maxsize=8)
+def _prefixo(metodo):
+    """Prefixo que o werkzeug grava para o método (ex.: 'pbkdf2' -> 'pbkdf2:sha256:600000')."""
+    return generate_password_hash('', metodo, salt_length=1).split('$', 1)[0]
+
+
+def gerar_hash(senha, metodo=None):
+    metodo = metodo or metodo_atual()
+    salt = current_app.config.get('SENHA_HASH_SALT', SALT_PADRAO) if has_app_context() else SALT_PADRAO
+    return generate_password_hash(senha, metodo, salt_length=salt)
+
+
+def verificar(senha_hash, senha):
+    return check_password_hash(senha_hash, senha)
+
+
+def precisa_rehash(senha_hash, metodo=None):
+    """True se o hash foi gerado com outro método ou custo que o configurado."""
+    return senha_hash.split('$', 1)[0] != _prefixo(metodo or metodo_atual())
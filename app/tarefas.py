@@ -0,0 +1,225 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# =======================================================================
+# Fila de Tarefas em Segundo Plano
+# =======================================================================
+# Executa geração de arquivos pesados (ex.: PDF do relatório mensal) num
+# pool de threads, fora da requisição. O navegador consulta o status pela
+# API e baixa o arquivo quando pronto.
+#
+# Os arquivos gerados ficam num diretório de artefatos gerenciado
+# (RELATORIOS_DIR) e são apagados após RELATORIOS_TTL segundos.
+#
+# Cada tarefa grava também `<id>.json` (dono, status, arquivo) no mesmo
+# diretório, a cada mudança de status: com vários workers, a consulta de
+# status e o download podem cair em outro processo, que lê o JSON. A
+# limpeza parte desses JSONs: só apaga o que a fila criou.
+#
+# Uma fila por aplicação, em app.extensions['fila_tarefas'] (ver
+# create_app).
+
+# Arquivos da fila no diretório: '<id>.json' e a troca atômica dele
+ESTADO = re.compile(r'^([0-9a-f]{32})\.json(\.\d+\.tmp)?$')
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+ERRO = 'erro'
+
+
+class Tarefa:
+    def __init__(self, id, usuario_id, caminho, nome_download, mimetype):
+        self.id = id
+        self.usuario_id = usuario_id
+        self.caminho = caminho
+        self.nome_download = nome_download
+        self.mimetype = mimetype
+        self.status = PENDENTE
+        self.erro = None
+        self.criada_em = time.time()
+        self.temporario = False
+
+    def como_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'erro': self.erro,
+        }
+
+    # Campos gravados no JSON da tarefa
+    CAMPOS = ('id', 'usuario_id', 'caminho', 'nome_download', 'mimetype',
+              'status', 'erro', 'criada_em', 'temporario')
+
+    def para_json(self):
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+    @classmethod
+    def de_json(cls, dados):
+        tarefa = cls(dados['id'], dados['usuario_id'], dados['caminho'],
+                     dados['nome_download'], dados['mimetype'])
+        for campo in ('status', 'erro', 'criada_em', 'temporario'):
+            setattr(tarefa, campo, dados[campo])
+        return tarefa
+
+
+class FilaTarefas:
+    """Fila de uma aplicação: FilaTarefas(app) a registra em app.extensions."""
+
+    def __init__(self, app):
+        app.config.setdefault('RELATORIOS_WORKERS', 2)
+        app.config.setdefault('RELATORIOS_DIR', os.path.join(app.instance_path, 'relatorios'))
+        app.config.setdefault('RELATORIOS_TTL', 60 * 60)
+
+        self.app = app
+        self.tarefas = {}
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config['RELATORIOS_WORKERS'],
+            thread_name_prefix='sgsv-tarefa'
+        )
+        os.makedirs(self.diretorio, exist_ok=True)
+        app.extensions['fila_tarefas'] = self
+
+    @property
+    def diretorio(self):
+        return self.app.config['RELATORIOS_DIR']
+
+    @property
+    def ttl(self):
+        return self.app.config['RELATORIOS_TTL']
+
+    # -----------------------------
+    # Enfileirar / Consultar
+    # -----------------------------
+    def enfileirar(self, funcao, *args, usuario_id=None, extensao='.pdf', caminho=None,
+                   nome_download=None, mimetype='application/pdf', **kwargs):
+        """
+        Agenda funcao(caminho_arquivo, *args, **kwargs) no pool.
+        A função roda dentro de um app_context e deve gravar o arquivo em caminho_arquivo.
+        Sem `caminho`, o arquivo vai para o diretório de artefatos (com TTL);
+        com `caminho`, quem chama é dono do arquivo (ex.: cache de relatórios).
+        """
+        self.limpar_expirados()
+
+        id = uuid.uuid4().hex
+        temporario = caminho is None
+        if temporario:
+            caminho = os.path.join(self.diretorio, f"{id}{extensao}")
+
+        tarefa = Tarefa(id, usuario_id, caminho, nome_download or os.path.basename(caminho), mimetype)
+        tarefa.temporario = temporario
+        self._registrar(tarefa)
+
+        self.executor.submit(self._executar, tarefa, funcao, args, kwargs)
+        return tarefa
+
+    def registrar_concluida(self, caminho, usuario_id=None, nome_download=None, mimetype='application/pdf',
+                            temporario=False):
+        """
+        Registra uma tarefa já concluída para um arquivo existente (ex.: acerto
+        de cache). Com temporario=True o arquivo é apagado junto com a tarefa.
+        """
+        tarefa = Tarefa(uuid.uuid4().hex, usuario_id, caminho,
+                        nome_download or os.path.basename(caminho), mimetype)
+        tarefa.status = CONCLUIDA
+        tarefa.temporario = temporario
+        self._registrar(tarefa)
+        return tarefa
+
+    def novo_arquivo(self, extensao):
+        """Caminho livre no diretório de artefatos (registre com temporario=True)."""
+        return os.path.join(self.diretorio, f"{uuid.uuid4().hex}{extensao}")
+
+    def _registrar(self, tarefa):
+        with self._lock:
+            self.tarefas[tarefa.id] = tarefa
+        self._gravar_estado(tarefa)
+
+    def _caminho_estado(self, id):
+        return os.path.join(self.diretorio, f"{id}.json")
+
+    def _gravar_estado(self, tarefa):
+        """Grava o JSON da tarefa (troca atômica: quem lê nunca vê arquivo pela metade)."""
+        destino = self._caminho_estado(tarefa.id)
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(tarefa.para_json(), arquivo)
+        os.replace(temporario, destino)
+
+    def obter(self, id):
+        """Tarefa deste processo ou, se foi criada por outro worker, lida do JSON."""
+        with self._lock:
+            tarefa = self.tarefas.get(id)
+        if tarefa is not None:
+            return tarefa
+
+        if not id.isalnum():
+            return None
+        try:
+            with open(self._caminho_estado(id), encoding='utf-8') as arquivo:
+                return Tarefa.de_json(json.load(arquivo))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        tarefa.status = EXECUTANDO
+        self._gravar_estado(tarefa)
+        with self.app.app_context():
+            try:
+                funcao(tarefa.caminho, *args, **kwargs)
+                tarefa.status = CONCLUIDA
+            except Exception as e:
+                self.app.logger.exception("Falha na tarefa %s", tarefa.id)
+                tarefa.erro = str(e)
+                tarefa.status = ERRO
+                if tarefa.temporario and os.path.exists(tarefa.caminho):
+                    os.remove(tarefa.caminho)
+        self._gravar_estado(tarefa)
+
+    # -----------------------------
+    # Limpeza por TTL
+    # -----------------------------
+    def limpar_expirados(self):
+        """
+        Remove as tarefas mais antigas que o TTL: o JSON e, se a fila criou o
+        arquivo (temporario), o arquivo. Outros arquivos do diretório ficam.
+        """
+        limite = time.time() - self.ttl
+
+        with self._lock:
+            expiradas = [
+                id for id, t in self.tarefas.items()
+                if t.criada_em < limite and t.status in (CONCLUIDA, ERRO)
+            ]
+            for id in expiradas:
+                del self.tarefas[id]
+
+        for nome in os.listdir(self.diretorio):
+            encontrado = ESTADO.match(nome)
+            if encontrado is None:
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                if os.path.getmtime(caminho) >= limite:
+                    continue
+                # o JSON é regravado a cada mudança de status: velho = tarefa encerrada
+                if not encontrado.group(2):
+                    tarefa = self.obter(encontrado.group(1))
+                    if tarefa is not None and tarefa.temporario:
+                        self._remover(tarefa.caminho)
+                os.remove(caminho)
+            except OSError:
+                # arquivo removido/aberto por outra thread: tenta de novo na próxima limpeza
+                pass
+
+    def _remover(self, caminho):
+        """Apaga um arquivo da tarefa, só se estiver no diretório de artefatos."""
+        diretorio = os.path.realpath(self.diretorio)
+        if os.path.dirname(os.path.realpath(caminho)) == diretorio and os.path.exists(caminho):
+            os.remove(caminho)
@@ -0,0 +1,118 @@
+import time
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from flask import current_app, session
+
+from app import db
+from app.models import Usuario
+from app.versoes import ESCOPO_USUARIOS, versao_dados
+
+# =======================================================================
+# Usuário Logado (carregado uma vez por requisição, com cache)
+# =======================================================================
+# A sessão (cookie) guarda só o user_id. Perfil e unidade vêm do banco,
+# por um cache LRU em memória com validade (USUARIOS_CACHE_TTL segundos,
+# até USUARIOS_CACHE_MAX usuários).
+#
+# Cada acerto confere a versão 'usuarios' (uma linha de versoes_dados),
+# incrementada na mesma transação que altera login, nome, região ou perfil
+# de um Usuario ou o remove (app/versoes.py). Versão nova esvazia o cache,
+# então uma troca de perfil ou remoção vale na próxima requisição em todos
+# os processos do servidor. A validade só cobre alterações feitas direto
+# no banco, fora da aplicação.
+#
+# user_tipo/user_nome continuam na sessão para as rotas que os leem;
+# usuario_da_sessao() os corrige quando o banco mudou e encerra a sessão
+# de usuários removidos.
+
+TTL_PADRAO = 60
+MAX_PADRAO = 1000
+
+
+class UsuarioAtual(namedtuple('UsuarioAtual', 'id login nome_uvis regiao tipo_usuario')):
+    """Dados do usuário logado usados nas rotas e templates (current_user)."""
+    __slots__ = ()
+
+    is_authenticated = True
+
+    @property
+    def name(self):
+        return self.nome_uvis
+
+
+class _Anonimo:
+    is_authenticated = False
+    id = login = nome_uvis = regiao = tipo_usuario = name = None
+
+
+ANONIMO = _Anonimo()
+
+_memoria = OrderedDict()  # id -> (expira_em, UsuarioAtual)
+_versao_memoria = None
+_trava = Lock()
+
+
+def obter_usuario(usuario_id):
+    """UsuarioAtual do id (do cache, se ainda válido), ou None se não existir."""
+    global _versao_memoria
+    agora = time.monotonic()
+    versao = versao_dados(ESCOPO_USUARIOS)
+    with _trava:
+        if _versao_memoria != versao:
+            _memoria.clear()
+            _versao_memoria = versao
+        item = _memoria.get(usuario_id)
+        if item is not None and item[0] > agora:
+            _memoria.move_to_end(usuario_id)
+            return item[1]
+
+    linha = db.session.query(
+        Usuario.id, Usuario.login, Usuario.nome_uvis, Usuario.regiao, Usuario.tipo_usuario
+    ).filter(Usuario.id == usuario_id).first()
+    if linha is None:
+        invalidar([usuario_id])
+        return None
+
+    usuario = UsuarioAtual(*linha)
+    config = current_app.config
+    with _trava:
+        if _versao_memoria != versao:
+            return usuario
+        _memoria[usuario_id] = (agora + config.get('USUARIOS_CACHE_TTL', TTL_PADRAO), usuario)
+        _memoria.move_to_end(usuario_id)
+        while len(_memoria) > config.get('USUARIOS_CACHE_MAX', MAX_PADRAO):
+            _memoria.popitem(last=False)
+    return usuario
+
+
+def invalidar(ids=None):
+    """Remove os usuários `ids` do cache (todos, sem argumento)."""
+    global _versao_memoria
+    with _trava:
+        if ids is None:
+            _memoria.clear()
+            _versao_memoria = None
+        for usuario_id in ids or ():
+            _memoria.pop(usuario_id, None)
+
+
+def usuario_da_sessao():
+    """Usuário logado da requisição atual (None se anônimo)."""
+    try:
+        usuario_id = int(session['user_id'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    usuario = obter_usuario(usuario_id)
+    if usuario is None:
+        # removido do banco: encerra a sessão
+        session.clear()
+        return None
+
+    if session.get('user_tipo') != usuario.tipo_usuario:
+        session['user_tipo'] = usuario.tipo_usuario
+    if session.get('user_nome') != usuario.nome_uvis:
+        session['user_nome'] = usuario.nome_uvis
+    return usuario
+
@@ -0,0 +1,225 @@
+from datetime import date, datetime
+
+from sqlalchemy import event, extract, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.banco import insert_com_conflito
+from app.models import Usuario, Solicitacao, VersaoDados, EstatisticaMensal
+
+# =======================================================================
+# Versões dos Dados
+# =======================================================================
+# Cada escopo tem um contador em `versoes_dados`, incrementado na mesma
+# transação da alteração (Solicitacao: app/efeitos.py; Usuario: eventos
+# de sessão abaixo):
+#
+# - 'mes:AAAA-MM'    -> Solicitacao criada naquele mês (relatórios)
+# - 'agenda:AAAA-MM' -> Solicitacao agendada naquele mês (agenda)
+# - 'usuario:<id>'   -> Solicitacao da UVIS <id>, ou o próprio Usuario <id>
+# - 'historico'      -> Solicitacao criada/removida ou com data_criacao ou
+#                       UVIS alterada (gráfico de totais por mês)
+# - 'enderecos'      -> Solicitacao criada/removida ou com endereço ou
+#                       coordenadas alterados (índice do geocodificador)
+# - 'usuarios'       -> Usuario criado, removido ou com login, nome,
+#                       região ou perfil alterados (cache do usuário
+#                       logado, lista de UVIS dos relatórios)
+# - 'ceps'           -> CEPs importados por `flask cep importar` (LRU de
+#                       app/cep.py)
+#
+# Não há um escopo "tudo" que toda gravação incrementaria (todas
+# disputariam a mesma linha de `versoes_dados`): cada gravação incrementa
+# só os meses e a UVIS que tocou, e quem lê os dados de todas as UVIS
+# combina os escopos dos meses exibidos (escopos_leitura).
+#
+# Renomear uma UVIS ou mudar a região dela incrementa também o 'mes:' e o
+# 'agenda:' de cada mês em que ela tem solicitações (relatórios e agenda
+# imprimem nome e região copiados nas solicitações).
+#
+# Caches (ex.: relatórios gerados) e ETags usam a versão e ficam
+# inválidos automaticamente.
+
+CHAVE_SESSAO = 'escopos_alterados'
+
+ESCOPO_HISTORICO = 'historico'
+ESCOPO_ENDERECOS = 'enderecos'
+ESCOPO_USUARIOS = 'usuarios'
+ESCOPO_CEPS = 'ceps'
+
+# Colunas de Solicitacao lidas pelo índice do geocodificador
+CAMPOS_ENDERECO = ('cep', 'logradouro', 'numero', 'cidade', 'uf', 'latitude', 'longitude', 'coordenadas_origem')
+
+# Perfis que enxergam os dados de todas as UVIS
+PERFIS_GLOBAIS = ('admin', 'operario', 'visualizar')
+
+# Atributos de Usuario que não aparecem em nenhum dado versionado
+CAMPOS_SEM_VERSAO = ('senha_hash',)
+
+# Colunas de Usuario guardadas no cache do usuário logado
+CAMPOS_USUARIO_LOGADO = ('login', 'nome_uvis', 'regiao', 'tipo_usuario')
+
+
+def escopo_mes(ano, mes):
+    return f"mes:{ano:04d}-{mes:02d}"
+
+
+def escopo_usuario(usuario_id):
+    return f"usuario:{usuario_id}"
+
+
+def escopo_agenda(ano, mes):
+    return f"agenda:{ano:04d}-{mes:02d}"
+
+
+def escopos_agenda(inicio, fim):
+    """'agenda:' de cada mês do intervalo [inicio, fim)."""
+    escopos = []
+    ano, mes = inicio.year, inicio.month
+    while date(ano, mes, 1) < fim:
+        escopos.append(escopo_agenda(ano, mes))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return escopos
+
+
+def escopos_leitura(user_tipo, user_id, escopos):
+    """
+    Escopos dos dados visíveis para o usuário logado: a UVIS enxerga só os
+    próprios dados; os perfis globais, os `escopos` (meses) exibidos.
+    """
+    if user_tipo in PERFIS_GLOBAIS:
+        return tuple(escopos)
+    return (escopo_usuario(user_id),)
+
+
+def _escopo_da_data(data):
+    data = data or datetime.utcnow()
+    return escopo_mes(data.year, data.month)
+
+
+def versao_dados(escopo):
+    """Versão atual do escopo (0 se nunca houve alteração)."""
+    versao = db.session.query(VersaoDados.versao).filter(VersaoDados.escopo == escopo).scalar()
+    return versao or 0
+
+
+def estado_versoes(escopos):
+    """
+    ([versao de cada escopo], atualizado_em mais recente), numa consulta;
+    escopo sem alteração conta como versão 0.
+    """
+    linhas = db.session.query(VersaoDados.escopo, VersaoDados.versao, VersaoDados.atualizado_em) \
+        .filter(VersaoDados.escopo.in_(escopos)).all()
+    versoes = {linha.escopo: linha.versao for linha in linhas}
+    atualizado_em = max((linha.atualizado_em for linha in linhas), default=None)
+    return [versoes.get(escopo, 0) for escopo in escopos], atualizado_em
+
+
+def incrementar_versoes(conexao, escopos):
+    """Incrementa (ou cria) o contador de cada escopo usando a conexão informada."""
+    tabela = VersaoDados.__table__
+    agora = datetime.utcnow()
+
+    for escopo in sorted(escopos):
+        # cria com 1 ou incrementa, num comando só (sem corrida na criação)
+        insert = insert_com_conflito(conexao, tabela).values(escopo=escopo, versao=1, atualizado_em=agora)
+        conexao.execute(insert.on_conflict_do_update(
+            index_elements=[tabela.c.escopo],
+            set_={'versao': tabela.c.versao + 1, 'atualizado_em': insert.excluded.atualizado_em},
+        ))
+
+
+def escopos_das_mudancas(mudancas):
+    """
+    Escopos afetados por solicitações [(valores_antes, valores_depois), ...]
+    (None = inserida/removida; ver app/efeitos.py). Inclui mês/UVIS antigos.
+    """
+    escopos = set()
+    for antes, depois in mudancas:
+        for valores in (antes, depois):
+            if valores is not None:
+                escopos.add(_escopo_da_data(valores['data_criacao']))
+                agendada = valores['data_agendamento']
+                if agendada is not None:
+                    escopos.add(escopo_agenda(agendada.year, agendada.month))
+                if valores['usuario_id'] is not None:
+                    escopos.add(escopo_usuario(valores['usuario_id']))
+
+        if antes is None or depois is None:
+            escopos |= {ESCOPO_HISTORICO, ESCOPO_ENDERECOS}
+            continue
+        if any(antes[campo] != depois[campo] for campo in ('data_criacao', 'usuario_id')):
+            escopos.add(ESCOPO_HISTORICO)
+        if any(antes[campo] != depois[campo] for campo in CAMPOS_ENDERECO):
+            escopos.add(ESCOPO_ENDERECOS)
+    return escopos
+
+
+def _alterou_dados_do_usuario(usuario):
+    """Troca de senha (ou rehash no login) não muda agenda nem relatórios."""
+    estado = inspect(usuario)
+    return any(
+        atributo.history.has_changes()
+        for atributo in estado.attrs
+        if atributo.key not in CAMPOS_SEM_VERSAO
+    )
+
+
+def _mudou(obj, campos):
+    estado = inspect(obj)
+    return any(estado.attrs[campo].history.has_changes() for campo in campos)
+
+
+def escopos_dos_meses(session, usuario_id):
+    """
+    'mes:' de cada mês em que a UVIS criou solicitações (pelo resumo
+    mensal) e 'agenda:' de cada mês em que ela tem agendamentos.
+    """
+    meses = session.query(EstatisticaMensal.ano, EstatisticaMensal.mes).filter(
+        EstatisticaMensal.usuario_id == usuario_id,
+        EstatisticaMensal.dimensao == 'total',
+        EstatisticaMensal.total > 0,
+    ).distinct()
+    agendados = session.query(
+        extract('year', Solicitacao.data_agendamento), extract('month', Solicitacao.data_agendamento)
+    ).filter(Solicitacao.usuario_id == usuario_id).distinct()
+    return {escopo_mes(ano, mes) for ano, mes in meses} | \
+        {escopo_agenda(int(ano), int(mes)) for ano, mes in agendados}
+
+
+def escopos_do_usuario(session, usuario, removido=False):
+    """Nome da UVIS e região aparecem na agenda e nos relatórios."""
+    escopos = set()
+    if usuario.id is not None:
+        escopos.add(escopo_usuario(usuario.id))
+        if removido or _mudou(usuario, ('nome_uvis', 'regiao')):
+            escopos |= escopos_dos_meses(session, usuario.id)
+    return escopos
+
+
+@event.listens_for(Session, 'before_flush')
+def _coletar_escopos(session, flush_context, instances):
+    """Usuario criado/alterado/removido (Solicitacao: ver app/efeitos.py)."""
+    escopos = set()
+
+    with session.no_autoflush:
+        if any(isinstance(obj, Usuario) for obj in session.new):
+            escopos.add(ESCOPO_USUARIOS)
+
+        for obj in session.dirty:
+            if isinstance(obj, Usuario) and session.is_modified(obj) and _alterou_dados_do_usuario(obj):
+                escopos |= escopos_do_usuario(session, obj)
+                if _mudou(obj, CAMPOS_USUARIO_LOGADO):
+                    escopos.add(ESCOPO_USUARIOS)
+
+        for obj in session.deleted:
+            if isinstance(obj, Usuario):
+                escopos |= escopos_do_usuario(session, obj, removido=True) | {ESCOPO_USUARIOS}
+
+    session.info[CHAVE_SESSAO] = escopos
+
+
+@event.listens_for(Session, 'after_flush')
+def _incrementar_escopos(session, flush_context):
+    escopos = session.info.pop(CHAVE_SESSAO, None)
+    if escopos:
+        incrementar_versoes(session.connection(), escopos)
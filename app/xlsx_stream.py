@@ -0,0 +1,191 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+
+# =======================================================================
+# Escrita de XLSX em Streaming
+# =======================================================================
+# O Workbook do openpyxl (mesmo em write_only) só monta o .zip no save(),
+# então o primeiro byte só sai depois de todas as linhas processadas.
+# Aqui o .xlsx é escrito direto num zip "não posicionável": cada lote de
+# linhas vira XML, é comprimido e os bytes já são devolvidos ao cliente.
+#
+# - Estilos compartilhados (styles.xml): 1 = cabeçalho, 2 = corpo.
+# - Larguras das colunas informadas por quem chama (o <cols> precisa vir
+#   antes dos dados, quando nenhuma linha foi lida ainda). Não dependem de
+#   uma amostra: o corpo quebra linha (wrapText), então um valor maior que
+#   a coluna aparece inteiro em qualquer linha.
+#
+# Medido contra Workbook(write_only=True) em benchmarks/bench_xlsx.py: o
+# write_only cria um objeto por célula, grava tudo num temporário e só
+# então o zip pode ser enviado.
+
+ESTILO_CABECALHO = 1
+ESTILO_CORPO = 2
+
+LINHAS_POR_PEDACO = 200
+LARGURA_MINIMA = 8
+LARGURA_MAXIMA = 60
+
+# Caracteres de controle não permitidos em XML 1.0
+_CARACTERES_INVALIDOS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_BORDA_FINA = ''.join(
+    f'<{lado} style="thin"><color auto="1"/></{lado}>' for lado in ('left', 'right', 'top', 'bottom')
+)
+
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF{cor}"/><bgColor rgb="FF{cor}"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    f'<border>{_BORDA_FINA}<diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" applyAlignment="1">'
+    '<alignment vertical="center" wrapText="1"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class _SaidaStreaming:
+    """Destino de escrita do zip: acumula bytes até serem drenados."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def drenar(self):
+        dados = b''.join(self.partes)
+        self.partes.clear()
+        return dados
+
+
+def _celula(ref, valor, estilo):
+    if valor is None or valor == '':
+        return f'<c r="{ref}" s="{estilo}"/>'
+    if isinstance(valor, bool):
+        valor = "SIM" if valor else "NÃO"
+    if isinstance(valor, (int, float)):
+        return f'<c r="{ref}" s="{estilo}"><v>{valor}</v></c>'
+    texto = escape(_CARACTERES_INVALIDOS.sub('', str(valor)))
+    return f'<c r="{ref}" s="{estilo}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xml(numero, valores, letras, estilo):
+    celulas = ''.join(
+        _celula(f'{letra}{numero}', valor, estilo) for letra, valor in zip(letras, valores)
+    )
+    return f'<row r="{numero}">{celulas}</row>'
+
+
+def gerar_xlsx(titulo, cabecalho, linhas, larguras=None, cor_cabecalho="1F4E78"):
+    """
+    Gera um .xlsx em pedaços de bytes (generator), pronto para ser usado
+    como corpo de uma Response do Flask.
+
+    titulo: nome da aba; cabecalho: lista de títulos das colunas;
+    linhas: iterável de listas de valores (consumido uma única vez);
+    larguras: largura de cada coluna (padrão: a do título).
+    """
+    letras = [get_column_letter(i) for i in range(1, len(cabecalho) + 1)]
+
+    saida = _SaidaStreaming()
+    zf = zipfile.ZipFile(saida, mode='w', compression=zipfile.ZIP_DEFLATED)
+
+    zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+    zf.writestr('_rels/.rels', _RELS)
+    zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+    zf.writestr('xl/styles.xml', _STYLES.replace('{cor}', cor_cabecalho))
+    zf.writestr('xl/workbook.xml', (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(titulo[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ))
+    yield saida.drenar()
+
+    larguras = larguras or [len(titulo_coluna) + 2 for titulo_coluna in cabecalho]
+    cols = ''.join(
+        f'<col min="{i}" max="{i}" width="{max(LARGURA_MINIMA, min(largura, LARGURA_MAXIMA))}" customWidth="1"/>'
+        for i, largura in enumerate(larguras, 1)
+    )
+
+    with zf.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as planilha:
+        planilha.write((
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<sheetViews><sheetView workbookViewId="0">'
+            '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+            '</sheetView></sheetViews>'
+            f'<cols>{cols}</cols>'
+            '<sheetData>'
+            + _linha_xml(1, cabecalho, letras, ESTILO_CABECALHO)
+        ).encode('utf-8'))
+
+        numero = 1
+        pedaco = []
+        for valores in linhas:
+            numero += 1
+            pedaco.append(_linha_xml(numero, valores, letras, ESTILO_CORPO))
+            if len(pedaco) >= LINHAS_POR_PEDACO:
+                planilha.write(''.join(pedaco).encode('utf-8'))
+                pedaco = []
+                dados = saida.drenar()
+                if dados:
+                    yield dados
+
+        planilha.write((''.join(pedaco) + '</sheetData></worksheet>').encode('utf-8'))
+
+    zf.close()
+    yield saida.drenar()
@@ -0,0 +1,161 @@
+"""
+Benchmark da busca textual do painel.
+
+Cria um banco SQLite temporário com N solicitações (padrão 1 milhão),
+com endereços, observações e protocolos sintéticos, monta o índice FTS5
+de app/busca.py e compara, para algumas buscas típicas, o LIKE '%termo%'
+(o que o painel conseguiria fazer sem índice) com o MATCH ordenado por
+bm25, LIMIT 30: ranqueando todas as correspondências e, como no painel,
+só as CANDIDATOS mais recentes que passam pelo filtro de status. Mostra
+a latência mediana de cada um.
+
+Uso:
+    python benchmarks/bench_busca.py [--linhas 1000000] [--repeticoes 10]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from app import db  # noqa: E402
+from app.models import Usuario, Solicitacao  # noqa: E402
+from app.busca import DDL_SQLITE, REMOVER_SQLITE, REPOPULAR_SQLITE, PESOS_SQLITE, termos_busca  # noqa: E402
+
+RUAS = ["Rua", "Avenida", "Travessa", "Alameda", "Praça"]
+NOMES = [
+    "das Flores", "São João", "Paulista", "Brigadeiro Faria Lima", "Teodoro Sampaio",
+    "Cardeal Arcoverde", "dos Pinheiros", "Consolação", "Ipiranga", "Tiradentes",
+]
+BAIRROS = ["Pinheiros", "Lapa", "Mooca", "Santana", "Butantã", "Itaquera", "Sé", "Vila Mariana"]
+OBSERVACOES = [
+    "Caixa d'água destampada", "Piscina sem tratamento", "Calhas entupidas",
+    "Pneus acumulados no quintal", "Imóvel fechado há meses", "",
+]
+
+# Mesmo valor de CANDIDATOS_BUSCA em app/routes.py
+CANDIDATOS = 2000
+
+# (rótulo, texto digitado, termo do LIKE equivalente)
+BUSCAS = [
+    ("bairro", "pinheiros", "Pinheiros"),
+    ("logradouro + bairro", "teodoro lapa", "Teodoro"),
+    ("observação (sem acento)", "agua destampada", "água"),
+    ("CEP", "05422-010", "05422-010"),
+    ("protocolo", "BR-2025-4242", "4242"),
+]
+
+
+def popular(engine, linhas):
+    rnd = random.Random(42)
+    db.metadata.create_all(engine, tables=[Usuario.__table__, Solicitacao.__table__])
+
+    with engine.begin() as conn:
+        # create_all já cria o índice (app/busca.py); a carga vai sem ele
+        for comando in REMOVER_SQLITE:
+            conn.execute(text(comando))
+        conn.execute(Usuario.__table__.insert(), [
+            {"id": 1, "nome_uvis": "UVIS 01", "regiao": "SUL", "login": "uvis1", "senha_hash": "-", "tipo_usuario": "uvis"}
+        ])
+
+        inicio = datetime(2023, 1, 1)
+        lote = []
+        for i in range(1, linhas + 1):
+            criado = inicio + timedelta(minutes=rnd.randrange(0, 3 * 365 * 24 * 60))
+            lote.append({
+                "data_agendamento": date(2025, 1, 1),
+                "hora_agendamento": dtime(9, 0),
+                "foco": "Piscina",
+                "cep": "05422-010" if i % 997 == 0 else f"{rnd.randrange(1000, 9999):04d}{rnd.randrange(10)}-{rnd.randrange(1000):03d}",
+                "logradouro": f"{rnd.choice(RUAS)} {rnd.choice(NOMES)}",
+                "bairro": rnd.choice(BAIRROS),
+                "cidade": "São Paulo",
+                "uf": "SP",
+                "observacao": rnd.choice(OBSERVACOES),
+                "protocolo": f"BR-{rnd.randrange(2023, 2027)}-{rnd.randrange(100000)}" if rnd.random() < 0.3 else None,
+                "data_criacao": criado,
+                "status": "PENDENTE",
+                "usuario_id": 1,
+            })
+            if len(lote) == 50_000:
+                conn.execute(Solicitacao.__table__.insert(), lote)
+                lote = []
+        if lote:
+            conn.execute(Solicitacao.__table__.insert(), lote)
+
+    # Índice montado de uma vez depois da carga (mais rápido que trigger a trigger)
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        for comando in DDL_SQLITE + REPOPULAR_SQLITE:
+            conn.execute(text(comando))
+    print(f"    índice FTS5 montado em {time.perf_counter() - t0:.1f} s")
+
+
+def mediana_ms(conn, sql, params, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = conn.execute(text(sql), params).fetchall()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos), len(resultado)
+
+
+def medir(engine, repeticoes):
+    pesos = ", ".join(str(peso) for peso in PESOS_SQLITE)
+    sql_like = (
+        "SELECT id FROM solicitacoes WHERE logradouro LIKE :termo OR bairro LIKE :termo "
+        "OR cep LIKE :termo OR observacao LIKE :termo OR protocolo LIKE :termo "
+        "ORDER BY data_criacao DESC LIMIT 30"
+    )
+    sql_fts = (
+        f"SELECT rowid FROM solicitacoes_busca WHERE solicitacoes_busca MATCH :consulta "
+        f"ORDER BY bm25(solicitacoes_busca, {pesos}) LIMIT 30"
+    )
+    # como app/busca.aplicar_busca: as CANDIDATOS mais recentes que passam
+    # pelos filtros do painel (aqui, status), lidas na ordem do índice
+    sql_painel = (
+        f"SELECT id FROM (SELECT s.id AS id, bm25(solicitacoes_busca, {pesos}) AS relevancia "
+        f"FROM solicitacoes s JOIN solicitacoes_busca ON solicitacoes_busca.rowid = s.id "
+        f"WHERE solicitacoes_busca MATCH :consulta AND s.status = 'PENDENTE' "
+        f"ORDER BY solicitacoes_busca.rowid DESC LIMIT {CANDIDATOS}) ORDER BY relevancia LIMIT 30"
+    )
+
+    with engine.connect() as conn:
+        for rotulo, digitado, termo_like in BUSCAS:
+            consulta = " ".join(f'"{termo}"*' for termo in termos_busca(digitado))
+            like, _ = mediana_ms(conn, sql_like, {"termo": f"%{termo_like}%"}, repeticoes)
+            fts, achados = mediana_ms(conn, sql_fts, {"consulta": consulta}, repeticoes)
+            painel, _ = mediana_ms(conn, sql_painel, {"consulta": consulta}, repeticoes)
+            print(
+                f"  {rotulo:24s} LIKE: {like:8.2f} ms   FTS5 (todas): {fts:8.2f} ms   "
+                f"FTS5 (painel): {painel:7.2f} ms   ({achados} resultados)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'bench.db')}")
+
+        print(f">>> Populando {args.linhas} solicitações...")
+        popular(engine, args.linhas)
+
+        print("\n>>> Buscas (mediana)")
+        medir(engine, args.repeticoes)
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
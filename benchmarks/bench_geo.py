@@ -0,0 +1,104 @@
+"""
+Benchmark das buscas espaciais de `solicitacoes`.
+
+Cria um banco SQLite temporário com N solicitações (padrão 500 mil)
+espalhadas pela Grande São Paulo e mede, com latência mediana:
+
+- caixa (bounding box) só por latitude/longitude (varredura da tabela);
+- a mesma caixa pela grade indexada (app/busca_geo.py: filtrar_bbox);
+- as 10 solicitações mais próximas de um ponto (solicitacoes_proximas).
+
+Uso:
+    python benchmarks/bench_geo.py [--linhas 500000] [--repeticoes 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app import db  # noqa: E402
+from app.models import Usuario, Solicitacao  # noqa: E402
+from app.geo import celula_geo  # noqa: E402
+from app.busca_geo import filtrar_bbox, solicitacoes_proximas  # noqa: E402
+
+CENTRO = (-23.5505, -46.6333)
+CAIXA = (-23.58, -46.67, -23.53, -46.60)  # ~5 x 7 km
+
+
+def popular(linhas):
+    rnd = random.Random(42)
+    db.create_all()
+    db.session.execute(Usuario.__table__.insert(), [{
+        "id": 1, "nome_uvis": "UVIS 01", "regiao": "CENTRO",
+        "login": "uvis1", "senha_hash": "-", "tipo_usuario": "uvis",
+    }])
+
+    lote = []
+    for _ in range(linhas):
+        lat = CENTRO[0] + rnd.uniform(-0.4, 0.4)
+        lon = CENTRO[1] + rnd.uniform(-0.5, 0.5)
+        lote.append({
+            "data_agendamento": date(2025, 1, 1), "hora_agendamento": dtime(8, 0),
+            "foco": "Piscina", "cep": "01001-000", "logradouro": "Rua", "bairro": "Centro",
+            "cidade": "São Paulo", "uf": "SP", "usuario_id": 1,
+            "latitude": lat, "longitude": lon, "celula_geo": celula_geo(lat, lon),
+        })
+        if len(lote) == 50_000:
+            db.session.execute(Solicitacao.__table__.insert(), lote)
+            lote = []
+    if lote:
+        db.session.execute(Solicitacao.__table__.insert(), lote)
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+def medir(nome, funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    print(f"  {nome}: {statistics.median(tempos):8.2f} ms  ({len(resultado)} resultados)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=500_000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(pasta, 'bench.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            print(f">>> Populando {args.linhas} solicitações...")
+            popular(args.linhas)
+
+            sul, oeste, norte, leste = CAIXA
+            consulta = db.session.query(Solicitacao.id)
+
+            print("\n>>> Buscas")
+            medir("caixa (latitude/longitude, sem grade)", lambda: consulta.filter(
+                Solicitacao.latitude.between(sul, norte),
+                Solicitacao.longitude.between(oeste, leste)
+            ).all(), args.repeticoes)
+            medir("caixa (grade indexada)", lambda: filtrar_bbox(consulta, *CAIXA).all(), args.repeticoes)
+            medir("10 mais próximas", lambda: solicitacoes_proximas(*CENTRO, limite=10), args.repeticoes)
+
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark dos índices de `solicitacoes`.
+
+Cria um banco SQLite temporário, popula com N solicitações (padrão 500 mil)
+e mede as consultas quentes do sistema (dashboard UVIS, painel de gestão,
+agenda e relatório mensal) duas vezes: sem índices e com os índices
+declarados em app/models.py. Para cada consulta mostra o plano
+(EXPLAIN QUERY PLAN) e a latência mediana.
+
+Uso:
+    python benchmarks/bench_indices.py [--linhas 500000] [--repeticoes 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from app import db  # noqa: E402
+from app.models import Usuario, Solicitacao  # noqa: E402
+
+STATUS = ["PENDENTE", "EM ANÁLISE", "APROVADO", "NEGADO"]
+REGIOES = ["NORTE", "SUL", "LESTE", "OESTE", "CENTRO"]
+FOCOS = ["Imóvel Abandonado", "Piscina", "Terreno Baldio", "Ferro-velho"]
+
+# Consultas equivalentes às geradas pelas rotas (com parâmetros fixos)
+CONSULTAS = {
+    "dashboard (usuario_id + status)": (
+        "SELECT id FROM solicitacoes "
+        "WHERE usuario_id = :usuario_id AND status = :status "
+        "ORDER BY data_criacao DESC LIMIT 6",
+        {"usuario_id": 7, "status": "APROVADO"},
+    ),
+    "dashboard (usuario_id)": (
+        "SELECT id FROM solicitacoes "
+        "WHERE usuario_id = :usuario_id "
+        "ORDER BY data_criacao DESC LIMIT 6",
+        {"usuario_id": 7},
+    ),
+    "admin (status + regiao)": (
+        "SELECT id FROM solicitacoes "
+        "WHERE status = :status AND regiao LIKE :regiao "
+        "ORDER BY data_criacao DESC LIMIT 6",
+        {"status": "PENDENTE", "regiao": "%SUL%"},
+    ),
+    "agenda (data_agendamento)": (
+        "SELECT id FROM solicitacoes "
+        "WHERE data_agendamento >= :inicio AND data_agendamento < :fim",
+        {"inicio": "2025-03-01", "fim": "2025-04-12"},
+    ),
+    "relatório (mês de data_criacao)": (
+        "SELECT status, count(id) FROM solicitacoes "
+        "WHERE data_criacao >= :inicio AND data_criacao < :fim GROUP BY status",
+        {"inicio": "2025-03-01 00:00:00", "fim": "2025-04-01 00:00:00"},
+    ),
+}
+
+
+def popular(engine, linhas):
+    """Cria as tabelas sem índices secundários e insere os dados sintéticos."""
+    rnd = random.Random(42)
+    db.metadata.create_all(engine, tables=[Usuario.__table__, Solicitacao.__table__])
+
+    with engine.begin() as conn:
+        for indice in Solicitacao.__table__.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {indice.name}"))
+
+        conn.execute(Usuario.__table__.insert(), [
+            {
+                "id": i,
+                "nome_uvis": f"UVIS {i:02d}",
+                "regiao": REGIOES[i % len(REGIOES)],
+                "login": f"uvis{i}",
+                "senha_hash": "-",
+                "tipo_usuario": "uvis",
+            }
+            for i in range(1, 28)
+        ])
+
+        inicio = datetime(2023, 1, 1)
+        lote = []
+        for i in range(1, linhas + 1):
+            criado = inicio + timedelta(minutes=rnd.randrange(0, 3 * 365 * 24 * 60))
+            usuario_id = rnd.randrange(1, 28)
+            lote.append({
+                "data_agendamento": (criado + timedelta(days=rnd.randrange(1, 30))).date(),
+                "hora_agendamento": dtime(rnd.randrange(7, 18), 0),
+                "foco": rnd.choice(FOCOS),
+                "cep": "01001-000",
+                "logradouro": f"Rua {rnd.randrange(1000)}",
+                "bairro": "Centro",
+                "cidade": "São Paulo",
+                "uf": "SP",
+                "data_criacao": criado,
+                "status": rnd.choice(STATUS),
+                "usuario_id": usuario_id,
+                "nome_uvis": f"UVIS {usuario_id:02d}",
+                "regiao": REGIOES[usuario_id % len(REGIOES)],
+            })
+            if len(lote) == 50_000:
+                conn.execute(Solicitacao.__table__.insert(), lote)
+                lote = []
+        if lote:
+            conn.execute(Solicitacao.__table__.insert(), lote)
+        conn.execute(text("ANALYZE"))
+
+
+def medir(engine, repeticoes):
+    with engine.connect() as conn:
+        for nome, (sql, params) in CONSULTAS.items():
+            plano = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+            tempos = []
+            for _ in range(repeticoes):
+                t0 = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                tempos.append((time.perf_counter() - t0) * 1000)
+
+            print(f"  {nome}: {statistics.median(tempos):8.2f} ms")
+            for linha in plano:
+                print(f"      {linha[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=500_000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'bench.db')}")
+
+        print(f">>> Populando {args.linhas} solicitações...")
+        popular(engine, args.linhas)
+
+        print("\n>>> ANTES (somente chave primária)")
+        medir(engine, args.repeticoes)
+
+        with engine.begin() as conn:
+            for indice in Solicitacao.__table__.indexes:
+                indice.create(conn)
+            conn.execute(text("ANALYZE"))
+
+        print("\n>>> DEPOIS (índices de app/models.py)")
+        medir(engine, args.repeticoes)
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
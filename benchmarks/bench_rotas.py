@@ -0,0 +1,76 @@
+"""
+Benchmark do planejador de rotas do dia (app/rotas.py).
+
+Gera N paradas sintéticas espalhadas pela Grande São Paulo, com horários
+entre 08:00 e 17:00 (parte com apoio da CET), e mede o tempo para montar
+as rotas das equipes. Mostra quantas paradas foram alocadas e a
+distância total.
+
+Uso:
+    python benchmarks/bench_rotas.py [--paradas 300] [--equipes 4]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask  # noqa: E402
+
+from app.rotas import Parada, _Planejador, PADROES  # noqa: E402
+
+CENTRO = (-23.5505, -46.6333)
+
+
+def gerar_paradas(n, rnd):
+    paradas = []
+    for i in range(n):
+        hora = rnd.randrange(8 * 60, 17 * 60, 15)
+        cet = rnd.random() < 0.15
+        folga = PADROES['ROTAS_TOLERANCIA_CET_MIN'] if cet else PADROES['ROTAS_TOLERANCIA_MIN']
+        solicitacao = SimpleNamespace(
+            id=i + 1,
+            latitude=CENTRO[0] + rnd.uniform(-0.25, 0.25),
+            longitude=CENTRO[1] + rnd.uniform(-0.3, 0.3),
+            apoio_cet=cet,
+        )
+        paradas.append(Parada(solicitacao, hora - folga, hora + folga, PADROES['ROTAS_TEMPO_VOO_MIN']))
+    return paradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paradas", type=int, default=300)
+    parser.add_argument("--equipes", type=int, default=4, help="equipes por base (3 bases)")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    bases = [
+        {'nome': 'Norte', 'latitude': -23.45, 'longitude': -46.63, 'equipes': args.equipes},
+        {'nome': 'Sul', 'latitude': -23.65, 'longitude': -46.66, 'equipes': args.equipes},
+        {'nome': 'Leste', 'latitude': -23.54, 'longitude': -46.48, 'equipes': args.equipes},
+    ]
+    paradas = gerar_paradas(args.paradas, rnd)
+
+    app = Flask(__name__)
+    with app.app_context():
+        t0 = time.perf_counter()
+        planejador = _Planejador(bases, paradas)
+        t_matriz = time.perf_counter() - t0
+        restantes = planejador.resolver()
+        rotas = planejador.montar_rotas()
+        total = time.perf_counter() - t0
+
+    alocadas = sum(len(r.visitas) for r in rotas)
+    print(f"Paradas: {args.paradas}  |  Equipes: {len(rotas)}")
+    print(f"Matriz de distâncias: {t_matriz * 1000:.1f} ms")
+    print(f"Tempo total:          {total:.2f} s")
+    print(f"Alocadas: {alocadas}  |  Sem equipe viável: {len(restantes)}")
+    print(f"Distância total: {sum(r.distancia_km for r in rotas):.1f} km")
+
+
+if __name__ == "__main__":
+    main()
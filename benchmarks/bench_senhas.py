@@ -0,0 +1,81 @@
+"""
+Benchmark do hash de senhas (custo de cada POST /login).
+
+Para cada método no formato do SENHA_HASH_METODO (app/senhas.py), mede
+quanto leva a verificação de uma senha, que é o trabalho de CPU de um
+login, e mostra quantos logins por segundo um núcleo aguenta. Também
+estima quanto tempo o servidor leva para atender o pico das 8h
+(--logins de uma vez, divididos entre --nucleos núcleos) e a memória que
+cada verificação usa (scrypt: 128 * N * r bytes).
+
+Uso:
+    python benchmarks/bench_senhas.py [--segundos 2] [--logins 300] [--nucleos 2]
+    python benchmarks/bench_senhas.py --metodos scrypt:16384:8:1 pbkdf2:sha256:600000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.senhas import METODO_PADRAO, gerar_hash, verificar  # noqa: E402
+
+METODOS = [
+    METODO_PADRAO,
+    "scrypt:16384:8:1",
+    "scrypt:8192:8:1",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:260000",
+]
+
+SENHA = "senha-de-teste-123"
+
+
+def memoria(metodo):
+    partes = metodo.split(":")
+    if partes[0] != "scrypt":
+        return "-"
+    n = int(partes[1]) if len(partes) > 1 else 2 ** 15
+    r = int(partes[2]) if len(partes) > 2 else 8
+    return f"{128 * n * r / (1024 * 1024):.1f}MB"
+
+
+def medir(metodo, segundos):
+    """Logins (verificações) por segundo em um núcleo."""
+    senha_hash = gerar_hash(SENHA, metodo)
+    verificar(senha_hash, SENHA)  # aquecimento
+
+    feitos = 0
+    t0 = time.perf_counter()
+    while True:
+        verificar(senha_hash, SENHA)
+        feitos += 1
+        decorrido = time.perf_counter() - t0
+        if decorrido >= segundos:
+            return feitos / decorrido
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--metodos", nargs="+", default=METODOS)
+    parser.add_argument("--segundos", type=float, default=2.0, help="tempo de medição por método")
+    parser.add_argument("--logins", type=int, default=300, help="logins simultâneos no pico")
+    parser.add_argument("--nucleos", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f">>> Verificação de senha, {args.segundos:g} s por método "
+          f"(pico: {args.logins} logins em {args.nucleos} núcleo(s))\n")
+    print(f"  {'método':24s} {'ms/login':>9s} {'logins/s/núcleo':>16s} {'pico':>9s} {'memória':>9s}")
+    for metodo in args.metodos:
+        por_segundo = medir(metodo, args.segundos)
+        pico = args.logins / (por_segundo * args.nucleos)
+        padrao = "  (padrão)" if metodo == METODO_PADRAO else ""
+        print(
+            f"  {metodo:24s} {1000 / por_segundo:9.1f} {por_segundo:16.1f} "
+            f"{pico:8.1f}s {memoria(metodo):>9s}{padrao}"
+        )
+
+
+if __name__ == "__main__":
+    main()
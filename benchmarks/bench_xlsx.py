@@ -0,0 +1,128 @@
+"""
+Benchmark da exportação Excel (GET /admin/exportar_excel).
+
+Gera a mesma planilha (17 colunas, linhas sintéticas parecidas com as do
+relatório) com o escritor em streaming de app/xlsx_stream.py e com o
+Workbook(write_only=True) do openpyxl, usando os mesmos estilos
+(cabeçalho e corpo com borda e quebra de linha) e larguras fixas.
+
+Para cada um mostra o tempo total, o tempo até o primeiro byte sair para
+o cliente, o tamanho do arquivo e quanto o pico de memória (RSS) do
+processo cresceu durante a geração. Cada escritor roda num processo
+separado, para o pico de um não contaminar o do outro.
+
+Uso:
+    python benchmarks/bench_xlsx.py [--linhas 50000]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from openpyxl import Workbook  # noqa: E402
+from openpyxl.cell import WriteOnlyCell  # noqa: E402
+from openpyxl.styles import NamedStyle, Font, PatternFill, Border, Side, Alignment  # noqa: E402
+from openpyxl.utils import get_column_letter  # noqa: E402
+
+from app.xlsx_stream import gerar_xlsx  # noqa: E402
+
+CABECALHO = [
+    "ID", "Unidade", "Região", "Data", "Hora", "Endereço", "Latitude", "Longitude",
+    "Foco", "Tipo Visita", "Altura", "Apoio CET?", "Criadouro?", "Observação",
+    "Status", "Protocolo", "Justificativa",
+]
+LARGURAS = [8, 30, 12, 14, 8, 60, 12, 12, 20, 14, 8, 12, 12, 60, 14, 20, 60]
+TAMANHO_PEDACO = 64 * 1024
+
+
+def linhas(quantidade):
+    for i in range(1, quantidade + 1):
+        yield [
+            i, f"UVIS {i % 30}", "SUL", "03/11/2025", "09:00",
+            f"Rua Exemplo {i}, {i % 900} - Bairro {i % 97}, São Paulo/SP - CEP: 01001-000",
+            -23.55 + i * 1e-6, -46.63 - i * 1e-6, "Piscina", "aedes", "20m",
+            i % 2 == 0, i % 3 == 0, "Observação " * (i % 12), "PENDENTE", f"P-{i}", "",
+        ]
+
+
+def streaming(quantidade):
+    return gerar_xlsx("Relatório", CABECALHO, linhas(quantidade), LARGURAS)
+
+
+def write_only(quantidade):
+    """Mesma planilha pelo openpyxl write_only (salva num temporário e envia)."""
+    livro = Workbook(write_only=True)
+    borda = Border(**{lado: Side(style='thin') for lado in ('left', 'right', 'top', 'bottom')})
+    livro.add_named_style(NamedStyle(
+        name='cabecalho', font=Font(color='FFFFFF', bold=True),
+        fill=PatternFill(start_color='1F4E78', end_color='1F4E78', fill_type='solid'),
+        border=borda, alignment=Alignment(horizontal='center', vertical='center'),
+    ))
+    livro.add_named_style(NamedStyle(
+        name='corpo', border=borda, alignment=Alignment(vertical='center', wrap_text=True),
+    ))
+
+    planilha = livro.create_sheet("Relatório")
+    for i, largura in enumerate(LARGURAS, 1):
+        planilha.column_dimensions[get_column_letter(i)].width = largura
+    planilha.freeze_panes = 'A2'
+
+    def celula(valor, estilo):
+        if isinstance(valor, bool):
+            valor = "SIM" if valor else "NÃO"
+        c = WriteOnlyCell(planilha, value=valor)
+        c.style = estilo
+        return c
+
+    planilha.append([celula(valor, 'cabecalho') for valor in CABECALHO])
+    for valores in linhas(quantidade):
+        planilha.append([celula(valor, 'corpo') for valor in valores])
+
+    with tempfile.TemporaryFile() as arquivo:
+        livro.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            pedaco = arquivo.read(TAMANHO_PEDACO)
+            if not pedaco:
+                break
+            yield pedaco
+
+
+ESCRITORES = {'streaming': streaming, 'write_only': write_only}
+
+
+def medir(nome, quantidade):
+    """(segundos, segundos até o primeiro byte, bytes, aumento do pico de RSS em MB)."""
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    primeiro = None
+    tamanho = 0
+    for pedaco in ESCRITORES[nome](quantidade):
+        if primeiro is None and pedaco:
+            primeiro = time.perf_counter() - t0
+        tamanho += len(pedaco)
+    total = time.perf_counter() - t0
+    return total, primeiro, tamanho, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_inicial) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f">>> Planilha de {args.linhas} linhas x {len(CABECALHO)} colunas\n")
+    print(f"  {'escritor':12s} {'total':>9s} {'1º byte':>9s} {'arquivo':>10s} {'+RSS':>9s}")
+    contexto = multiprocessing.get_context('spawn')
+    for nome in ESCRITORES:
+        with contexto.Pool(1) as pool:
+            total, primeiro, tamanho, rss = pool.apply(medir, (nome, args.linhas))
+        print(f"  {nome:12s} {total:8.2f}s {primeiro:8.3f}s {tamanho / 1e6:8.1f}MB {rss:7.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
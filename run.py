@@ -131,4 +131,5 @@ def verificar_banco():
 if __name__ == "__main__":
     verificar_banco()
     print(">>> INICIANDO SERVIDOR FLASK...")
+    # Servidor de desenvolvimento; em produção use wsgi.py (ex.: gunicorn wsgi:app)
     app.run(debug=True)
\ No newline at end of file
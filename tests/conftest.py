@@ -0,0 +1,29 @@
+"""App com banco SQLite em memória e um usuário admin (senha 1234)."""
+import pytest
+
+from app import create_app, db
+from app.models import Usuario
+from config import Config
+
+
+class ConfigTeste(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@pytest.fixture
+def app(tmp_path):
+    class ConfigPasta(ConfigTeste):
+        RELATORIOS_DIR = str(tmp_path / 'relatorios')
+        RELATORIOS_CACHE_DIR = str(tmp_path / 'cache_relatorios')
+
+    app = create_app(ConfigPasta)
+    with app.app_context():
+        db.create_all()
+        admin = Usuario(nome_uvis='Administração', regiao='CENTRAL', login='admin', tipo_usuario='admin')
+        admin.set_senha('1234')
+        db.session.add(admin)
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
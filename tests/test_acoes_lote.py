@@ -0,0 +1,74 @@
+"""
+Ações em lote: o UPDATE em massa move os contadores de
+`estatisticas_mensais` e as versões exatamente como a edição pelo ORM.
+"""
+from datetime import date, datetime, time
+
+import pytest
+
+from app import db
+from app.acoes_lote import ATUALIZADA, NAO_ENCONTRADA, SEM_ALTERACAO, ErroAcaoLote, atualizar_em_lote
+from app.models import Usuario, Solicitacao, EstatisticaMensal
+from app.versoes import escopo_mes, escopo_usuario, versao_dados
+
+
+def criar_solicitacoes(login, quantidade):
+    uvis = Usuario(nome_uvis=f'UVIS {login}', regiao='SUL', login=login, senha_hash='-', tipo_usuario='uvis')
+    db.session.add(uvis)
+    db.session.flush()
+    for i in range(quantidade):
+        db.session.add(Solicitacao(
+            data_agendamento=date(2025, 11, 3), hora_agendamento=time(9, 0), foco='Piscina',
+            cep='01001-000', logradouro='Praça da Sé', bairro='Sé', cidade='São Paulo', uf='SP',
+            status='PENDENTE' if i % 2 else 'EM ANÁLISE', usuario_id=uvis.id,
+            data_criacao=datetime(2025, 10 + i % 2, 5, 10),
+        ))
+    db.session.commit()
+    return uvis
+
+
+def contadores(usuario_id):
+    # sem a dimensão do nome da UVIS, que difere entre as duas comparadas
+    return sorted(
+        (e.ano, e.mes, e.dimensao, e.valor, e.total)
+        for e in EstatisticaMensal.query.filter_by(usuario_id=usuario_id)
+        if e.dimensao != 'nome_uvis'
+    )
+
+
+def test_lote_move_os_contadores_como_o_orm(app):
+    em_lote, pelo_orm = criar_solicitacoes('lote', 6), criar_solicitacoes('orm', 6)
+    assert contadores(em_lote.id) == contadores(pelo_orm.id)
+    versao_mes = versao_dados(escopo_mes(2025, 10))
+
+    ids = [s.id for s in Solicitacao.query.filter_by(usuario_id=em_lote.id).order_by(Solicitacao.id)]
+    resultados = atualizar_em_lote(ids[:4], status='APROVADO', protocolo='P-1')
+    assert [r.resultado for r in resultados] == [ATUALIZADA] * 4
+
+    for solicitacao in Solicitacao.query.filter_by(usuario_id=pelo_orm.id).order_by(Solicitacao.id).limit(4):
+        solicitacao.status = 'APROVADO'
+        solicitacao.protocolo = 'P-1'
+    db.session.commit()
+
+    assert contadores(em_lote.id) == contadores(pelo_orm.id)
+    assert (2025, 11, 'status', 'APROVADO', 2) in contadores(em_lote.id)
+    assert versao_dados(escopo_mes(2025, 10)) > versao_mes
+    assert versao_dados(escopo_usuario(em_lote.id)) > 1
+
+
+def test_resultado_por_linha(app):
+    uvis = criar_solicitacoes('lapa', 2)
+    ids = [s.id for s in Solicitacao.query.filter_by(usuario_id=uvis.id).order_by(Solicitacao.id)]
+
+    resultados = atualizar_em_lote(ids + [999999], status='EM ANÁLISE')
+    assert [r.resultado for r in resultados] == [SEM_ALTERACAO, ATUALIZADA, NAO_ENCONTRADA]
+    assert resultados[1].status_anterior == 'PENDENTE'
+    assert db.session.get(Solicitacao, ids[1]).status == 'EM ANÁLISE'
+
+
+def test_negar_exige_justificativa(app):
+    uvis = criar_solicitacoes('sul', 1)
+    ids = [s.id for s in Solicitacao.query.filter_by(usuario_id=uvis.id)]
+    with pytest.raises(ErroAcaoLote):
+        atualizar_em_lote(ids, status='NEGADO')
+    assert db.session.get(Solicitacao, ids[0]).status == 'EM ANÁLISE'
@@ -0,0 +1,59 @@
+"""
+Conexões: opções do pool a partir de DB_POOL_*, sem tamanho de pool no
+SQLite em memória, e WAL + busy_timeout em cada conexão SQLite nova.
+"""
+from app import create_app, db
+from app.banco import PADROES, opcoes_engine
+
+
+def test_opcoes_do_pool():
+    opcoes = opcoes_engine({
+        'SQLALCHEMY_DATABASE_URI': 'postgresql://sgsv@localhost/sgsv',
+        'DB_POOL_SIZE': 20, 'DB_POOL_PRE_PING': False,
+    })
+    assert opcoes == {
+        'pool_pre_ping': False,
+        'pool_recycle': PADROES['DB_POOL_RECYCLE'],
+        'pool_size': 20,
+        'max_overflow': PADROES['DB_MAX_OVERFLOW'],
+        'pool_timeout': PADROES['DB_POOL_TIMEOUT'],
+    }
+
+
+def test_sqlite_em_memoria_sem_tamanho_de_pool():
+    for url in ('sqlite://', 'sqlite:///:memory:'):
+        assert 'pool_size' not in opcoes_engine({'SQLALCHEMY_DATABASE_URI': url})
+    assert 'pool_size' in opcoes_engine({'SQLALCHEMY_DATABASE_URI': 'sqlite:////tmp/sgsv.db'})
+
+
+def criar(tmp_path, **config):
+    config.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'sgsv.db'}")
+    return create_app(type('ConfigBanco', (), dict(
+        SECRET_KEY='x', RELATORIOS_DIR=str(tmp_path / 'relatorios'),
+        RELATORIOS_CACHE_DIR=str(tmp_path / 'cache_relatorios'), **config
+    )))
+
+
+def pragmas():
+    conexao = db.session.connection()
+    return (
+        conexao.exec_driver_sql('PRAGMA journal_mode').scalar(),
+        conexao.exec_driver_sql('PRAGMA busy_timeout').scalar(),
+    )
+
+
+def test_sqlite_em_wal_com_busy_timeout(tmp_path):
+    app = criar(tmp_path, SQLITE_BUSY_TIMEOUT=2500)
+    with app.app_context():
+        assert pragmas() == ('wal', 2500)
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_opcoes_prontas_tem_prioridade(tmp_path):
+    app = criar(tmp_path, SQLALCHEMY_ENGINE_OPTIONS={'pool_pre_ping': False}, SQLITE_WAL=False)
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {'pool_pre_ping': False}
+    with app.app_context():
+        assert pragmas()[0] != 'wal'
+        db.session.remove()
+        db.engine.dispose()
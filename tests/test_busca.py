@@ -0,0 +1,53 @@
+"""
+Busca textual: o índice é mantido por triggers do banco, então acha
+também linhas gravadas em massa (importação, ações em lote), sem acento,
+por prefixo e por CEP com ou sem hífen.
+"""
+from datetime import date, time
+
+from app import db
+from app.acoes_lote import atualizar_em_lote
+from app.busca import aplicar_busca
+from app.efeitos import inserir_em_massa
+from app.models import Usuario, Solicitacao
+
+
+def linha(**campos):
+    """Linha completa para o INSERT em massa (como as da importação)."""
+    valores = dict(
+        data_agendamento=date(2025, 11, 3), hora_agendamento=time(9, 0), tipo_visita=None, altura_voo=None,
+        cidade='São Paulo', uf='SP', latitude=None, longitude=None, coordenadas_origem=None,
+        status='PENDENTE', observacao=None,
+    )
+    valores.update(campos)
+    return valores
+
+
+def buscar(texto, limite=None):
+    query = aplicar_busca(Solicitacao.query, texto, Solicitacao.id, limite)
+    return [s.id for s in query]
+
+
+def test_busca_acha_linhas_gravadas_em_massa(app):
+    uvis = Usuario(nome_uvis='UVIS Pinheiros', regiao='OESTE', login='pinheiros', senha_hash='-', tipo_usuario='uvis')
+    db.session.add(uvis)
+    db.session.commit()
+
+    inserir_em_massa([
+        linha(foco='Piscina', cep='05422-010', logradouro='Rua dos Pinheiros', numero='10', bairro='Pinheiros',
+              observacao='Caixa d’água aberta'),
+        linha(foco='Terreno', cep='01001-000', logradouro='Praça da Sé', numero='1', bairro='Sé'),
+    ], uvis.id)
+    db.session.commit()
+    pinheiros, se = [s.id for s in Solicitacao.query.order_by(Solicitacao.id)]
+
+    assert buscar('pinhei') == [pinheiros]
+    assert buscar('CAIXA AGUA') == [pinheiros]
+    assert buscar('praca se') == [se]
+    assert buscar('01001000') == buscar('01001-000') == [se]
+    assert buscar('sao paulo', limite=1) == [se]  # só a mais recente é ranqueada
+
+    # UPDATE em massa também atualiza o índice
+    atualizar_em_lote([se], status='APROVADO', protocolo='SARPAS-7781')
+    db.session.commit()
+    assert buscar('sarpas 7781') == [se]
@@ -0,0 +1,45 @@
+"""
+LRU de CEPs: uma importação feita em outro processo (ex.: `flask cep
+importar`) passa a valer no servidor na consulta seguinte.
+"""
+import pytest
+
+from app import db
+from app.cep import ORIGEM_IMPORTACAO, ORIGEM_SOLICITACOES, buscar_cep, importar_arquivo, \
+    limpar_memoria, validar_endereco
+from app.models import Cep
+from app.versoes import ESCOPO_CEPS, versao_dados
+
+
+@pytest.fixture(autouse=True)
+def memoria_vazia():
+    limpar_memoria()
+    yield
+    limpar_memoria()
+
+
+def test_importacao_invalida_o_lru(app, tmp_path):
+    db.session.add(Cep(cep='01001000', logradouro='Praça da Sé', cidade='Guarulhos', uf='SP',
+                       origem=ORIGEM_SOLICITACOES))
+    db.session.commit()
+    assert buscar_cep('01001-000').cidade == 'Guarulhos'
+
+    arquivo = tmp_path / 'ceps.csv'
+    arquivo.write_text('cep;logradouro;bairro;cidade;uf\n01001-000;Praça da Sé;Sé;São Paulo;SP\n', encoding='utf-8')
+
+    # importar_arquivo não mexe no LRU (em produção roda em outro processo)
+    versao = versao_dados(ESCOPO_CEPS)
+    assert importar_arquivo(str(arquivo))['atualizados'] == 1
+    assert versao_dados(ESCOPO_CEPS) == versao + 1
+
+    endereco = buscar_cep('01001000')
+    assert (endereco.cidade, endereco.origem) == ('São Paulo', ORIGEM_IMPORTACAO)
+    with pytest.raises(ValueError):
+        validar_endereco('01001-000', 'Praça da Sé', 'Sé', 'Guarulhos', 'SP')
+
+
+def test_cep_desconhecido_nao_e_memorizado(app):
+    assert buscar_cep('02002000') is None
+    db.session.add(Cep(cep='02002000', cidade='São Paulo', uf='SP', origem=ORIGEM_SOLICITACOES))
+    db.session.commit()
+    assert buscar_cep('02002000').cidade == 'São Paulo'
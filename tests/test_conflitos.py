@@ -0,0 +1,74 @@
+"""
+Conflitos entre voos: a grade 3D encontra os mesmos pares que comparar
+todos com todos, inclusive na virada do dia e do mês.
+"""
+import random
+from datetime import date, datetime, time, timedelta
+
+from app import db
+from app.conflitos import IndiceVoos, Voo, conflitos_da_solicitacao, conflitos_do_mes
+from app.geo import distancia_km
+from app.models import Usuario, Solicitacao
+
+
+def pares_forca_bruta(voos, raio_km, janela_min):
+    pares = set()
+    for i, a in enumerate(voos):
+        for b in voos[i + 1:]:
+            diferenca = abs((a.inicio - b.inicio).total_seconds()) / 60
+            if diferenca <= janela_min and distancia_km(a.latitude, a.longitude, b.latitude, b.longitude) <= raio_km:
+                pares.add((a.id, b.id))
+    return pares
+
+
+def test_grade_igual_a_forca_bruta():
+    sorteio = random.Random(42)
+    base = datetime(2025, 11, 1)
+    voos = [
+        Voo(i, base + timedelta(minutes=sorteio.randrange(3 * 24 * 60)),
+            -23.55 + sorteio.uniform(-0.03, 0.03), -46.63 + sorteio.uniform(-0.03, 0.03), 'APROVADO', 'UVIS')
+        for i in range(400)
+    ]
+    indice = IndiceVoos(voos, 0.5, 60)
+
+    pares = {
+        (min(voo.id, c.voo.id), max(voo.id, c.voo.id))
+        for voo in voos
+        for c in indice.conflitos(voo)
+    }
+    assert pares == pares_forca_bruta(voos, 0.5, 60)
+    assert pares  # a amostra tem conflitos
+
+
+def criar_voo(uvis, quando, latitude=-23.5505, longitude=-46.6333, status='APROVADO'):
+    solicitacao = Solicitacao(
+        data_agendamento=quando.date(), hora_agendamento=quando.time(), foco='Piscina',
+        cep='01001-000', logradouro='Praça da Sé', bairro='Sé', cidade='São Paulo', uf='SP',
+        latitude=latitude, longitude=longitude, status=status, usuario_id=uvis.id,
+    )
+    db.session.add(solicitacao)
+    return solicitacao
+
+
+def test_conflitos_na_virada_do_mes(app):
+    uvis = Usuario(nome_uvis='UVIS Sé', regiao='CENTRO', login='se', senha_hash='-', tipo_usuario='uvis')
+    db.session.add(uvis)
+    db.session.flush()
+
+    ultimo = criar_voo(uvis, datetime(2025, 11, 30, 23, 40))
+    primeiro = criar_voo(uvis, datetime(2025, 12, 1, 0, 10), latitude=-23.5520)  # ~170 m, 30 min
+    criar_voo(uvis, datetime(2025, 12, 1, 0, 10), latitude=-23.60)             # longe
+    criar_voo(uvis, datetime(2025, 11, 30, 23, 50), status='NEGADO')             # inativo
+    db.session.commit()
+
+    pares = conflitos_do_mes(2025, 11)
+    assert [(p.a.id, p.b.id) for p in pares] == [(ultimo.id, primeiro.id)]
+    assert pares[0].diferenca_min == 30
+    assert [(p.a.id, p.b.id) for p in conflitos_do_mes(2025, 12)] == [(ultimo.id, primeiro.id)]
+
+    novo = Solicitacao(
+        data_agendamento=date(2025, 12, 1), hora_agendamento=time(0, 0),
+        latitude=-23.5510, longitude=-46.6333, status='PENDENTE',
+    )
+    # mais próximo no horário primeiro
+    assert [c.voo.id for c in conflitos_da_solicitacao(novo)] == [primeiro.id, ultimo.id]
@@ -0,0 +1,60 @@
+"""
+Número de consultas das telas de listagem: não pode crescer com o número
+de solicitações (sem N+1 ao ler nome/região da UVIS).
+"""
+from datetime import date, datetime, time
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Usuario, Solicitacao
+
+
+def adicionar_solicitacoes(quantidade):
+    """Cada solicitação de uma UVIS diferente: um N+1 no autor cresceria com as linhas."""
+    inicio = Usuario.query.count()
+    for i in range(quantidade):
+        uvis = Usuario(nome_uvis=f'UVIS {inicio + i}', regiao='SUL', login=f'uvis{inicio + i}',
+                       senha_hash='-', tipo_usuario='uvis')
+        db.session.add(uvis)
+        db.session.flush()
+        db.session.add(Solicitacao(
+            data_agendamento=date(2025, 11, 1), hora_agendamento=time(9, 0),
+            foco='Piscina', cep='01001-000', logradouro=f'Rua {i}', bairro='Centro',
+            cidade='São Paulo', uf='SP', numero=str(i), status='PENDENTE',
+            usuario_id=uvis.id, data_criacao=datetime(2025, 11, 1 + i % 28, 10),
+        ))
+    db.session.commit()
+
+
+def contar_consultas(cliente, url):
+    consultas = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resposta = cliente.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    assert resposta.status_code == 200
+    return len(consultas)
+
+
+@pytest.mark.parametrize('url', ['/admin', '/admin/exportar_excel'])
+def test_consultas_nao_crescem_com_as_linhas(app, url):
+    cliente = app.test_client()
+    cliente.post('/login', data={'login': 'admin', 'senha': '1234'})
+
+    adicionar_solicitacoes(3)
+    cliente.get(url)  # aquece caches (usuário logado, versões)
+    poucas = contar_consultas(cliente, url)
+
+    adicionar_solicitacoes(30)
+    cliente.get(url)
+    muitas = contar_consultas(cliente, url)
+
+    assert muitas == poucas
+    assert poucas <= 4
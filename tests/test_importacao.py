@@ -0,0 +1,83 @@
+"""
+Importação em lote: o INSERT em massa tem os mesmos efeitos de cadastrar
+pelo ORM (estatísticas, versões, CEPs aprendidos, cópia da UVIS), e um
+arquivo que quebra no meio não deixa importação pela metade.
+"""
+import io
+from datetime import date, time
+
+import pytest
+
+from app import db
+from app.estatisticas import reconstruir_estatisticas
+from app.importacao import TAMANHO_LOTE, importar_solicitacoes
+from app.models import Usuario, Solicitacao, EstatisticaMensal, Cep
+from app.versoes import escopo_usuario, versao_dados
+
+CABECALHO = 'data;hora;foco;tipo_visita;altura_voo;cep;logradouro;numero;bairro;cidade;uf\n'
+LINHAS = [
+    ('2025-11-03', '09:00', 'Piscina', 'aedes', '20m', '01001-000', 'Praça da Sé', '1', 'Sé', 'São Paulo', 'SP'),
+    ('2025-11-04', '10:30', 'Terreno', 'culex', '30m', '04001-000', 'Rua Abílio', '20', 'Paraíso', 'São Paulo', 'SP'),
+    ('2025-11-04', '14:00', 'Piscina', '', '', '05001-000', 'Rua Caio', '3', 'Perdizes', 'São Paulo', 'SP'),
+]
+
+
+def criar_uvis(login):
+    uvis = Usuario(nome_uvis=f'UVIS {login}', regiao='SUL', login=login, senha_hash='-', tipo_usuario='uvis')
+    db.session.add(uvis)
+    db.session.commit()
+    return uvis
+
+
+def csv_de(linhas):
+    return io.BytesIO((CABECALHO + ''.join(';'.join(linha) + '\n' for linha in linhas)).encode('utf-8'))
+
+
+def contadores(usuario_id):
+    # sem a dimensão do nome da UVIS, que difere entre as duas comparadas
+    return sorted(
+        (e.ano, e.mes, e.dimensao, e.valor, e.total)
+        for e in EstatisticaMensal.query.filter_by(usuario_id=usuario_id)
+        if e.dimensao != 'nome_uvis'
+    )
+
+
+def test_importacao_tem_os_efeitos_do_orm(app):
+    importada, cadastrada = criar_uvis('importada'), criar_uvis('cadastrada')
+
+    resultado = importar_solicitacoes(csv_de(LINHAS), 'planilha.csv', importada.id)
+    assert (resultado.importadas, resultado.erros) == (3, [])
+
+    for data, hora, foco, tipo, altura, cep, logradouro, numero, bairro, cidade, uf in LINHAS:
+        db.session.add(Solicitacao(
+            data_agendamento=date.fromisoformat(data), hora_agendamento=time.fromisoformat(hora),
+            foco=foco, tipo_visita=tipo or None, altura_voo=altura or None, cep=cep,
+            logradouro=logradouro, numero=numero, bairro=bairro, cidade=cidade, uf=uf,
+            status='PENDENTE', usuario_id=cadastrada.id,
+        ))
+    db.session.commit()
+
+    assert contadores(importada.id) == contadores(cadastrada.id)
+    assert versao_dados(escopo_usuario(importada.id)) >= 1
+    assert {s.nome_uvis for s in Solicitacao.query.filter_by(usuario_id=importada.id)} == {'UVIS importada'}
+    assert EstatisticaMensal.query.filter_by(usuario_id=importada.id, dimensao='nome_uvis').one().valor == 'UVIS importada'
+    assert db.session.get(Cep, '04001000').bairro == 'Paraíso'
+
+    # o resumo incremental bate com o recalculado do zero
+    antes = contadores(importada.id)
+    reconstruir_estatisticas()
+    assert contadores(importada.id) == antes
+
+
+def test_arquivo_que_quebra_no_meio_nao_grava_nada(app):
+    uvis = criar_uvis('lapa')
+    linhas = [LINHAS[0]] * (TAMANHO_LOTE + 10)
+    conteudo = (CABECALHO + ''.join(';'.join(linha) + '\n' for linha in linhas)).encode('utf-8')
+    # a partir daqui o arquivo foi salvo em cp1252
+    conteudo += ';'.join(LINHAS[1][:6] + ('Praça João',) + LINHAS[1][7:]).encode('cp1252') + b'\n'
+
+    with pytest.raises(ValueError, match='UTF-8'):
+        importar_solicitacoes(io.BytesIO(conteudo), 'planilha.csv', uvis.id)
+
+    assert Solicitacao.query.count() == 0
+    assert EstatisticaMensal.query.count() == 0
@@ -0,0 +1,66 @@
+"""
+Relatórios: mês/ano fora do calendário valem o mês atual (como um valor
+não numérico), em vez de erro 500; região e unidade dos agrupamentos são
+as copiadas nas solicitações (as mesmas do detalhe do PDF).
+"""
+from datetime import date, datetime, time
+
+import pytest
+
+from app import db
+from app.agregacao import calcular_agregados
+from app.estatisticas import reconstruir_estatisticas
+from app.models import Usuario, Solicitacao
+
+
+@pytest.fixture
+def cliente(app):
+    cliente = app.test_client()
+    cliente.post('/login', data={'login': 'admin', 'senha': '1234'})
+    cliente.get('/')  # consome o flash de boas-vindas
+    return cliente
+
+
+@pytest.mark.parametrize('url', [
+    '/relatorios?mes=13',
+    '/relatorios?mes=0&ano=2025',
+    '/admin/conflitos?mes=13',
+    '/admin/exportar_relatorio_excel?mes=13',
+    '/admin/exportar_relatorio_excel?mes=1&ano=99999',
+])
+def test_mes_invalido_nao_quebra(cliente, url):
+    assert cliente.get(url).status_code == 200
+
+
+def test_api_devolve_o_mes_usado(cliente):
+    hoje = datetime.now()
+    dados = cliente.get('/api/relatorios/agregados?mes=13&ano=2025').get_json()
+    assert (dados['ano'], dados['mes']) == (2025, hoje.month)
+
+
+def test_agrupamentos_seguem_a_copia_nas_solicitacoes(app):
+    uvis = Usuario(nome_uvis='UVIS Lapa', regiao='OESTE', login='lapa', senha_hash='-', tipo_usuario='uvis')
+    db.session.add(uvis)
+    db.session.flush()
+    for _ in range(2):
+        db.session.add(Solicitacao(
+            data_agendamento=date(2025, 11, 3), hora_agendamento=time(9, 0), foco='Piscina',
+            cep='01001-000', logradouro='Praça da Sé', bairro='Sé', cidade='São Paulo', uf='SP',
+            status='PENDENTE', usuario_id=uvis.id, data_criacao=datetime(2025, 10, 5, 10),
+        ))
+    db.session.commit()
+
+    agregados = calcular_agregados(2025, 10)
+    assert agregados['dados_unidade'] == [('UVIS Lapa', 2)]
+    assert agregados['dados_regiao'] == [('OESTE', 2)]
+
+    # renomear move os contadores junto com a cópia
+    uvis.nome_uvis, uvis.regiao = 'UVIS Lapa/Pinheiros', 'CENTRO'
+    db.session.commit()
+    agregados = calcular_agregados(2025, 10)
+    assert agregados['dados_unidade'] == [('UVIS Lapa/Pinheiros', 2)]
+    assert agregados['dados_regiao'] == [('CENTRO', 2)]
+    assert {s.nome_uvis for s in Solicitacao.query} == {'UVIS Lapa/Pinheiros'}
+
+    reconstruir_estatisticas()
+    assert calcular_agregados(2025, 10) == agregados
@@ -0,0 +1,84 @@
+"""
+Rotas do dia: toda parada planejada começa dentro da janela, cada
+solicitação aprovada aparece uma única vez (na rota ou como não alocada) e
+a equipe volta à base dentro do expediente.
+"""
+import random
+from datetime import date, time
+
+import pytest
+
+from app import db
+from app.models import Usuario, Solicitacao
+from app.rotas import PADROES, _minutos, matriz_distancias_km, planejar_dia
+from app.geo import distancia_km
+
+DIA = date(2025, 11, 3)
+
+
+@pytest.fixture
+def uvis(app):
+    uvis = Usuario(nome_uvis='UVIS Sé', regiao='CENTRO', login='se', senha_hash='-', tipo_usuario='uvis')
+    db.session.add(uvis)
+    db.session.flush()
+    return uvis
+
+
+def criar_parada(uvis, hora, latitude, longitude, apoio_cet=False, status='APROVADO'):
+    db.session.add(Solicitacao(
+        data_agendamento=DIA, hora_agendamento=hora, foco='Piscina', apoio_cet=apoio_cet,
+        cep='01001-000', logradouro='Praça da Sé', bairro='Sé', cidade='São Paulo', uf='SP',
+        latitude=latitude, longitude=longitude, status=status, usuario_id=uvis.id,
+    ))
+
+
+def test_matriz_igual_a_haversine():
+    latitudes, longitudes = [-23.55, -23.60, -23.50], [-46.63, -46.70, -46.60]
+    matriz = matriz_distancias_km(latitudes, longitudes)
+    for i in range(3):
+        for j in range(3):
+            assert matriz[i][j] == pytest.approx(distancia_km(latitudes[i], longitudes[i], latitudes[j], longitudes[j]))
+
+
+def test_plano_respeita_janelas(app, uvis):
+    sorteio = random.Random(7)
+    for _ in range(40):
+        hora = time(sorteio.randrange(8, 18), sorteio.choice((0, 15, 30, 45)))
+        criar_parada(uvis, hora, -23.55 + sorteio.uniform(-0.08, 0.08), -46.63 + sorteio.uniform(-0.08, 0.08),
+                     apoio_cet=sorteio.random() < 0.2)
+    criar_parada(uvis, time(9, 0), None, None)
+    criar_parada(uvis, time(9, 0), -23.55, -46.63, status='PENDENTE')
+    db.session.commit()
+
+    plano = planejar_dia(DIA)
+    fim_dia = _minutos(PADROES['ROTAS_FIM'])
+
+    visitadas = [v.parada.solicitacao.id for rota in plano.rotas for v in rota.visitas]
+    nao_alocadas = [item.solicitacao.id for item in plano.nao_alocadas]
+    assert len(visitadas) == len(set(visitadas))
+    assert sorted(visitadas + nao_alocadas) == sorted(
+        s.id for s in Solicitacao.query.filter_by(status='APROVADO')
+    )
+    assert 'Sem coordenadas' in [item.motivo for item in plano.nao_alocadas]
+
+    for rota in plano.rotas:
+        for anterior, visita in zip(rota.visitas, rota.visitas[1:]):
+            assert visita.chegada >= anterior.saida
+        for visita in rota.visitas:
+            assert visita.parada.inicio_janela <= visita.inicio <= visita.parada.fim_janela
+            assert visita.inicio >= visita.chegada - 1e-9
+            folga = 15 if visita.parada.solicitacao.apoio_cet else 60
+            assert visita.parada.fim_janela - visita.parada.inicio_janela == 2 * folga
+        assert rota.retorno <= fim_dia
+    assert plano.distancia_km == pytest.approx(sum(r.distancia_km for r in plano.rotas))
+
+
+def test_horario_impossivel_fica_sem_equipe(app, uvis):
+    # três voos no mesmo horário rígido (CET), longe entre si, para duas equipes
+    for latitude in (-23.40, -23.55, -23.70):
+        criar_parada(uvis, time(10, 0), latitude, -46.63, apoio_cet=True)
+    db.session.commit()
+
+    plano = planejar_dia(DIA)
+    assert sum(len(rota.visitas) for rota in plano.rotas) == 2
+    assert [item.motivo for item in plano.nao_alocadas] == ["Nenhuma equipe consegue cumprir a janela de horário"]
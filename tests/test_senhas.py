@@ -0,0 +1,47 @@
+"""
+Hash de senhas: hash de método/custo antigo continua entrando e é refeito
+com o SENHA_HASH_METODO atual no login; senha errada não mexe no hash.
+"""
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Usuario
+from app.senhas import gerar_hash, precisa_rehash, verificar
+
+
+def test_precisa_rehash(app):
+    atual = gerar_hash('1234')
+    assert not precisa_rehash(atual)
+    assert precisa_rehash(atual, 'scrypt:16384:8:1')
+    assert precisa_rehash(generate_password_hash('1234', 'pbkdf2:sha256:260000'))
+    assert not precisa_rehash(generate_password_hash('1234', 'pbkdf2:sha256:260000'), 'pbkdf2:sha256:260000')
+
+
+def criar_legado(login):
+    usuario = Usuario(nome_uvis='UVIS Lapa', regiao='OESTE', login=login, tipo_usuario='uvis',
+                      senha_hash=generate_password_hash('segredo', 'pbkdf2:sha256:260000'))
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+def test_login_refaz_hash_legado(app):
+    usuario = criar_legado('lapa')
+    cliente = app.test_client()
+
+    resposta = cliente.post('/login', data={'login': 'lapa', 'senha': 'segredo'})
+    assert resposta.status_code == 302
+
+    db.session.refresh(usuario)
+    assert not precisa_rehash(usuario.senha_hash)
+    assert verificar(usuario.senha_hash, 'segredo')
+
+
+def test_senha_errada_mantem_hash(app):
+    usuario = criar_legado('lapa')
+    antigo = usuario.senha_hash
+
+    app.test_client().post('/login', data={'login': 'lapa', 'senha': 'errada'})
+
+    db.session.refresh(usuario)
+    assert usuario.senha_hash == antigo
@@ -0,0 +1,80 @@
+"""
+Fila de tarefas: o PDF é gerado fora da requisição (202 + status), o
+status vale em qualquer worker e a limpeza só apaga o que a fila criou.
+"""
+import os
+import time
+
+from app import create_app
+from app.tarefas import CONCLUIDA, FilaTarefas, Tarefa
+
+
+def aguardar(cliente, status_url, limite=30):
+    fim = time.time() + limite
+    while time.time() < fim:
+        dados = cliente.get(status_url).get_json()
+        if dados['status'] not in ('pendente', 'executando'):
+            return dados
+        time.sleep(0.1)
+    raise AssertionError('tarefa não terminou')
+
+
+def test_pdf_responde_202_e_gera_em_segundo_plano(app):
+    cliente = app.test_client()
+    cliente.post('/login', data={'login': 'admin', 'senha': '1234'})
+
+    resposta = cliente.get('/admin/exportar_relatorio_pdf?mes=11&ano=2025')
+    assert resposta.status_code == 202
+    status_url = resposta.get_json()['status_url']
+    assert resposta.headers['Location'].endswith(status_url)
+
+    dados = aguardar(cliente, status_url)
+    assert dados['status'] == CONCLUIDA
+    arquivo = cliente.get(dados['download_url'])
+    assert arquivo.status_code == 200
+    assert arquivo.data.startswith(b'%PDF')
+
+
+def test_status_lido_do_json_em_outro_worker(app):
+    fila = app.extensions['fila_tarefas']
+    caminho = fila.novo_arquivo('.csv')
+    with open(caminho, 'w') as arquivo:
+        arquivo.write('x')
+    tarefa = fila.registrar_concluida(caminho, usuario_id=1, temporario=True)
+
+    # outro processo: não tem a tarefa na memória
+    del fila.tarefas[tarefa.id]
+    lida = fila.obter(tarefa.id)
+    assert isinstance(lida, Tarefa)
+    assert (lida.status, lida.usuario_id, lida.caminho) == (CONCLUIDA, 1, caminho)
+
+
+def test_limpeza_so_apaga_arquivos_da_fila(app):
+    fila = app.extensions['fila_tarefas']
+    caminho = fila.novo_arquivo('.csv')
+    with open(caminho, 'w') as arquivo:
+        arquivo.write('x')
+    tarefa = fila.registrar_concluida(caminho, temporario=True)
+    estranho = os.path.join(fila.diretorio, 'leia-me.txt')
+    with open(estranho, 'w') as arquivo:
+        arquivo.write('não é da fila')
+
+    antigo = time.time() - fila.ttl - 10
+    for nome in os.listdir(fila.diretorio):
+        os.utime(os.path.join(fila.diretorio, nome), (antigo, antigo))
+    fila.tarefas[tarefa.id].criada_em = antigo
+
+    fila.limpar_expirados()
+    assert sorted(os.listdir(fila.diretorio)) == ['leia-me.txt']
+    assert fila.obter(tarefa.id) is None
+
+
+def test_cada_aplicacao_tem_a_sua_fila(app, tmp_path):
+    outra = create_app(type('ConfigOutra', (), {
+        'SECRET_KEY': 'x', 'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'RELATORIOS_DIR': str(tmp_path / 'outra'), 'RELATORIOS_CACHE_DIR': str(tmp_path / 'outro_cache'),
+    }))
+    assert isinstance(outra.extensions['fila_tarefas'], FilaTarefas)
+    assert outra.extensions['fila_tarefas'] is not app.extensions['fila_tarefas']
+    assert app.extensions['fila_tarefas'].diretorio != outra.extensions['fila_tarefas'].diretorio
+    assert outra.extensions['cache_relatorios'] is not app.extensions['cache_relatorios']
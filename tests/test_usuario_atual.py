@@ -0,0 +1,61 @@
+"""
+Cache do usuário logado: troca de perfil e remoção valem na requisição
+seguinte (a versão 'usuarios' é lida do banco, vale para todo processo).
+"""
+from app import db
+from app.models import Usuario
+from app.versoes import ESCOPO_USUARIOS, incrementar_versoes, versao_dados
+
+
+def entrar(cliente, login):
+    cliente.post('/login', data={'login': login, 'senha': '1234'})
+    cliente.get('/')  # consome o flash de boas-vindas
+
+
+def test_troca_de_perfil_vale_na_proxima_requisicao(app):
+    cliente = app.test_client()
+    entrar(cliente, 'admin')
+    assert cliente.get('/admin').status_code == 200
+
+    versao = versao_dados(ESCOPO_USUARIOS)
+    admin = Usuario.query.filter_by(login='admin').one()
+    admin.tipo_usuario = 'uvis'
+    db.session.commit()
+    assert versao_dados(ESCOPO_USUARIOS) == versao + 1
+
+    assert cliente.get('/admin').status_code == 302
+
+
+def test_alteracao_feita_por_outro_processo(app):
+    cliente = app.test_client()
+    entrar(cliente, 'admin')
+    assert cliente.get('/admin').status_code == 200
+
+    # o que o commit de outro worker deixa no banco (sem eventos neste processo)
+    db.session.execute(db.update(Usuario).where(Usuario.login == 'admin').values(tipo_usuario='uvis'))
+    incrementar_versoes(db.session.connection(), {ESCOPO_USUARIOS})
+    db.session.commit()
+
+    assert cliente.get('/admin').status_code == 302
+
+
+def test_usuario_removido_perde_a_sessao(app):
+    cliente = app.test_client()
+    entrar(cliente, 'admin')
+    assert cliente.get('/admin').status_code == 200
+
+    db.session.delete(Usuario.query.filter_by(login='admin').one())
+    db.session.commit()
+
+    resposta = cliente.get('/admin')
+    assert resposta.status_code == 302
+    with cliente.session_transaction() as sessao:
+        assert 'user_id' not in sessao
+
+
+def test_troca_de_senha_nao_invalida_o_cache(app):
+    versao = versao_dados(ESCOPO_USUARIOS)
+    admin = Usuario.query.filter_by(login='admin').one()
+    admin.set_senha('outra')
+    db.session.commit()
+    assert versao_dados(ESCOPO_USUARIOS) == versao
@@ -0,0 +1,87 @@
+"""
+Versões dos dados: cada gravação incrementa só os escopos que tocou (sem
+contador global), e a agenda/relatórios de quem vê todas as UVIS mudam de
+ETag quando um dos meses exibidos muda.
+"""
+from datetime import date, datetime, time
+
+from app import db
+from app.models import Usuario, Solicitacao, VersaoDados
+from app.versoes import escopo_agenda, escopo_mes, escopo_usuario, escopos_agenda
+
+
+def entrar(cliente, login):
+    cliente.post('/login', data={'login': login, 'senha': '1234'})
+    cliente.get('/')  # consome o flash de boas-vindas
+
+
+def versoes():
+    return {v.escopo: v.versao for v in VersaoDados.query}
+
+
+def criar_solicitacao(login, agendada):
+    uvis = Usuario(nome_uvis=f'UVIS {login}', regiao='SUL', login=login, senha_hash='-', tipo_usuario='uvis')
+    db.session.add(uvis)
+    db.session.flush()
+    solicitacao = Solicitacao(
+        data_agendamento=agendada, hora_agendamento=time(9, 0), foco='Piscina',
+        cep='01001-000', logradouro='Praça da Sé', bairro='Sé', cidade='São Paulo', uf='SP',
+        status='PENDENTE', usuario_id=uvis.id, data_criacao=datetime(2025, 10, 5, 10),
+    )
+    db.session.add(solicitacao)
+    db.session.commit()
+    return solicitacao
+
+
+def test_gravacao_incrementa_so_os_escopos_tocados(app):
+    solicitacao = criar_solicitacao('lapa', date(2025, 11, 3))
+    antes = versoes()
+
+    solicitacao.status = 'APROVADO'
+    db.session.commit()
+
+    depois = versoes()
+    alterados = {escopo for escopo in depois if depois[escopo] != antes.get(escopo)}
+    assert alterados == {
+        escopo_mes(2025, 10), escopo_agenda(2025, 11), escopo_usuario(solicitacao.usuario_id),
+    }
+
+
+def test_escopos_agenda_do_intervalo():
+    assert escopos_agenda(date(2025, 11, 30), date(2026, 1, 11)) == [
+        escopo_agenda(2025, 11), escopo_agenda(2025, 12), escopo_agenda(2026, 1),
+    ]
+    assert escopos_agenda(date(2025, 11, 1), date(2025, 12, 1)) == [escopo_agenda(2025, 11)]
+
+
+def test_etag_da_agenda_segue_o_mes_exibido(app):
+    solicitacao = criar_solicitacao('lapa', date(2025, 11, 3))
+    criar_solicitacao('se', date(2026, 2, 3))
+    cliente = app.test_client()
+    entrar(cliente, 'admin')
+
+    url = '/api/agenda/events?start=2025-11-01&end=2025-12-01'
+    etag = cliente.get(url).headers['ETag']
+    assert cliente.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    # outro mês: a agenda de novembro continua válida
+    outra = Solicitacao.query.filter(Solicitacao.id != solicitacao.id).one()
+    outra.status = 'APROVADO'
+    db.session.commit()
+    assert cliente.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    solicitacao.status = 'APROVADO'
+    db.session.commit()
+    assert cliente.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_renomear_uvis_incrementa_meses_dela(app):
+    solicitacao = criar_solicitacao('lapa', date(2025, 11, 3))
+    antes = versoes()
+
+    solicitacao.autor.nome_uvis = 'UVIS Lapa/Pinheiros'
+    db.session.commit()
+
+    depois = versoes()
+    for escopo in (escopo_mes(2025, 10), escopo_agenda(2025, 11)):
+        assert depois[escopo] == antes[escopo] + 1
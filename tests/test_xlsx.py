@@ -0,0 +1,23 @@
+"""
+Exportação Excel em streaming: o arquivo abre no openpyxl, com as
+larguras informadas (não de uma amostra) e todas as linhas.
+"""
+import io
+
+from openpyxl import load_workbook
+
+from app.xlsx_stream import gerar_xlsx
+
+
+def test_planilha_com_larguras_fixas():
+    linhas = [[i, 'curto'] for i in range(1000)] + [[1000, 'x' * 200], [1001, True]]
+    conteudo = b''.join(gerar_xlsx('Relatório', ['ID', 'Texto'], linhas, [8, 30]))
+
+    planilha = load_workbook(io.BytesIO(conteudo)).active
+    assert planilha.title == 'Relatório'
+    assert planilha.freeze_panes == 'A2'
+    assert planilha.column_dimensions['B'].width == 30
+    assert planilha.max_row == 1003
+    assert planilha['B1002'].value == 'x' * 200
+    assert planilha['B1002'].alignment.wrap_text
+    assert planilha['B1003'].value == 'SIM'
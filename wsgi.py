@@ -0,0 +1,22 @@
+"""
+Ponto de entrada WSGI para produção (servidor com vários workers).
+
+Exemplos:
+    gunicorn -w 4 --threads 4 -b 0.0.0.0:8000 wsgi:app
+    waitress-serve --port=8000 wsgi:app
+
+Os caches em memória de cada worker conferem a versão dos dados no banco
+(app/versoes.py) e o status dos relatórios fica em disco, então qualquer
+worker pode atender qualquer requisição.
+
+A configuração vem de config.Config (variáveis de ambiente SECRET_KEY,
+DATABASE_URL, DB_POOL_*, SQLITE_*). Diferente de run.py, não cria tabelas
+nem usuários de teste: o banco é preparado com `flask db upgrade`.
+"""
+from app import create_app
+from config import Config
+
+app = create_app()
+
+if app.config['SECRET_KEY'] == Config.SECRET_KEY_DEV:
+    app.logger.warning("SECRET_KEY não definida: usando a chave de desenvolvimento.")